@@ -1,22 +1,39 @@
-from typing import Annotated, TypedDict
+import os
+import time
+from typing import Annotated, NotRequired, TypedDict
 
 from dotenv import load_dotenv
-from langchain_core.messages import SystemMessage
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
 
 from app.agent_tools import fetch_claim_health_record_tool
+from app.checkpointer import BoundedMemorySaver
+from app.claim_prefetch import PREFETCH_ENABLED, prefetch_claims
+from app.context_window import (
+    CONTEXT_SUMMARIZE,
+    build_context,
+    context_stats,
+    removals,
+    summarize,
+    system_message,
+)
+from app.stub_model import stub_model_from_env
 
 load_dotenv()
 
-model = ChatOpenAI(
-    model="qwen-3-32b",
-    temperature=0.6,
-    streaming=True,  # ← makes UI feel instant
-)
+# "stub" swaps in an offline fake model for load tests (see app/stub_model.py)
+CHAT_MODEL_PROVIDER = os.getenv("CHAT_MODEL_PROVIDER", "openai").lower()
+
+if CHAT_MODEL_PROVIDER == "stub":
+    model = stub_model_from_env()
+else:
+    model = ChatOpenAI(
+        model="qwen-3-32b",
+        temperature=0.6,
+        streaming=True,  # ← makes UI feel instant
+    )
 
 tools = [fetch_claim_health_record_tool]
 model_w_tools = model.bind_tools(
@@ -28,7 +45,7 @@ SYSTEM_PROMPT = """You are a Senior Healthcare Claims Assistant.
 Your role is to help affiliates who porcess claims understand their Explanation of Benefits (EOB).
 
 GUIDELINES:
-1. ALWAYS call `fetch_claim_health_record_tool` when a Claim ID is mentioned.
+1. ALWAYS call `fetch_claim_health_record_tool` when a Claim ID is mentioned, unless its result for that claim is already in this turn.
 2. Quote the exact "description" and "action_needed" from the tool output.
 3. Clearly state the "patient_responsibility" amount and whether it's $0.
 4. Use empathetic, professional language.
@@ -40,31 +57,50 @@ You are trusted with sensitive financial data — accuracy is everything."""
 
 class ChatState(TypedDict):
     messages: Annotated[list, add_messages]
+    summary: NotRequired[str]  # rolling summary of turns folded out of context
 
 
-def chatbot(state: ChatState) -> dict:
-    messages = state["messages"]
+async def chatbot(state: ChatState) -> dict:
+    # System prompt + as much recent history as fits the token budget
+    summary = state.get("summary", "")
+    messages, dropped = build_context(state["messages"], SYSTEM_PROMPT, summary)
 
-    # Add system prompt only if this is the first message
-    if not messages or not any(isinstance(m, SystemMessage) for m in messages):
-        messages = [SystemMessage(content=SYSTEM_PROMPT)] + messages
+    update = {}
+    if dropped and CONTEXT_SUMMARIZE:
+        summary = await summarize(model, summary, dropped)
+        messages[0] = system_message(SYSTEM_PROMPT, summary)
+        update = {"summary": summary, "messages": removals(dropped)}
 
-    response = model_w_tools.invoke(messages)
-    return {"messages": [response]}
+    # Async call: tokens still surface through astream_events, but the model
+    # request no longer parks a threadpool worker for the whole generation
+    start = time.perf_counter()
+    response = await model_w_tools.ainvoke(messages)
+    context_stats.record_latency((time.perf_counter() - start) * 1000)
 
+    return {**update, "messages": update.get("messages", []) + [response]}
 
-builder = StateGraph(ChatState)
 
-builder.add_node("chatbot", chatbot)
-builder.add_node("tools", ToolNode(tools))
+def build_graph(chatbot_node=chatbot, checkpointer=None, prefetch=PREFETCH_ENABLED):
+    builder = StateGraph(ChatState)
+
+    builder.add_node("chatbot", chatbot_node)
+    builder.add_node("tools", ToolNode(tools))
+
+    if prefetch:
+        builder.add_node("prefetch", prefetch_claims)
+        builder.add_edge(START, "prefetch")
+        builder.add_edge("prefetch", "chatbot")
+    else:
+        builder.add_edge(START, "chatbot")
+    builder.add_conditional_edges(
+        "chatbot",
+        tools_condition,  # ← automatically routes to "tools" or END
+        {"tools": "tools", END: END},
+    )
+    builder.add_edge("tools", "chatbot")
+
+    return builder.compile(checkpointer=checkpointer)
 
-builder.add_edge(START, "chatbot")
-builder.add_conditional_edges(
-    "chatbot",
-    tools_condition,  # ← automatically routes to "tools" or END
-    {"tools": "tools", END: END},
-)
-builder.add_edge("tools", "chatbot")
 
-memory = MemorySaver()
-graph = builder.compile(checkpointer=memory)
+memory = BoundedMemorySaver()
+graph = build_graph(checkpointer=memory)
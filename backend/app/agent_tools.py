@@ -1,10 +1,11 @@
+import asyncio
 import logging
 
 from langchain.tools import tool
 from pydantic import BaseModel, Field
 
-from app.database import SessionLocal
-from app.services import get_claim_summary, sanitize_for_agent
+from app.database import USE_ASYNC_DB, AsyncSessionLocal, session_scope
+from app.services import aget_claim_summary, get_claim_summary, sanitize_for_agent
 
 logger = logging.getLogger("claim-agent.tool")
 
@@ -17,9 +18,23 @@ class ClaimInput(BaseModel):
     )
 
 
+def _fetch_summary_sync(claim_id: str):
+    # Borrow a pooled session for the tool execution
+    with session_scope() as db:
+        return get_claim_summary(db, claim_id)
+
+
+async def _fetch_summary(claim_id: str):
+    if USE_ASYNC_DB:
+        async with AsyncSessionLocal() as db:
+            return await aget_claim_summary(db, claim_id)
+    # Keep blocking DB work off the event loop that drives the graph
+    return await asyncio.to_thread(_fetch_summary_sync, claim_id)
+
+
 # 2. Define the Tool
 @tool("fetch_claim_health_record", args_schema=ClaimInput)
-def fetch_claim_health_record_tool(claim_id: str):
+async def fetch_claim_health_record_tool(claim_id: str):
     """
     Retrieves full financial and clinical claim details for AI reasoning.
 
@@ -36,10 +51,8 @@ def fetch_claim_health_record_tool(claim_id: str):
     claim_id = claim_id.strip()
     logger.info(f"Fetching claim: {claim_id}")
 
-    # Open a new DB session for the tool execution
-    db = SessionLocal()
     try:
-        summary = get_claim_summary(db, claim_id)
+        summary = await _fetch_summary(claim_id)
         if not summary:
             return {"error": "Claim not found", "claim_id": claim_id}
 
@@ -47,5 +60,3 @@ def fetch_claim_health_record_tool(claim_id: str):
     except Exception as e:
         logger.error(f"Error fetching claim {claim_id}: {e}", exc_info=True)
         return {"error": "System error", "detail": "Unable to retrieve claim"}
-    finally:
-        db.close()
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from app.claim_prefetch import resolve_claim_ids
+from app.reference_cache import reference_cache
+
+# Opt-in: a cached answer skips the model entirely for a repeated question
+ANSWER_CACHE_ENABLED = os.getenv("CHAT_ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_ANSWER_CACHE_MAX_ENTRIES", "2048"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("CHAT_ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    return _WHITESPACE.sub(" ", query).strip().lower().rstrip("?!. ")
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of final /chat answers.
+
+    Entries are looked up by (normalized query, referenced claim IDs) and only
+    served while those claims' content fingerprints and the reference-code
+    version still match - the inputs of their summaries - so any change to a
+    claim or to the reference codes retires its answers. Queries that name no
+    claim are never cached - their answer depends on the conversation, not on
+    data we can fingerprint - and neither is anything while the codes are
+    read from the DB, with no snapshot version to compare.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = ANSWER_CACHE_ENABLED,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+    ):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (summary digest, answer, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    async def key_for(self, query: str):
+        """(lookup key, summary digest), or None if the query isn't cacheable"""
+        claims = await resolve_claim_ids(query)
+        ref_version = reference_cache.version
+        if not claims or ref_version is None:
+            return None
+        digest = hashlib.sha256(json.dumps([ref_version, *claims.values()], default=str).encode())
+        return (normalize_query(query), tuple(claims)), digest.hexdigest()[:16]
+
+    def get(self, key, digest):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == digest and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                # summary changed or entry expired
+                del self._entries[key]
+                self.stale += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, digest, answer: str):
+        with self._lock:
+            self._entries[key] = (digest, answer, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> int:
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+        return dropped
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_evictions": self.stale,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,352 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import aiosqlite
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from sqlalchemy.engine import make_url
+
+from app.database import DATABASE_URL
+
+logger = logging.getLogger("claim-agent.memory")
+
+# memory (single process) | postgres (multi-worker) | sqlite (single node, durable)
+CHECKPOINTER = os.getenv("CHAT_CHECKPOINTER", "memory").lower()
+CHECKPOINT_SQLITE_PATH = os.getenv("CHAT_CHECKPOINT_SQLITE_PATH", "checkpoints.sqlite")
+CHECKPOINT_POOL_SIZE = int(os.getenv("CHAT_CHECKPOINT_POOL_SIZE", "10"))
+# "exit" persists once per /chat turn instead of after every graph step,
+# which batches a turn's checkpoint writes into one round of inserts
+CHECKPOINT_DURABILITY = os.getenv("CHAT_CHECKPOINT_DURABILITY", "exit")
+CHECKPOINT_PRUNE_INTERVAL_SECONDS = float(
+    os.getenv("CHAT_CHECKPOINT_PRUNE_INTERVAL_SECONDS", "300")
+)
+# Serialized values at least this big are zlib-compressed before storage
+CHECKPOINT_COMPRESS_MIN_BYTES = int(os.getenv("CHAT_CHECKPOINT_COMPRESS_MIN_BYTES", "1024"))
+
+MAX_THREADS = int(os.getenv("CHAT_MAX_THREADS", "1000"))
+MAX_CHECKPOINTS_PER_THREAD = int(os.getenv("CHAT_MAX_CHECKPOINTS_PER_THREAD", "20"))
+THREAD_IDLE_TTL_SECONDS = float(os.getenv("CHAT_THREAD_IDLE_TTL_SECONDS", "3600"))
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    MemorySaver with limits, so conversation state can't grow without bound.
+
+    - at most `max_threads` threads; the least recently used goes first
+    - threads idle for longer than `idle_ttl_seconds` are dropped
+    - each thread keeps only its newest `max_checkpoints` checkpoints
+      (plus the writes and channel blobs those checkpoints still reference)
+
+    Only the latest checkpoint is needed to continue a conversation, so
+    trimming history just limits how far back time-travel can go.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = MAX_THREADS,
+        max_checkpoints: int = MAX_CHECKPOINTS_PER_THREAD,
+        idle_ttl_seconds: float = THREAD_IDLE_TTL_SECONDS,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.max_checkpoints = max(2, max_checkpoints)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._last_used = OrderedDict()  # thread_id -> monotonic time, LRU first
+        self._lock = threading.RLock()
+        self.evicted_threads = 0
+        self.pruned_checkpoints = 0
+
+    # --- access tracking ---
+    def _touch(self, thread_id: str):
+        with self._lock:
+            self._last_used[thread_id] = time.monotonic()
+            self._last_used.move_to_end(thread_id)
+
+    def get_tuple(self, config):
+        result = super().get_tuple(config)
+        if result is not None:
+            self._touch(config["configurable"]["thread_id"])
+        return result
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = saved["configurable"]["thread_id"]
+        with self._lock:
+            self._touch(thread_id)
+            self._prune_history(thread_id, saved["configurable"]["checkpoint_ns"])
+            self.sweep()
+        return saved
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._last_used.pop(thread_id, None)
+
+    # --- eviction ---
+    def sweep(self) -> int:
+        """Drop idle threads and trim back to max_threads; returns threads evicted"""
+        evicted = 0
+        with self._lock:
+            cutoff = time.monotonic() - self.idle_ttl_seconds
+            while self._last_used:
+                thread_id, last_used = next(iter(self._last_used.items()))
+                if last_used >= cutoff and len(self._last_used) <= self.max_threads:
+                    break
+                self.delete_thread(thread_id)
+                evicted += 1
+        if evicted:
+            self.evicted_threads += evicted
+            logger.info(f"Evicted {evicted} conversation thread(s)")
+        return evicted
+
+    def _prune_history(self, thread_id: str, checkpoint_ns: str):
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.max_checkpoints:
+            return
+
+        # Checkpoint IDs are time-ordered (uuid6), so sorting gives history order
+        ordered = sorted(checkpoints)
+        for checkpoint_id in ordered[: -self.max_checkpoints]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self.pruned_checkpoints += 1
+
+        # Blobs are shared between checkpoints by channel version; keep only
+        # the versions some surviving checkpoint still points at
+        live = set()
+        for saved, _, _ in checkpoints.values():
+            versions = self.serde.loads_typed(saved).get("channel_versions", {})
+            live.update(versions.items())
+        for key in [
+            k
+            for k in self.blobs
+            if k[0] == thread_id and k[1] == checkpoint_ns and (k[2], k[3]) not in live
+        ]:
+            del self.blobs[key]
+
+    # --- reporting ---
+    def stats(self) -> dict:
+        with self._lock:
+            self.sweep()
+            checkpoints = 0
+            approx_bytes = 0
+            for namespaces in self.storage.values():
+                for saved in namespaces.values():
+                    checkpoints += len(saved)
+                    for checkpoint, metadata, _ in saved.values():
+                        approx_bytes += len(checkpoint[1]) + len(metadata[1])
+            for writes in self.writes.values():
+                for _, _, value, _ in writes.values():
+                    approx_bytes += len(value[1])
+            for value in self.blobs.values():
+                approx_bytes += len(value[1])
+            return {
+                "threads": len(self.storage),
+                "checkpoints": checkpoints,
+                "pending_write_sets": len(self.writes),
+                "channel_blobs": len(self.blobs),
+                "approx_bytes": approx_bytes,
+                "max_threads": self.max_threads,
+                "max_checkpoints_per_thread": self.max_checkpoints,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "evicted_threads": self.evicted_threads,
+                "pruned_checkpoints": self.pruned_checkpoints,
+            }
+
+
+class CompressedSerializer:
+    """
+    Wraps LangGraph's msgpack serializer and zlib-compresses large payloads.
+    Tool results (full claim summaries) dominate checkpoint size and compress
+    well; the type tag records whether a payload needs inflating on load.
+    """
+
+    SUFFIX = "+zlib"
+
+    def __init__(self, inner=None, min_bytes: int = CHECKPOINT_COMPRESS_MIN_BYTES):
+        self.inner = inner or JsonPlusSerializer()
+        self.min_bytes = min_bytes
+
+    def dumps_typed(self, obj):
+        type_, data = self.inner.dumps_typed(obj)
+        if data is not None and len(data) >= self.min_bytes:
+            return type_ + self.SUFFIX, zlib.compress(data)
+        return type_, data
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.endswith(self.SUFFIX):
+            return self.inner.loads_typed(
+                (type_[: -len(self.SUFFIX)], zlib.decompress(payload))
+            )
+        return self.inner.loads_typed(data)
+
+
+_PRUNE_POSTGRES = """
+WITH ranked AS (
+    SELECT thread_id, checkpoint_ns, checkpoint_id,
+           row_number() OVER (
+               PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+           ) AS rn
+    FROM checkpoints
+),
+doomed AS (
+    DELETE FROM checkpoints c
+    USING ranked r
+    WHERE c.thread_id = r.thread_id
+      AND c.checkpoint_ns = r.checkpoint_ns
+      AND c.checkpoint_id = r.checkpoint_id
+      AND r.rn > %(keep)s
+    RETURNING c.thread_id, c.checkpoint_ns, c.checkpoint_id, c.checkpoint
+),
+dead_writes AS (
+    DELETE FROM checkpoint_writes w
+    USING doomed d
+    WHERE w.thread_id = d.thread_id
+      AND w.checkpoint_ns = d.checkpoint_ns
+      AND w.checkpoint_id = d.checkpoint_id
+    RETURNING 1
+),
+doomed_versions AS (
+    SELECT d.thread_id, d.checkpoint_ns, v.key AS channel, v.value AS version
+    FROM doomed d, jsonb_each_text(d.checkpoint -> 'channel_versions') v
+),
+dead_blobs AS (
+    DELETE FROM checkpoint_blobs b
+    USING doomed_versions dv
+    WHERE b.thread_id = dv.thread_id
+      AND b.checkpoint_ns = dv.checkpoint_ns
+      AND b.channel = dv.channel
+      AND b.version = dv.version
+      -- every CTE sees the pre-delete snapshot, so "still referenced" has to
+      -- be checked against the checkpoints we are keeping
+      AND NOT EXISTS (
+          SELECT 1
+          FROM ranked r
+          JOIN checkpoints c
+            ON c.thread_id = r.thread_id
+           AND c.checkpoint_ns = r.checkpoint_ns
+           AND c.checkpoint_id = r.checkpoint_id
+          WHERE r.rn <= %(keep)s
+            AND c.thread_id = b.thread_id
+            AND c.checkpoint_ns = b.checkpoint_ns
+            AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+      )
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM doomed) AS checkpoints,
+       (SELECT count(*) FROM dead_writes) AS writes,
+       (SELECT count(*) FROM dead_blobs) AS blobs
+"""
+
+_PRUNE_SQLITE_DOOMED = """
+SELECT thread_id, checkpoint_ns, checkpoint_id FROM (
+    SELECT thread_id, checkpoint_ns, checkpoint_id,
+           row_number() OVER (
+               PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+           ) AS rn
+    FROM checkpoints
+) WHERE rn > ?
+"""
+
+
+class CheckpointPruner:
+    """Background trimming of durable checkpoint history, newest N per thread"""
+
+    def __init__(self, saver, keep: int = MAX_CHECKPOINTS_PER_THREAD):
+        self.saver = saver
+        self.keep = max(2, keep)
+        self.runs = 0
+        self.pruned = {"checkpoints": 0, "writes": 0, "blobs": 0}
+        self.last_run_at = None
+        self.last_error = None
+
+    async def prune(self) -> dict:
+        if isinstance(self.saver, AsyncPostgresSaver):
+            async with self.saver.conn.connection() as conn:
+                row = await (await conn.execute(_PRUNE_POSTGRES, {"keep": self.keep})).fetchone()
+            removed = dict(row)
+        else:
+            conn = self.saver.conn
+            async with self.saver.lock:
+                doomed = await (await conn.execute(_PRUNE_SQLITE_DOOMED, (self.keep,))).fetchall()
+                doomed = [tuple(r) for r in doomed]
+                dead_writes = await conn.executemany(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    doomed,
+                )
+                await conn.executemany(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    doomed,
+                )
+                await conn.commit()
+            # channel values live inside the checkpoint row here; no blob table
+            removed = {"checkpoints": len(doomed), "writes": dead_writes.rowcount, "blobs": 0}
+
+        self.runs += 1
+        self.last_run_at = time.time()
+        for key, count in removed.items():
+            self.pruned[key] += count or 0
+        if removed["checkpoints"]:
+            logger.info(f"Pruned checkpoints: {removed}")
+        return removed
+
+    async def prune_periodically(self, interval: float = CHECKPOINT_PRUNE_INTERVAL_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.prune()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Checkpoint pruning failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "keep_per_thread": self.keep,
+            "prune_runs": self.runs,
+            "pruned": self.pruned,
+            "last_run_at": self.last_run_at,
+            "last_error": self.last_error,
+        }
+
+
+def _postgres_conninfo() -> str:
+    # psycopg wants a plain postgresql:// URI, without SQLAlchemy's +driver
+    url = make_url(DATABASE_URL).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+@asynccontextmanager
+async def open_durable_checkpointer(backend: str = CHECKPOINTER):
+    """Yields a set-up durable saver; the connection lives as long as the context"""
+    serde = CompressedSerializer()
+    if backend == "postgres":
+        async with AsyncConnectionPool(
+            _postgres_conninfo(),
+            max_size=CHECKPOINT_POOL_SIZE,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            open=False,
+        ) as pool:
+            saver = AsyncPostgresSaver(pool, serde=serde)
+            await saver.setup()
+            yield saver
+    elif backend == "sqlite":
+        async with aiosqlite.connect(CHECKPOINT_SQLITE_PATH) as conn:
+            await conn.execute("PRAGMA journal_mode=WAL")
+            saver = AsyncSqliteSaver(conn, serde=serde)
+            await saver.setup()
+            yield saver
+    else:
+        raise ValueError(f"Unknown CHAT_CHECKPOINTER backend: {backend}")
@@ -0,0 +1,311 @@
+"""
+Secondary indexes for listing and filtering claims.
+
+The indexed values are pulled out of each resource once, when it is written,
+and kept next to it: as indexed columns in the Postgres store, and as the
+sorted structures in ClaimIndex for the in-memory store. Listing pages
+through claim IDs in ascending order with a keyset cursor, so no request
+scans or sorts the whole store.
+"""
+
+import bisect
+from dataclasses import dataclass, fields
+
+from app.code_index import adjustment_keys
+from app.eob import parse_drg, parse_totals
+
+# Column order of the values carried in ingest rows (see ClaimRepository.put_rows)
+INDEX_COLUMNS = (
+    "disposition",
+    "outcome",
+    "service_start",
+    "service_end",
+    "payment_date",
+    "billed_amount",
+    "paid_amount",
+    "drg_code",
+)
+# Bump when index_values changes, so stores re-derive rows written before
+INDEX_VERSION = 1
+
+_EQUALITY_COLUMNS = ("disposition", "outcome", "drg_code")
+_RANGE_COLUMNS = ("service_start", "service_end", "payment_date", "billed_amount", "paid_amount")
+
+
+def _day(value):
+    # FHIR date/dateTime; the day is enough for filtering and sorts as text
+    return value[:10] if isinstance(value, str) else None
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def index_values(claim: dict) -> tuple:
+    """The indexed values of a resource, in INDEX_COLUMNS order"""
+    period = claim.get("billablePeriod") or {}
+    billed, paid = parse_totals(claim)
+    return (
+        claim.get("disposition"),
+        claim.get("outcome"),
+        _day(period.get("start")),
+        _day(period.get("end")),
+        _day((claim.get("payment") or {}).get("date")),
+        _number(billed),
+        _number(paid),
+        parse_drg(claim),
+    )
+
+
+@dataclass
+class ClaimFilter:
+    """
+    Listing filters; None means "any". The service window matches claims
+    whose billable period overlaps [service_from, service_to].
+    """
+
+    disposition: str | None = None
+    outcome: str | None = None
+    service_from: str | None = None
+    service_to: str | None = None
+    payment_from: str | None = None
+    payment_to: str | None = None
+    min_billed: float | None = None
+    max_billed: float | None = None
+    min_paid: float | None = None
+    max_paid: float | None = None
+    drg_code: str | None = None
+
+    def predicates(self) -> list:
+        """(column, op, value) triples with op one of "eq", "ge", "le" """
+        spec = (
+            ("disposition", "disposition", "eq"),
+            ("outcome", "outcome", "eq"),
+            ("drg_code", "drg_code", "eq"),
+            ("service_from", "service_end", "ge"),
+            ("service_to", "service_start", "le"),
+            ("payment_from", "payment_date", "ge"),
+            ("payment_to", "payment_date", "le"),
+            ("min_billed", "billed_amount", "ge"),
+            ("max_billed", "billed_amount", "le"),
+            ("min_paid", "paid_amount", "ge"),
+            ("max_paid", "paid_amount", "le"),
+        )
+        return [
+            (column, op, getattr(self, name))
+            for name, column, op in spec
+            if getattr(self, name) is not None
+        ]
+
+    def as_dict(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self) if getattr(self, f.name) is not None}
+
+
+_POSITION = {column: i for i, column in enumerate(INDEX_COLUMNS)}
+
+
+def _matches(values: tuple, predicates: list) -> bool:
+    for column, op, wanted in predicates:
+        value = values[_POSITION[column]]
+        if op == "eq":
+            if value != wanted:
+                return False
+        elif value is None or (value < wanted if op == "ge" else value > wanted):
+            return False
+    return True
+
+
+# Batches up to this size are inserted one by one; larger ones are merged
+_INSORT_MAX = 32
+
+
+def _merge_into(target: list, new: list):
+    """
+    Merge `new` into the sorted list `target`, in place. Only the part of
+    `target` past the smallest new entry is touched: nothing when the batch
+    sorts after everything (claim IDs usually grow), a bisect and insert per
+    entry for small batches, else one merge of the two sorted runs.
+    """
+    if not new:
+        return
+    new.sort()
+    start = bisect.bisect_right(target, new[0])
+    if start == len(target):
+        target.extend(new)
+    elif len(new) <= _INSORT_MAX:
+        for item in new:
+            bisect.insort(target, item, lo=start)
+    else:
+        tail = target[start:]
+        del target[start:]
+        # Two sorted runs: Timsort detects them and does a single linear merge
+        tail.extend(new)
+        tail.sort()
+        target.extend(tail)
+
+
+class ClaimIndex:
+    """
+    In-memory secondary indexes, maintained incrementally on every write.
+
+    - all claim IDs, sorted (plain listing is a bisect and a slice)
+    - equality columns: value -> sorted claim IDs
+    - range columns: sorted (value, claim ID) pairs
+    - adjustment codes: (kind, code) -> set of claim IDs, sorted lazily
+      per code and kept until that code's postings change
+
+    A filtered page is driven by the most selective predicate: an equality
+    list is walked from the cursor in ID order; a narrow range slice is
+    filtered and then sorted, which only touches the claims inside that
+    range; a wide one walks the ID list instead.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self._values = {}  # claim_id -> index_values tuple
+        self._equal = {column: {} for column in _EQUALITY_COLUMNS}
+        self._ranges = {column: [] for column in _RANGE_COLUMNS}
+        self._postings = {}  # (kind, code) -> set of claim IDs
+        self._claim_codes = {}  # claim_id -> its posting keys
+        self._sorted_postings = {}  # (kind, code) -> sorted IDs, dropped on change
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, claim_id: str, claim: dict):
+        self.add_many([(claim_id, claim)])
+
+    def add_many(self, claims: list):
+        """
+        Index (claim_id, resource) pairs, replacing earlier entries. Each
+        touched list gets the batch's new entries merged in (see _merge_into),
+        so a bulk load never re-sorts what is already indexed.
+        """
+        claims = dict(claims)  # the last copy of a repeated ID wins
+        # Unindex replaced claims first: _unindex bisects, so lists must still be sorted
+        replaced = {claim_id for claim_id in claims if claim_id in self._values}
+        for claim_id in replaced:
+            self._unindex(claim_id)
+        new_ids = []
+        new_equal = {column: {} for column in _EQUALITY_COLUMNS}
+        new_ranges = {column: [] for column in _RANGE_COLUMNS}
+        for claim_id, claim in claims.items():
+            if claim_id not in replaced:
+                new_ids.append(claim_id)
+            values = index_values(claim)
+            self._values[claim_id] = values
+            for column, by_value in new_equal.items():
+                by_value.setdefault(values[_POSITION[column]], []).append(claim_id)
+            for column, pairs in new_ranges.items():
+                value = values[_POSITION[column]]
+                if value is not None:
+                    pairs.append((value, claim_id))
+            keys = adjustment_keys(claim)
+            self._claim_codes[claim_id] = keys
+            for key in keys:
+                self._postings.setdefault(key, set()).add(claim_id)
+                self._sorted_postings.pop(key, None)
+        _merge_into(self.ids, new_ids)
+        for column, by_value in new_equal.items():
+            for value, ids in by_value.items():
+                _merge_into(self._equal[column].setdefault(value, []), ids)
+        for column, pairs in new_ranges.items():
+            _merge_into(self._ranges[column], pairs)
+
+    def _unindex(self, claim_id: str):
+        values = self._values.pop(claim_id)
+        for column, by_value in self._equal.items():
+            ids = by_value[values[_POSITION[column]]]
+            del ids[bisect.bisect_left(ids, claim_id)]
+        for column, pairs in self._ranges.items():
+            value = values[_POSITION[column]]
+            if value is not None:
+                del pairs[bisect.bisect_left(pairs, (value, claim_id))]
+        for key in self._claim_codes.pop(claim_id):
+            self._postings[key].discard(claim_id)
+            self._sorted_postings.pop(key, None)
+
+    def _range_bounds(self, column: str, predicates: list):
+        pairs = self._ranges[column]
+        lo, hi = 0, len(pairs)
+        for col, op, wanted in predicates:
+            if col != column:
+                continue
+            if op == "ge":
+                lo = max(lo, bisect.bisect_left(pairs, (wanted,)))
+            else:
+                # (wanted, chr(0x10FFFF)) sorts after every (wanted, claim_id)
+                hi = min(hi, bisect.bisect_right(pairs, (wanted, "\U0010ffff")))
+        return lo, max(lo, hi)
+
+    def page(self, claim_filter: ClaimFilter, after: str = None, limit: int = None) -> list:
+        predicates = claim_filter.predicates()
+        if not predicates:
+            start = bisect.bisect_right(self.ids, after) if after is not None else 0
+            return self.ids[start : start + limit if limit is not None else None]
+
+        # Pick the driver with the fewest candidates
+        best = None
+        for column, op, wanted in predicates:
+            if op == "eq":
+                size = len(self._equal[column].get(wanted, ()))
+                candidate = ("eq", column, wanted, size)
+            else:
+                lo, hi = self._range_bounds(column, predicates)
+                candidate = ("range", column, (lo, hi), hi - lo)
+            if best is None or candidate[3] < best[3]:
+                best = candidate
+        kind, column, where, _ = best
+
+        if kind == "eq":
+            return self._walk(self._equal[column].get(where, []), predicates, after, limit)
+        lo, hi = where
+        if (hi - lo) * 4 > len(self.ids):
+            # A wide range: walking IDs in order finds a page sooner than sorting the range
+            return self._walk(self.ids, predicates, after, limit)
+        result = [
+            claim_id
+            for _, claim_id in self._ranges[column][lo:hi]
+            if (after is None or claim_id > after) and _matches(self._values[claim_id], predicates)
+        ]
+        result.sort()
+        return result[:limit] if limit is not None else result
+
+    def _walk(self, ids: list, predicates: list, after, limit) -> list:
+        # `ids` is sorted, so the page comes out in ID order and stops early
+        result = []
+        for i in range(bisect.bisect_right(ids, after) if after is not None else 0, len(ids)):
+            claim_id = ids[i]
+            if _matches(self._values[claim_id], predicates):
+                result.append(claim_id)
+                if limit is not None and len(result) == limit:
+                    break
+        return result
+
+    def _posting_list(self, key) -> list:
+        ids = self._sorted_postings.get(key)
+        if ids is None:
+            ids = self._sorted_postings[key] = sorted(self._postings.get(key, ()))
+        return ids
+
+    def page_by_codes(self, keys: list, claim_filter: ClaimFilter, after: str = None, limit: int = None) -> list:
+        """Claims carrying every (kind, code) in `keys`, walked from the smallest posting list"""
+        if not keys:
+            return self.page(claim_filter, after, limit)
+        keys = sorted(keys, key=lambda k: len(self._postings.get(k, ())))
+        driver = self._posting_list(keys[0])
+        others = [self._postings.get(k, set()) for k in keys[1:]]
+        predicates = claim_filter.predicates()
+        result = []
+        for i in range(bisect.bisect_right(driver, after) if after is not None else 0, len(driver)):
+            claim_id = driver[i]
+            if all(claim_id in other for other in others) and _matches(
+                self._values[claim_id], predicates
+            ):
+                result.append(claim_id)
+                if limit is not None and len(result) == limit:
+                    break
+        return result
@@ -0,0 +1,110 @@
+import logging
+import os
+import re
+import threading
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.agent_tools import fetch_claim_health_record_tool
+from app.claim_repository import claim_repository
+
+logger = logging.getLogger("claim-agent.prefetch")
+
+# Look up mentioned claims before the first model call, so the model can
+# answer in one pass instead of streaming a tool call first
+PREFETCH_ENABLED = os.getenv("CHAT_PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_MAX_CLAIMS = int(os.getenv("CHAT_PREFETCH_MAX_CLAIMS", "3"))
+
+CLAIM_ID_PATTERN = re.compile(r"\b\d{6,20}\b")
+
+
+async def resolve_claim_ids(text: str) -> dict:
+    """
+    {claim ID: content fingerprint} for the numeric tokens in the query that
+    are real claims, in order of mention
+    """
+    found = {}
+    for candidate in CLAIM_ID_PATTERN.findall(text or ""):
+        if len(found) == PREFETCH_MAX_CLAIMS:
+            break
+        if candidate not in found:
+            # Proves the claim exists without loading it (a 32-byte md5 on Postgres)
+            fingerprint = await claim_repository.afingerprint(candidate)
+            if fingerprint is not None:
+                found[candidate] = fingerprint
+    return found
+
+
+async def extract_claim_ids(text: str) -> list:
+    """Numeric tokens in the query that are real claims, in order of mention"""
+    return list(await resolve_claim_ids(text))
+
+
+async def prefetch_claims(state) -> dict:
+    """
+    Graph node: fetch every claim the latest user message names and add it
+    to the thread as if the model had called the tool itself.
+    """
+    latest = next(
+        (m for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), None
+    )
+    claim_ids = await extract_claim_ids(latest.content if latest else "")
+    if not claim_ids:
+        return {"messages": []}
+
+    calls = [
+        {
+            "name": fetch_claim_health_record_tool.name,
+            "args": {"claim_id": claim_id},
+            "id": f"prefetch_{uuid.uuid4().hex[:12]}",
+            "type": "tool_call",
+        }
+        for claim_id in claim_ids
+    ]
+    # Invoking with a ToolCall returns a ToolMessage formatted exactly like
+    # the one ToolNode would have produced
+    results = [await fetch_claim_health_record_tool.ainvoke(call) for call in calls]
+    logger.info(f"Prefetched claims: {', '.join(claim_ids)}")
+    return {"messages": [AIMessage(content="", tool_calls=calls), *results]}
+
+
+class PrefetchStats:
+    """
+    Time-to-first-token per /chat request, bucketed by how the claim data got
+    into context. The gap between "tool_round_trip" and "prefetched" is what
+    prefetching saves.
+    """
+
+    BUCKETS = ("prefetched", "tool_round_trip", "no_claim_lookup")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {b: [0, 0.0] for b in self.BUCKETS}  # count, total ms
+
+    def record_ttft(self, bucket: str, elapsed_ms: float):
+        with self._lock:
+            self._totals[bucket][0] += 1
+            self._totals[bucket][1] += elapsed_ms
+
+    def stats(self) -> dict:
+        with self._lock:
+            avg = {
+                b: round(total / count, 1) if count else None
+                for b, (count, total) in self._totals.items()
+            }
+            counts = {b: count for b, (count, _) in self._totals.items()}
+        saved = (
+            round(avg["tool_round_trip"] - avg["prefetched"], 1)
+            if avg["tool_round_trip"] is not None and avg["prefetched"] is not None
+            else None
+        )
+        return {
+            "enabled": PREFETCH_ENABLED,
+            "requests": counts,
+            "avg_ttft_ms": avg,
+            "est_ttft_saved_ms": saved,
+        }
+
+
+prefetch_stats = PrefetchStats()
@@ -0,0 +1,673 @@
+import asyncio
+import io
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+
+from sqlalchemy import Text, bindparam, cast, func, inspect, or_, select, text, type_coerce, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.claim_index import INDEX_COLUMNS, INDEX_VERSION, ClaimFilter, ClaimIndex, index_values
+from app.code_index import AdjustmentQuery, adjustment_keys
+from app.database import Base, async_engine, engine
+from app.json_encoding import dumps, encoded_bodies
+from app.mock_data import _MOCK_DB, _extract_uc_id, _raw_resources
+from app.models import ClaimResource
+from app.summary_cache import claim_fingerprint
+
+logger = logging.getLogger("claims-api.claims")
+
+# "memory" serves the built-in mock claims; "postgres" reads the claim_resources table
+CLAIM_STORE = os.getenv("CLAIM_STORE", "memory").lower()
+# Copy the mock claims into an empty-or-not Postgres store at startup (existing rows win)
+CLAIM_STORE_SEED_MOCK = os.getenv("CLAIM_STORE_SEED_MOCK", "true").lower() == "true"
+
+# Server-side prepared statement names for the single-row lookups
+_LOOKUP = "claim_by_uc"
+_JSON_LOOKUP = "claim_json_by_uc"
+_FINGERPRINT_LOOKUP = "claim_fingerprint_by_uc"
+_SUMMARY_LOOKUP = "claim_summary_by_uc"
+_PREPARED = "claims.prepared_statements"
+
+# Columns derived from the resource on every write
+_INDEXED = (*INDEX_COLUMNS, "index_version")
+_INDEXED_LIST = ", ".join(_INDEXED)
+_INDEXED_UPDATE = ", ".join(f"{c} = excluded.{c}" for c in _INDEXED)
+
+# Postgres drivers put_rows can stream COPY through
+_COPY_DRIVERS = ("psycopg", "psycopg2")
+# Characters COPY's text format escapes
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_line(values) -> str:
+    """One row in COPY's text format"""
+    return "\t".join("\\N" if v is None else str(v).translate(_COPY_ESCAPES) for v in values) + "\n"
+
+
+class ClaimRepository(ABC):
+    """Where ExplanationOfBenefit resources live, addressed by their "uc" claim ID"""
+
+    name = "abstract"
+
+    def __init__(self):
+        self._write_listeners = []
+
+    def setup(self):
+        """Create storage and load seed data; called once at startup"""
+
+    def on_write(self, listener):
+        """
+        Call listener([(claim_id, resource), ...]) after every write through
+        this repository, so in-process views (e.g. app.portfolio) stay current
+        """
+        self._write_listeners.append(listener)
+
+    def _written(self, claims: list):
+        for listener in self._write_listeners:
+            try:
+                listener(claims)
+            except Exception as e:
+                logger.warning(f"Claim write listener {listener!r} failed: {e}")
+
+    def iter_claims(self, batch_size: int = 1000):
+        """Every stored claim as batches of (claim_id, resource), in ID order"""
+        after = None
+        while True:
+            ids = self.list_ids(after, batch_size)
+            if not ids:
+                return
+            yield list(zip(ids, self.get_many(ids)))
+            after = ids[-1]
+
+    @abstractmethod
+    def get(self, claim_id: str):
+        """The raw resource, or None"""
+
+    async def aget(self, claim_id: str):
+        return await asyncio.to_thread(self.get, claim_id)
+
+    def get_many(self, claim_ids: list) -> list:
+        """Resources for `claim_ids`, in order, None where missing"""
+        return [self.get(claim_id) for claim_id in claim_ids]
+
+    def get_json(self, claim_id: str):
+        """The raw resource as encoded JSON bytes, or None"""
+        claim = self.get(claim_id)
+        if claim is None:
+            return None
+        return self.encode(claim_id, claim)
+
+    def encode(self, claim_id: str, claim: dict) -> bytes:
+        """
+        JSON bytes of a resource this store returned. The body cache is keyed
+        on object identity, which holds while the store hands out the same
+        object for an unchanged claim.
+        """
+        return encoded_bodies.get_or_encode(("raw", claim_id), claim)
+
+    def fingerprint(self, claim_id: str):
+        """Content hash of the stored resource, or None if there is no such claim"""
+        claim = self.get(claim_id)
+        return None if claim is None else claim_fingerprint(claim)
+
+    async def afingerprint(self, claim_id: str):
+        return await asyncio.to_thread(self.fingerprint, claim_id)
+
+    @abstractmethod
+    def list_ids(self, after: str = None, limit: int = None) -> list:
+        """Claim IDs in ascending order, starting after `after`"""
+
+    @abstractmethod
+    def find_ids(self, claim_filter: ClaimFilter, after: str = None, limit: int = None) -> list:
+        """Like list_ids, restricted to claims matching `claim_filter` (served from indexes)"""
+
+    @abstractmethod
+    def find_by_codes(
+        self, query: AdjustmentQuery, claim_filter: ClaimFilter, after: str = None, limit: int = None
+    ) -> list:
+        """
+        Like find_ids, restricted to claims carrying every code in `query`
+        somewhere; app.code_index checks which adjudications they sit on
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def put_many(self, resources: list, overwrite: bool = True) -> int:
+        """Upsert resources by uc ID; returns how many were written"""
+
+    def put(self, resource: dict) -> str:
+        self.put_many([resource])
+        return _extract_uc_id(resource)
+
+    def put_rows(self, rows: list, method: str = "copy") -> int:
+        """
+        Bulk-load pre-parsed (claim_id, fhir_id, resource JSON text, *index
+        values in INDEX_COLUMNS order) rows, as produced by app.ingest. Later
+        rows win over earlier ones with the same ID.
+        """
+        return self.put_many([json.loads(row[2]) for row in rows])
+
+    # --- materialized summaries (see app.summary_materializer) ---
+    # Writing a resource always drops its stored summary, so a summary that
+    # exists was built from the resource currently stored.
+
+    @abstractmethod
+    def get_summary(self, claim_id: str):
+        """(stored summary, reference version it was built with), or None"""
+
+    async def aget_summary(self, claim_id: str):
+        return await asyncio.to_thread(self.get_summary, claim_id)
+
+    @abstractmethod
+    def put_summaries(self, entries: list) -> int:
+        """Store (claim_id, summary, reference version) next to each resource"""
+
+    @abstractmethod
+    def iter_unmaterialized(self, ref_version, batch_size: int, everything: bool = False):
+        """
+        Batches of (claim_id, resource) with no summary, or one built against
+        a different reference version (every claim if `everything`)
+        """
+
+    @abstractmethod
+    def count_unmaterialized(self, ref_version, everything: bool = False) -> int:
+        ...
+
+
+class InMemoryClaimRepository(ClaimRepository):
+    """A plain dict - by default the import-time mock claims"""
+
+    name = "memory"
+
+    def __init__(self, claims: dict = None):
+        super().__init__()
+        self._claims = _MOCK_DB if claims is None else claims
+        self._summaries = {}  # claim_id -> (summary, ref_version)
+        self._fingerprints = {}  # claim_id -> (resource, hash of that resource)
+        self._index = ClaimIndex()
+        self._index.add_many(self._claims.items())
+
+    def get(self, claim_id: str):
+        return self._claims.get(claim_id)
+
+    async def aget(self, claim_id: str):
+        return self._claims.get(claim_id)
+
+    def fingerprint(self, claim_id: str):
+        # Hash each resource object once; a replaced claim is a new object
+        claim = self._claims.get(claim_id)
+        if claim is None:
+            return None
+        known = self._fingerprints.get(claim_id)
+        if known is not None and known[0] is claim:
+            return known[1]
+        fingerprint = claim_fingerprint(claim)
+        self._fingerprints[claim_id] = (claim, fingerprint)
+        return fingerprint
+
+    async def afingerprint(self, claim_id: str):
+        return self.fingerprint(claim_id)
+
+    def list_ids(self, after: str = None, limit: int = None) -> list:
+        return self._index.page(ClaimFilter(), after, limit)
+
+    def find_ids(self, claim_filter: ClaimFilter, after: str = None, limit: int = None) -> list:
+        return self._index.page(claim_filter, after, limit)
+
+    def find_by_codes(
+        self, query: AdjustmentQuery, claim_filter: ClaimFilter, after: str = None, limit: int = None
+    ) -> list:
+        return self._index.page_by_codes(query.keys(), claim_filter, after, limit)
+
+    def count(self) -> int:
+        return len(self._claims)
+
+    def put_many(self, resources: list, overwrite: bool = True) -> int:
+        written = []
+        for resource in resources:
+            claim_id = _extract_uc_id(resource)
+            if overwrite or claim_id not in self._claims:
+                self._claims[claim_id] = resource
+                self._summaries.pop(claim_id, None)
+                written.append((claim_id, resource))
+        self._index.add_many(written)
+        self._written(written)
+        return len(written)
+
+    def get_summary(self, claim_id: str):
+        return self._summaries.get(claim_id)
+
+    async def aget_summary(self, claim_id: str):
+        return self._summaries.get(claim_id)
+
+    def put_summaries(self, entries: list) -> int:
+        written = 0
+        for claim_id, summary, ref_version in entries:
+            if claim_id in self._claims:
+                self._summaries[claim_id] = (summary, ref_version)
+                written += 1
+        return written
+
+    def _unmaterialized(self, ref_version, everything: bool):
+        for claim_id in self._index.ids:
+            stored = self._summaries.get(claim_id)
+            if everything or stored is None or stored[1] != ref_version:
+                yield claim_id
+
+    def iter_unmaterialized(self, ref_version, batch_size: int, everything: bool = False):
+        batch = []
+        for claim_id in self._unmaterialized(ref_version, everything):
+            batch.append((claim_id, self._claims[claim_id]))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def count_unmaterialized(self, ref_version, everything: bool = False) -> int:
+        return sum(1 for _ in self._unmaterialized(ref_version, everything))
+
+
+class PostgresClaimRepository(ClaimRepository):
+    """
+    EOB resources as JSONB rows in claim_resources, keyed by uc ID.
+
+    Lookups are one primary-key probe through a statement prepared once per
+    pooled connection, so latency stays flat as the table grows. With
+    DB_MODE=async, aget goes through asyncpg, which prepares and caches the
+    same lookup per connection itself. On non-Postgres engines (SQLite for
+    local runs) the lookup is a plain parameterized SELECT.
+    """
+
+    name = "postgres"
+
+    def __init__(self, sync_engine, async_engine=None):
+        super().__init__()
+        self.engine = sync_engine
+        self.async_engine = async_engine
+        self._postgres = sync_engine.dialect.name == "postgresql"
+        self._copy_unavailable_logged = False
+
+    def setup(self):
+        Base.metadata.create_all(self.engine, tables=[ClaimResource.__table__])
+        self._add_missing_columns()
+        self._reindex_stale_rows()
+        if CLAIM_STORE_SEED_MOCK:
+            seeded = self.put_many(_raw_resources, overwrite=False)
+            logger.info(f"Seeded {seeded} mock claims into claim_resources")
+
+    def _add_missing_columns(self):
+        # create_all won't alter a table created by an older release
+        with self.engine.begin() as conn:
+            existing = {c["name"] for c in inspect(conn).get_columns("claim_resources")}
+            for column in ClaimResource.__table__.columns:
+                if column.name not in existing:
+                    kind = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(f"ALTER TABLE claim_resources ADD COLUMN {column.name} {kind}"))
+                    logger.info(f"Added column claim_resources.{column.name}")
+        # ...nor add indexes to it
+        for index in ClaimResource.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+
+    def _reindex_stale_rows(self, batch_size: int = 1000):
+        # Rows written before the index columns existed (or by an older
+        # INDEX_VERSION) get their values derived once, in keyset batches
+        stale = ClaimResource.index_version.is_distinct_from(INDEX_VERSION)
+        stmt = (
+            update(ClaimResource)
+            .where(ClaimResource.claim_id == bindparam("target"))
+            .values(**{c: bindparam(c) for c in INDEX_COLUMNS}, index_version=INDEX_VERSION)
+        )
+        after, total = "", 0
+        while True:
+            with self.engine.connect() as conn:
+                batch = conn.execute(
+                    select(ClaimResource.claim_id, ClaimResource.resource)
+                    .where(ClaimResource.claim_id > after, stale)
+                    .order_by(ClaimResource.claim_id)
+                    .limit(batch_size)
+                ).all()
+            if not batch:
+                break
+            params = [
+                {"target": claim_id, **dict(zip(INDEX_COLUMNS, index_values(resource)))}
+                for claim_id, resource in batch
+            ]
+            with self.engine.begin() as conn:
+                conn.execute(stmt, params)
+            total += len(batch)
+            after = batch[-1][0]
+        if total:
+            logger.info(f"Derived listing index values for {total} claims")
+
+    def _lookup(self, name: str, columns: list, claim_id: str):
+        with self.engine.connect() as conn:
+            if not self._postgres:
+                return conn.execute(
+                    select(*columns).where(ClaimResource.claim_id == claim_id)
+                ).first()
+            # Connection.info lives as long as the DBAPI connection, which is
+            # exactly the lifetime of a prepared statement
+            prepared = conn.info.setdefault(_PREPARED, set())
+            if name not in prepared:
+                names = ", ".join(str(c.compile(dialect=conn.dialect)) for c in columns)
+                conn.exec_driver_sql(
+                    f"PREPARE {name} (text) AS "
+                    f"SELECT {names} FROM claim_resources WHERE claim_id = $1"
+                )
+                prepared.add(name)
+            return conn.execute(
+                text(f"EXECUTE {name} (:claim_id)"), {"claim_id": claim_id}
+            ).first()
+
+    def get(self, claim_id: str):
+        row = self._lookup(_LOOKUP, [ClaimResource.resource], claim_id)
+        return row[0] if row else None
+
+    def encode(self, claim_id: str, claim: dict) -> bytes:
+        # Every get() decodes a new dict, so the identity-keyed cache would
+        # only miss and evict bodies that do hit
+        return dumps(claim)
+
+    def get_json(self, claim_id: str):
+        # The database renders the text itself; no Python-side decode/encode
+        row = self._lookup(_JSON_LOOKUP, [cast(ClaimResource.resource, Text)], claim_id)
+        return row[0].encode() if row else None
+
+    def fingerprint(self, claim_id: str):
+        if not self._postgres:
+            return super().fingerprint(claim_id)
+        # jsonb text is canonical (sorted keys, no duplicates), so its md5 is a content hash
+        row = self._lookup(
+            _FINGERPRINT_LOOKUP, [func.md5(cast(ClaimResource.resource, Text))], claim_id
+        )
+        return row[0] if row else None
+
+    def get_summary(self, claim_id: str):
+        row = self._lookup(
+            _SUMMARY_LOOKUP,
+            [ClaimResource.summary, ClaimResource.summary_ref_version],
+            claim_id,
+        )
+        return (row[0], row[1]) if row and row[0] is not None else None
+
+    async def aget(self, claim_id: str):
+        if self.async_engine is None:
+            return await super().aget(claim_id)
+        async with self.async_engine.connect() as conn:
+            result = await conn.execute(
+                select(ClaimResource.resource).where(ClaimResource.claim_id == claim_id)
+            )
+            return result.scalar()
+
+    async def aget_summary(self, claim_id: str):
+        if self.async_engine is None:
+            return await super().aget_summary(claim_id)
+        async with self.async_engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    select(ClaimResource.summary, ClaimResource.summary_ref_version).where(
+                        ClaimResource.claim_id == claim_id
+                    )
+                )
+            ).first()
+        return (row[0], row[1]) if row and row[0] is not None else None
+
+    def list_ids(self, after: str = None, limit: int = None) -> list:
+        query = select(ClaimResource.claim_id).order_by(ClaimResource.claim_id)
+        if after is not None:
+            query = query.where(ClaimResource.claim_id > after)
+        if limit is not None:
+            query = query.limit(limit)
+        with self.engine.connect() as conn:
+            return list(conn.execute(query).scalars())
+
+    @staticmethod
+    def _filtered(query, claim_filter: ClaimFilter, after: str = None):
+        for column, op, wanted in claim_filter.predicates():
+            column = getattr(ClaimResource, column)
+            query = query.where(
+                column == wanted if op == "eq" else column >= wanted if op == "ge" else column <= wanted
+            )
+        if after is not None:
+            query = query.where(ClaimResource.claim_id > after)
+        return query.order_by(ClaimResource.claim_id)
+
+    def find_ids(self, claim_filter: ClaimFilter, after: str = None, limit: int = None) -> list:
+        query = self._filtered(select(ClaimResource.claim_id), claim_filter, after)
+        if limit is not None:
+            query = query.limit(limit)
+        with self.engine.connect() as conn:
+            return list(conn.execute(query).scalars())
+
+    def find_by_codes(
+        self, query: AdjustmentQuery, claim_filter: ClaimFilter, after: str = None, limit: int = None
+    ) -> list:
+        if not self._postgres:
+            return self._scan_by_codes(query, claim_filter, after, limit)
+        resource = type_coerce(ClaimResource.resource, JSONB)
+        stmt = self._filtered(select(ClaimResource.claim_id), claim_filter, after).where(
+            *(
+                or_(
+                    resource.contains({"adjudication": [shape]}),
+                    resource.contains({"item": [{"adjudication": [shape]}]}),
+                )
+                for shape in query.containments()
+            )
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        with self.engine.connect() as conn:
+            return list(conn.execute(stmt).scalars())
+
+    def _scan_by_codes(self, query: AdjustmentQuery, claim_filter: ClaimFilter, after, limit, batch_size=1000):
+        # No jsonb containment outside Postgres (local SQLite runs): check each
+        # filtered row in Python, in keyset batches
+        keys = set(query.keys())
+        found = []
+        while limit is None or len(found) < limit:
+            stmt = self._filtered(
+                select(ClaimResource.claim_id, ClaimResource.resource), claim_filter, after
+            ).limit(batch_size)
+            with self.engine.connect() as conn:
+                batch = conn.execute(stmt).all()
+            for claim_id, resource in batch:
+                if keys <= adjustment_keys(resource):
+                    found.append(claim_id)
+            if len(batch) < batch_size:
+                break
+            after = batch[-1][0]
+        return found[:limit] if limit is not None else found
+
+    def get_many(self, claim_ids: list) -> list:
+        if not claim_ids:
+            return []
+        with self.engine.connect() as conn:
+            rows = dict(
+                conn.execute(
+                    select(ClaimResource.claim_id, ClaimResource.resource).where(
+                        ClaimResource.claim_id.in_(claim_ids)
+                    )
+                ).all()
+            )
+        return [rows.get(claim_id) for claim_id in claim_ids]
+
+    def count(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(ClaimResource)).scalar()
+
+    def put_many(self, resources: list, overwrite: bool = True) -> int:
+        rows = [
+            {
+                "claim_id": _extract_uc_id(r),
+                "fhir_id": r.get("id"),
+                "resource": r,
+                **dict(zip(INDEX_COLUMNS, index_values(r))),
+                "index_version": INDEX_VERSION,
+            }
+            for r in resources
+        ]
+        if not rows:
+            return 0
+        insert = pg_insert if self._postgres else sqlite_insert
+        stmt = insert(ClaimResource)
+        if overwrite:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ClaimResource.claim_id],
+                set_={
+                    "fhir_id": stmt.excluded.fhir_id,
+                    "resource": stmt.excluded.resource,
+                    "updated_at": func.now(),
+                    "summary": None,
+                    "summary_ref_version": None,
+                    **{c: stmt.excluded[c] for c in _INDEXED},
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[ClaimResource.claim_id])
+        with self.engine.begin() as conn:
+            written = conn.execute(stmt, rows).rowcount
+        if overwrite:
+            # Without overwrite we can't tell which rows were kept
+            self._written([(row["claim_id"], row["resource"]) for row in rows])
+        return written
+
+    def put_rows(self, rows: list, method: str = "copy") -> int:
+        if not rows:
+            return 0
+        if method == "copy" and self._postgres and self.engine.dialect.driver in _COPY_DRIVERS:
+            written = self._copy_rows(rows)
+        else:
+            if method == "copy" and self._postgres and not self._copy_unavailable_logged:
+                logger.warning(
+                    f"COPY isn't supported on the {self.engine.dialect.driver} driver; "
+                    "ingesting with batched INSERTs (use postgresql:// or postgresql+psycopg://)"
+                )
+                self._copy_unavailable_logged = True
+            written = self._insert_rows(rows)
+        if self._write_listeners:
+            self._written([(row[0], json.loads(row[2])) for row in rows])
+        return written
+
+    def _insert_rows(self, rows: list) -> int:
+        resource = "CAST(:resource AS JSONB)" if self._postgres else ":resource"
+        stmt = text(
+            f"INSERT INTO claim_resources (claim_id, fhir_id, resource, {_INDEXED_LIST}) "
+            f"VALUES (:claim_id, :fhir_id, {resource}, {', '.join(':' + c for c in _INDEXED)}) "
+            "ON CONFLICT (claim_id) DO UPDATE SET fhir_id = excluded.fhir_id, "
+            "resource = excluded.resource, updated_at = CURRENT_TIMESTAMP, "
+            f"summary = NULL, summary_ref_version = NULL, {_INDEXED_UPDATE}"
+        )
+        params = [
+            {
+                "claim_id": c,
+                "fhir_id": f,
+                "resource": r,
+                **dict(zip(INDEX_COLUMNS, values)),
+                "index_version": INDEX_VERSION,
+            }
+            for c, f, r, *values in rows
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(stmt, params)
+        return len(rows)
+
+    def _copy_rows(self, rows: list) -> int:
+        # COPY can't upsert, so stream into a temp table and merge from there;
+        # DISTINCT ON keeps the last copy of an ID repeated within the batch
+        with self.engine.begin() as conn, conn.connection.driver_connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE claim_resources_stage "
+                "(seq bigserial, claim_id text, fhir_id text, resource jsonb, "
+                "disposition text, outcome text, service_start text, service_end text, "
+                "payment_date text, billed_amount float8, paid_amount float8, drg_code text, "
+                "index_version integer) ON COMMIT DROP"
+            )
+            copy_sql = f"COPY claim_resources_stage (claim_id, fhir_id, resource, {_INDEXED_LIST}) FROM STDIN"
+            if self.engine.dialect.driver == "psycopg":
+                with cursor.copy(copy_sql) as copy:
+                    for row in rows:
+                        copy.write_row((*row, INDEX_VERSION))
+            else:
+                # psycopg2 (the driver plain postgresql:// URLs get) reads COPY
+                # data from a file; one batch of rows is already in memory
+                cursor.copy_expert(
+                    copy_sql, io.StringIO("".join(_copy_line((*row, INDEX_VERSION)) for row in rows))
+                )
+            cursor.execute(
+                f"INSERT INTO claim_resources (claim_id, fhir_id, resource, {_INDEXED_LIST}) "
+                f"SELECT DISTINCT ON (claim_id) claim_id, fhir_id, resource, {_INDEXED_LIST} "
+                "FROM claim_resources_stage ORDER BY claim_id, seq DESC "
+                "ON CONFLICT (claim_id) DO UPDATE SET fhir_id = excluded.fhir_id, "
+                "resource = excluded.resource, updated_at = now(), "
+                f"summary = NULL, summary_ref_version = NULL, {_INDEXED_UPDATE}"
+            )
+            return cursor.rowcount
+
+    def put_summaries(self, entries: list) -> int:
+        if not entries:
+            return 0
+        stmt = (
+            update(ClaimResource)
+            .where(ClaimResource.claim_id == bindparam("target"))
+            .values(summary=bindparam("built"), summary_ref_version=bindparam("version"))
+        )
+        params = [
+            {"target": claim_id, "built": summary, "version": ref_version}
+            for claim_id, summary, ref_version in entries
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(stmt, params)
+        return len(entries)
+
+    @staticmethod
+    def _unmaterialized(ref_version, everything: bool):
+        if everything:
+            return []
+        return [
+            or_(
+                ClaimResource.summary.is_(None),
+                ClaimResource.summary_ref_version.is_distinct_from(ref_version),
+            )
+        ]
+
+    def iter_unmaterialized(self, ref_version, batch_size: int, everything: bool = False):
+        after = ""
+        while True:
+            query = (
+                select(ClaimResource.claim_id, ClaimResource.resource)
+                .where(ClaimResource.claim_id > after, *self._unmaterialized(ref_version, everything))
+                .order_by(ClaimResource.claim_id)
+                .limit(batch_size)
+            )
+            with self.engine.connect() as conn:
+                batch = [tuple(row) for row in conn.execute(query)]
+            if not batch:
+                return
+            yield batch
+            after = batch[-1][0]
+
+    def count_unmaterialized(self, ref_version, everything: bool = False) -> int:
+        query = (
+            select(func.count())
+            .select_from(ClaimResource)
+            .where(*self._unmaterialized(ref_version, everything))
+        )
+        with self.engine.connect() as conn:
+            return conn.execute(query).scalar()
+
+
+def _build_repository() -> ClaimRepository:
+    if CLAIM_STORE == "postgres":
+        return PostgresClaimRepository(engine, async_engine)
+    return InMemoryClaimRepository()
+
+
+claim_repository = _build_repository()
@@ -0,0 +1,160 @@
+"""
+Search claims by adjustment codes: CARC and RARC reason codes and the
+adjudication category/group code (CO, PR, OA, ... or value codes such as
+"benefit"), resolved the way _process_adjudication_list resolves them.
+
+Stores answer the coarse question - which claims carry these codes at all -
+from an index (ClaimIndex postings in memory, a jsonb_path_ops GIN index on
+Postgres). The exact match, with the group on the same adjudication as the
+reason code, is then checked on the parsed claim, which also yields the line
+positions and amounts.
+
+An adjudication has one reason code, so a CARC and an RARC never share one:
+asking for both means the claim carries both, each on its own adjudication.
+"""
+
+from dataclasses import dataclass
+
+from app.eob import _first_coding, parse_eob
+
+_RARC_MARKER = "remittance-advice-remark-codes"
+
+
+def _reason_type(system: str) -> str:
+    return "RARC" if _RARC_MARKER in system else "CARC"
+
+
+def _raw_adjudications(claim: dict):
+    yield from claim.get("adjudication", ())
+    for item in claim.get("item", ()):
+        yield from item.get("adjudication", ())
+
+
+def adjustment_keys(claim: dict) -> set:
+    """("CARC"|"RARC"|"group", code) for every code on the claim's adjudications"""
+    keys = set()
+    for adj in _raw_adjudications(claim):
+        category = _first_coding(adj.get("category")).get("code")
+        if category:
+            keys.add(("group", category))
+        reason = _first_coding(adj.get("reason"))
+        if reason.get("code"):
+            keys.add((_reason_type(reason.get("system", "")), reason["code"]))
+    return keys
+
+
+@dataclass
+class AdjustmentQuery:
+    """
+    Codes a matching claim carries; None means "any". Each reason code must
+    sit on an adjudication of its own, and `group` on the same adjudication
+    as each reason code given (or on any adjudication, when none is).
+    """
+
+    carc: str | None = None
+    rarc: str | None = None
+    group: str | None = None
+
+    def keys(self) -> list:
+        return [
+            (kind, code)
+            for kind, code in (("CARC", self.carc), ("RARC", self.rarc), ("group", self.group))
+            if code is not None
+        ]
+
+    def _reasons(self) -> list:
+        """(kind, code) per reason code given, or [None] for a group-only query"""
+        reasons = [
+            (kind, code) for kind, code in (("CARC", self.carc), ("RARC", self.rarc)) if code is not None
+        ]
+        return reasons or [None]
+
+    def matches(self, adj) -> bool:
+        """Whether `adj` satisfies one of the query's reason codes (with its group)"""
+        if self.group is not None and adj.category_code != self.group:
+            return False
+        return any(
+            reason is None
+            or (adj.reason_code == reason[1] and _reason_type(adj.reason_system) == reason[0])
+            for reason in self._reasons()
+        )
+
+    def satisfied_by(self, adjustments: list) -> bool:
+        """Whether the matching `adjustments` of one claim cover every reason code"""
+        return all(
+            any(reason is None or (a["reason_type"], a["reason_code"]) == reason for a in adjustments)
+            for reason in self._reasons()
+        )
+
+    def containments(self) -> list:
+        """
+        Adjudication shapes a matching claim contains, one per reason code,
+        for jsonb @>; the claim must contain all of them
+        """
+        shapes = []
+        for reason in self._reasons():
+            shape = {}
+            if self.group is not None:
+                shape["category"] = {"coding": [{"code": self.group}]}
+            if reason is not None:
+                shape["reason"] = {"coding": [{"code": reason[1]}]}
+            shapes.append(shape)
+        return shapes
+
+    def as_dict(self) -> dict:
+        return {kind.lower(): code for kind, code in self.keys()}
+
+
+def matching_adjustments(claim_id: str, claim: dict, query: AdjustmentQuery) -> list:
+    """The claim's adjudications matching `query`; line is None for header-level ones"""
+    # Parsed directly: a search scans many claims once, which would only churn parsed_claims
+    eob = parse_eob(claim)
+    found = []
+
+    def collect(line, service, adjudications):
+        for adj in adjudications:
+            if query.matches(adj):
+                found.append(
+                    {
+                        "line": line,
+                        "service": service,
+                        "group": adj.category_code,
+                        "reason_type": _reason_type(adj.reason_system) if adj.reason_code else None,
+                        "reason_code": adj.reason_code,
+                        "amount": adj.amount,
+                    }
+                )
+
+    collect(None, None, eob.adjustments)
+    for position, item in enumerate(eob.items, 1):
+        collect(position, item.service, item.adjudications)
+    return found if query.satisfied_by(found) else []
+
+
+def find_adjustments(repository, query: AdjustmentQuery, claim_filter, after: str = None, limit: int = 100):
+    """
+    One page of claims with adjudications matching `query`, in claim ID
+    order: ([{claim_id, adjustments, total_amount}], next_cursor)
+    """
+    results = []
+    cursor = after
+    # Candidates may carry the group apart from the reason code, so keep
+    # reading until one match past the page proves there is a next page
+    while len(results) <= limit:
+        wanted = limit + 1 - len(results)
+        ids = repository.find_by_codes(query, claim_filter, after=cursor, limit=wanted)
+        for claim_id, claim in zip(ids, repository.get_many(ids)):
+            adjustments = matching_adjustments(claim_id, claim, query) if claim else []
+            if adjustments:
+                results.append(
+                    {
+                        "claim_id": claim_id,
+                        "adjustments": adjustments,
+                        "total_amount": sum(a["amount"] for a in adjustments),
+                    }
+                )
+        if len(ids) < wanted:
+            break
+        cursor = ids[-1]
+    page = results[:limit]
+    return page, page[-1]["claim_id"] if len(results) > limit else None
@@ -0,0 +1,41 @@
+import hashlib
+import os
+
+from fastapi import Request, Response
+
+# Claim bodies carry PHI, so shared caches must not store them by default;
+# "no-cache" still lets the browser keep a copy and revalidate with If-None-Match
+CLAIM_CACHE_CONTROL = os.getenv("CLAIM_CACHE_CONTROL", "private, no-cache")
+
+
+def strong_etag(*parts) -> str:
+    """A strong ETag over the given version parts"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def cache_headers(etag: str) -> dict:
+    headers = {"ETag": etag}
+    if CLAIM_CACHE_CONTROL:
+        headers["Cache-Control"] = CLAIM_CACHE_CONTROL
+    return headers
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    True if If-None-Match already names this representation. If-None-Match
+    uses the weak comparison (RFC 9110 13.1.2), so a W/ prefix still matches.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
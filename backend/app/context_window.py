@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+
+from langchain_core.messages import (
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+
+# Prompt budget for everything except the current turn, which is always sent
+CONTEXT_MAX_TOKENS = int(os.getenv("CHAT_CONTEXT_MAX_TOKENS", "6000"))
+# Replace tool payloads from earlier turns with a one-line reference
+CONTEXT_COMPACT_TOOL_RESULTS = (
+    os.getenv("CHAT_CONTEXT_COMPACT_TOOL_RESULTS", "true").lower() == "true"
+)
+# Fold turns that fall outside the budget into a running summary (extra LLM call)
+CONTEXT_SUMMARIZE = os.getenv("CHAT_CONTEXT_SUMMARIZE", "false").lower() == "true"
+
+# Tag on the summarizer's model calls so /chat doesn't stream them to the user
+SUMMARY_TAG = "context-summary"
+
+SUMMARY_PROMPT = """Summarize this earlier part of a claims-assistance conversation in a few sentences.
+Keep claim IDs, amounts, denial/adjustment codes and any open questions. Do not add anything new.
+
+Existing summary:
+{summary}
+
+New messages:
+{transcript}"""
+
+
+class ContextStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.full_tokens = 0
+        self.sent_tokens = 0
+        self.tool_results_compacted = 0
+        self.messages_dropped = 0
+        self.summaries = 0
+        self.model_calls = 0
+        self.model_latency_ms = 0.0
+
+    def record(self, full: int, sent: int, compacted: int, dropped: int):
+        with self._lock:
+            self.prompts += 1
+            self.full_tokens += full
+            self.sent_tokens += sent
+            self.tool_results_compacted += compacted
+            self.messages_dropped += dropped
+
+    def record_latency(self, elapsed_ms: float):
+        with self._lock:
+            self.model_calls += 1
+            self.model_latency_ms += elapsed_ms
+
+    def record_summary(self):
+        with self._lock:
+            self.summaries += 1
+
+    def stats(self) -> dict:
+        saved = self.full_tokens - self.sent_tokens
+        avg_latency = self.model_latency_ms / self.model_calls if self.model_calls else None
+        ms_per_token = (
+            self.model_latency_ms / self.sent_tokens if self.sent_tokens else None
+        )
+        return {
+            "max_tokens": CONTEXT_MAX_TOKENS,
+            "compact_tool_results": CONTEXT_COMPACT_TOOL_RESULTS,
+            "summarize": CONTEXT_SUMMARIZE,
+            "prompts": self.prompts,
+            "avg_prompt_tokens_full": round(self.full_tokens / self.prompts) if self.prompts else None,
+            "avg_prompt_tokens_sent": round(self.sent_tokens / self.prompts) if self.prompts else None,
+            "prompt_tokens_saved": saved,
+            "tool_results_compacted": self.tool_results_compacted,
+            "messages_dropped": self.messages_dropped,
+            "summaries": self.summaries,
+            "avg_model_latency_ms": round(avg_latency, 1) if avg_latency else None,
+            # Observed model latency per prompt token, applied to the tokens we
+            # didn't send - an estimate, since the untrimmed call never happens
+            "est_latency_saved_ms_per_prompt": (
+                round(ms_per_token * saved / self.prompts, 1)
+                if ms_per_token and self.prompts
+                else None
+            ),
+        }
+
+
+context_stats = ContextStats()
+
+
+def _compact(message: ToolMessage) -> ToolMessage:
+    claim_id = None
+    try:
+        claim_id = json.loads(message.content).get("claim_id")
+    except (TypeError, ValueError, AttributeError):
+        pass
+    subject = f" for claim {claim_id}" if claim_id else ""
+    return ToolMessage(
+        content=(
+            f"[Earlier {message.name or 'tool'} result{subject} omitted to save "
+            "context. Call the tool again if you need its details.]"
+        ),
+        tool_call_id=message.tool_call_id,
+        name=message.name,
+        id=message.id,
+    )
+
+
+def _split_current_turn(messages: list):
+    """(history, current turn) - the current turn starts at the last human message"""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[:i], messages[i:]
+    return [], messages
+
+
+def system_message(system_prompt: str, summary: str = "") -> SystemMessage:
+    if summary:
+        system_prompt += f"\n\nSummary of the earlier conversation:\n{summary}"
+    return SystemMessage(content=system_prompt)
+
+
+def build_context(messages: list, system_prompt: str, summary: str = ""):
+    """
+    Pick what the model sees this turn.
+
+    Returns (prompt messages, history messages that no longer fit the budget).
+    The current turn is always sent whole; older turns are compacted, then
+    dropped oldest-first at human-message boundaries so a tool result is
+    never separated from the call that produced it.
+    """
+    messages = [m for m in messages if not isinstance(m, SystemMessage)]
+    history, current = _split_current_turn(messages)
+
+    compacted = 0
+    if CONTEXT_COMPACT_TOOL_RESULTS:
+        compact_history = []
+        for m in history:
+            if isinstance(m, ToolMessage):
+                m = _compact(m)
+                compacted += 1
+            compact_history.append(m)
+        history = compact_history
+
+    system = system_message(system_prompt, summary)
+
+    fixed = count_tokens_approximately([system, *current])
+    budget = max(0, CONTEXT_MAX_TOKENS - fixed)
+    kept = (
+        trim_messages(
+            history,
+            max_tokens=budget,
+            token_counter=count_tokens_approximately,
+            strategy="last",
+            start_on="human",
+        )
+        if history
+        else []
+    )
+    kept_ids = {id(m) for m in kept}
+    dropped = [m for m in history if id(m) not in kept_ids]
+
+    context = [system, *kept, *current]
+    full = count_tokens_approximately([SystemMessage(content=system_prompt), *messages])
+    context_stats.record(full, count_tokens_approximately(context), compacted, len(dropped))
+    return context, dropped
+
+
+async def summarize(model, summary: str, dropped: list) -> str:
+    """Fold dropped messages into the running summary"""
+    transcript = "\n".join(
+        f"{m.type}: {m.content}" for m in dropped if isinstance(m.content, str) and m.content
+    )
+    if not transcript:
+        return summary
+    response = await model.with_config(tags=[SUMMARY_TAG]).ainvoke(
+        [
+            HumanMessage(
+                content=SUMMARY_PROMPT.format(summary=summary or "(none)", transcript=transcript)
+            )
+        ]
+    )
+    context_stats.record_summary()
+    return response.content
+
+
+def removals(dropped: list) -> list:
+    """State updates that delete summarized messages from the thread"""
+    return [RemoveMessage(id=m.id) for m in dropped if m.id]
@@ -1,21 +1,66 @@
 import os
+from contextlib import contextmanager
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.pool_metrics import PoolMetrics, instrument_engine, instrumented_pool_class
 
 # Get the address of the database from docker credentials
 # We use f-strings to build the connection string securely
-DATABASE_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@db:5432/{os.getenv('POSTGRES_DB')}"
+DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@db:5432/{os.getenv('POSTGRES_DB')}"
+
+# Pool sizing - tune these against /system/pool under real traffic
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+}
 
 # Create the Engine (The Connection Pool)
 # This sits globally in memory and manages connections
-engine = create_engine(DATABASE_URL)
+pool_metrics = PoolMetrics("sync")
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=instrumented_pool_class(QueuePool, pool_metrics),
+    **POOL_OPTIONS,
+)
+instrument_engine(engine, pool_metrics)
 
 # Create the SessionFactory
 # When a user request comes in, we ask this factory: "Give me a session"
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional async path
+# DB_MODE=async switches the claim routes and the agent tool onto an asyncpg
+# engine; the sync engine stays around for startup jobs and batch routes.
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+USE_ASYNC_DB = DB_MODE == "async"
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+async_pool_metrics = PoolMetrics("async") if USE_ASYNC_DB else None
+async_engine = (
+    create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, async_pool_metrics),
+        **POOL_OPTIONS,
+    )
+    if USE_ASYNC_DB
+    else None
+)
+if USE_ASYNC_DB:
+    instrument_engine(async_engine.sync_engine, async_pool_metrics)
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if USE_ASYNC_DB
+    else None
+)
+
 # Create the Base Model
 # All our database tables (Models) will inherit from this class
 Base = declarative_base()
@@ -29,3 +74,19 @@ def get_db():
         yield db  # Provide the session to the route
     finally:
         db.close()  # GUARANTEE: Close it when the request is done
+
+
+# For work that runs outside a request (agent tool, startup jobs, streams)
+@contextmanager
+def session_scope():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Async twin of get_db, only wired up when DB_MODE=async
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
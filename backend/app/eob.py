@@ -0,0 +1,234 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+
+EOB_CACHE_MAX_ENTRIES = int(os.getenv("EOB_CACHE_MAX_ENTRIES", "1024"))
+
+# Shared stand-in for absent FHIR elements, so missing fields cost no allocation
+_ABSENT = MappingProxyType({})
+
+_ADMITTING_TYPES = ("principal", "Admitting Diagnosis")
+
+
+def _first_coding(concept) -> dict:
+    """First Coding of a CodeableConcept, or an empty mapping"""
+    if concept:
+        coding = concept.get("coding")
+        if coding:
+            return coding[0]
+    return _ABSENT
+
+
+@dataclass(slots=True)
+class Adjudication:
+    amount: float
+    category_code: str | None
+    reason_code: str | None
+    reason_system: str
+
+
+@dataclass(slots=True)
+class Diagnosis:
+    code: str | None
+    description: str
+    type: str
+
+    @property
+    def is_primary(self) -> bool:
+        return self.type in _ADMITTING_TYPES
+
+
+@dataclass(slots=True)
+class LineItem:
+    service: str
+    adjudications: tuple
+
+
+@dataclass(slots=True)
+class ExplanationOfBenefit:
+    """
+    The parts of a FHIR ExplanationOfBenefit the claim summary reads,
+    flattened once so the builder never walks the raw resource.
+    """
+
+    fhir_id: str | None
+    patient_name: str
+    disposition: str
+    outcome: str
+    payment_date: str
+    service_start: str | None
+    service_end: str | None
+    billed_amount: float
+    paid_amount: float
+    drg_code: str | None
+    diagnoses: tuple
+    adjustments: tuple  # header-level adjudications
+    items: tuple
+
+    def adjudications(self):
+        """Header and line-level adjudications, in document order"""
+        yield from self.adjustments
+        for item in self.items:
+            yield from item.adjudications
+
+    def category_total(self, category_code: str) -> float:
+        """Sum of the header adjustments in one category, e.g. PR (patient) or CO (write-off)"""
+        return sum(a.amount for a in self.adjustments if a.category_code == category_code)
+
+    def codes(self) -> set:
+        """Every category and reason code the summary will look up"""
+        codes = set()
+        for adj in self.adjudications():
+            if adj.category_code:
+                codes.add(adj.category_code)
+            if adj.reason_code:
+                codes.add(adj.reason_code)
+        return codes
+
+
+def _parse_adjudications(raw: list) -> tuple:
+    parsed = []
+    for adj in raw:
+        reason = _first_coding(adj.get("reason"))
+        parsed.append(
+            Adjudication(
+                (adj.get("amount") or _ABSENT).get("value", 0.0),
+                _first_coding(adj.get("category")).get("code"),
+                reason.get("code"),
+                reason.get("system", ""),
+            )
+        )
+    return tuple(parsed)
+
+
+def _parse_diagnoses(raw: list):
+    diagnoses = []
+    drg_code = None
+    drg_found = False
+    for diag in raw:
+        coding = _first_coding(diag.get("diagnosisCodeableConcept"))
+        diag_type = "Unknown"
+        if diag.get("type"):
+            diag_type = _first_coding(diag["type"][0]).get("display", "Unknown")
+        diagnoses.append(Diagnosis(coding.get("code"), coding.get("display", "Unknown"), diag_type))
+        # The DRG is the package code on the first diagnosis that carries one
+        if not drg_found and diag.get("packageCode"):
+            drg_code = _first_coding(diag["packageCode"]).get("code")
+            drg_found = True
+    return tuple(diagnoses), drg_code
+
+
+def _parse_items(raw: list) -> tuple:
+    items = []
+    for item in raw:
+        service = "Unknown Service"
+        product = item.get("productOrService")
+        revenue = item.get("revenue")
+        if product and product.get("coding"):
+            service = product["coding"][0].get("display", service)
+        elif revenue and revenue.get("coding"):
+            service = f"Revenue Code {revenue['coding'][0].get('code', '???')}"
+        items.append(LineItem(service, _parse_adjudications(item.get("adjudication", ()))))
+    return tuple(items)
+
+
+def parse_totals(claim: dict):
+    """(billed, paid) from the first "submitted" and "benefit" totals, 0.0 if absent"""
+    billed = paid = None
+    for total in claim.get("total", ()):
+        code = _first_coding(total.get("category")).get("code")
+        if code == "submitted" and billed is None:
+            billed = total["amount"]["value"]
+        elif code == "benefit" and paid is None:
+            paid = total["amount"]["value"]
+    return 0.0 if billed is None else billed, 0.0 if paid is None else paid
+
+
+def parse_drg(claim: dict):
+    """The DRG: package code on the first diagnosis that carries one"""
+    for diag in claim.get("diagnosis", ()):
+        if diag.get("packageCode"):
+            return _first_coding(diag["packageCode"]).get("code")
+    return None
+
+
+def parse_eob(claim: dict) -> ExplanationOfBenefit:
+    """Parse a raw ExplanationOfBenefit resource in a single pass"""
+    billed, paid = parse_totals(claim)
+    period = claim.get("billablePeriod") or _ABSENT
+    diagnoses, drg_code = _parse_diagnoses(claim.get("diagnosis", ()))
+    return ExplanationOfBenefit(
+        fhir_id=claim.get("id"),
+        patient_name=claim.get("patient", _ABSENT).get("display", "Unknown"),
+        disposition=claim.get("disposition", "Not specified"),
+        outcome=claim.get("outcome", "unknown"),
+        payment_date=claim.get("payment", _ABSENT).get("date", "Pending"),
+        service_start=period.get("start"),
+        service_end=period.get("end"),
+        billed_amount=billed,
+        paid_amount=paid,
+        drg_code=drg_code,
+        diagnoses=diagnoses,
+        adjustments=_parse_adjudications(claim.get("adjudication", ())),
+        items=_parse_items(claim.get("item", ())),
+    )
+
+
+class ParsedClaimCache:
+    """
+    LRU of parsed claims keyed by claim ID and content fingerprint, like
+    SummaryCache, so an updated claim is always re-parsed and a store that
+    builds a fresh dict per read (Postgres) still hits.
+
+    Only callers that already hold a fingerprint use it: hashing a resource
+    costs far more than parsing it, and bulk passes over the store (exports,
+    materialization, code search) call parse_eob directly so they don't
+    evict the claims the API is serving.
+    """
+
+    def __init__(self, max_entries: int = EOB_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # claim_id -> (fingerprint, parsed claim)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, claim_id: str, fingerprint: str, claim: dict) -> ExplanationOfBenefit:
+        if self.max_entries <= 0:
+            return parse_eob(claim)
+        with self._lock:
+            entry = self._entries.get(claim_id)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(claim_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        eob = parse_eob(claim)
+        with self._lock:
+            self._entries[claim_id] = (fingerprint, eob)
+            self._entries.move_to_end(claim_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return eob
+
+    def clear(self) -> int:
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+        return dropped
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+parsed_claims = ParsedClaimCache()
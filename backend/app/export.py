@@ -0,0 +1,433 @@
+"""
+Columnar export of claim summaries for finance analytics.
+
+Flattens what get_claim_summary produces into three tables - claims, line
+items and adjudications - and writes them as Parquet or Arrow IPC files.
+Claims are read from the store in ID order a batch at a time and rows are
+flushed one row group at a time, so memory is bounded by the row group size
+whatever the number of claims.
+
+Summaries can also be dumped whole as NDJSON, one per line, from a
+generator over the same batches; every line carries its claim_id, which is
+the cursor to resume from after an interrupted export.
+
+    cd backend
+    python -m app.export exports/ --payment-from 2025-01-01 --payment-to 2025-03-31 \\
+        --columns adjudications=claim_id,reason_code,amount
+    python -m app.export exports/ --format ndjson --gzip --after 1000004242
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.claim_index import ClaimFilter
+from app.json_encoding import dumps
+
+logger = logging.getLogger("claims-api.export")
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "50000"))
+EXPORT_PARQUET_COMPRESSION = os.getenv("EXPORT_PARQUET_COMPRESSION", "zstd")
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+MEDIA_TYPES = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.file"}
+
+SCHEMAS = {
+    "claims": pa.schema(
+        [
+            ("claim_id", pa.string()),
+            ("fhir_id", pa.string()),
+            ("patient_name", pa.string()),
+            ("claim_status", pa.string()),
+            ("processing_status", pa.string()),
+            ("payment_date", pa.date32()),
+            ("service_start", pa.date32()),
+            ("service_end", pa.date32()),
+            ("billed_amount", pa.float64()),
+            ("paid_amount", pa.float64()),
+            ("patient_responsibility", pa.float64()),
+            ("contractual_writeoff", pa.float64()),
+            ("primary_diagnosis", pa.string()),
+            ("drg_code", pa.string()),
+            ("diagnosis_count", pa.int32()),
+            ("line_count", pa.int32()),
+        ]
+    ),
+    "line_items": pa.schema(
+        [
+            ("claim_id", pa.string()),
+            ("line", pa.int32()),
+            ("service", pa.string()),
+            ("adjudication_count", pa.int32()),
+        ]
+    ),
+    "adjudications": pa.schema(
+        [
+            ("claim_id", pa.string()),
+            ("line", pa.int32()),  # null for header-level adjudications
+            ("amount", pa.float64()),
+            ("currency", pa.string()),
+            ("category_code", pa.string()),
+            ("category_label", pa.string()),
+            ("financial_responsibility", pa.string()),
+            ("reason_type", pa.string()),
+            ("reason_code", pa.string()),
+            ("description", pa.string()),
+            ("action_needed", pa.string()),
+        ]
+    ),
+}
+TABLES = tuple(SCHEMAS)
+
+# Left out unless include_pii, as services.redact_pii does for summaries
+_PII_COLUMNS = {"claims": ("fhir_id", "patient_name")}
+
+
+def _date(value):
+    # FHIR date/dateTime -> date; "Pending" and anything else unparseable -> null
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            pass
+    return None
+
+
+def flatten(summary: dict):
+    """(claims row, [line item rows], [adjudication rows]) for one summary"""
+    claim_id = summary["claim_id"]
+    period = summary["service_period"]
+    claim = {
+        "claim_id": claim_id,
+        "fhir_id": summary["fhir_id"],
+        "patient_name": summary["patient_name"],
+        "claim_status": summary["claim_status"],
+        "processing_status": summary["processing_status"],
+        "payment_date": _date(summary["payment_date"]),
+        "service_start": _date(period["start"]),
+        "service_end": _date(period["end"]),
+        "billed_amount": summary["billed_amount"],
+        "paid_amount": summary["paid_amount"],
+        "patient_responsibility": summary["patient_responsibility"],
+        "contractual_writeoff": summary["contractual_writeoff"],
+        "primary_diagnosis": summary["primary_diagnosis"],
+        "drg_code": summary["drg_code"],
+        "diagnosis_count": len(summary["diagnoses"]),
+        "line_count": len(summary["line_items"]),
+    }
+    lines = []
+    adjudications = [dict(adj, claim_id=claim_id, line=None) for adj in summary["adjustments"]]
+    for position, item in enumerate(summary["line_items"], 1):
+        lines.append(
+            {
+                "claim_id": claim_id,
+                "line": position,
+                "service": item["service"],
+                "adjudication_count": len(item["adjudications"]),
+            }
+        )
+        adjudications.extend(dict(adj, claim_id=claim_id, line=position) for adj in item["adjudications"])
+    return claim, lines, adjudications
+
+
+def projected_schema(table: str, columns: list = None, include_pii: bool = False) -> pa.Schema:
+    """The table's schema cut down to `columns` (all by default), minus PII unless asked"""
+    schema = SCHEMAS[table]
+    hidden = () if include_pii else _PII_COLUMNS.get(table, ())
+    if not columns:
+        return pa.schema([f for f in schema if f.name not in hidden])
+    unknown = [c for c in columns if c not in schema.names]
+    if unknown:
+        raise ValueError(f"Unknown {table} columns: {', '.join(unknown)}")
+    withheld = [c for c in columns if c in hidden]
+    if withheld:
+        raise ValueError(f"{', '.join(withheld)} need include_pii")
+    return pa.schema([schema.field(c) for c in columns])
+
+
+class _TableWriter:
+    """Buffers rows as columns and writes one row group per `row_group_size` rows"""
+
+    def __init__(self, path: str, schema: pa.Schema, fmt: str, row_group_size: int):
+        self.schema = schema
+        self.fmt = fmt
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self.row_groups = 0
+        self._buffer = {name: [] for name in schema.names}
+        self._buffered = 0
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, schema, compression=EXPORT_PARQUET_COMPRESSION)
+        else:
+            self._writer = pa.ipc.new_file(path, schema)
+
+    def extend(self, rows: list):
+        for name, values in self._buffer.items():
+            values.extend(row.get(name) for row in rows)
+        self._buffered += len(rows)
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffered:
+            return
+        table = pa.Table.from_pydict(self._buffer, schema=self.schema)
+        if self.fmt == "parquet":
+            self._writer.write_table(table, row_group_size=self._buffered)
+        else:
+            self._writer.write_table(table, max_chunksize=self._buffered)
+        self.rows += self._buffered
+        self.row_groups += 1
+        self._buffer = {name: [] for name in self.schema.names}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+
+@dataclass
+class ExportReport:
+    format: str
+    claims: int = 0
+    rows: dict = field(default_factory=dict)  # table -> rows written
+    row_groups: dict = field(default_factory=dict)
+    elapsed_s: float = 0.0
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self.rows.values())
+
+    @property
+    def rows_per_s(self) -> float:
+        return round(self.total_rows / self.elapsed_s, 1) if self.elapsed_s else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "format": self.format,
+            "claims": self.claims,
+            "rows": self.rows,
+            "row_groups": self.row_groups,
+            "elapsed_s": round(self.elapsed_s, 2),
+            "rows_per_s": self.rows_per_s,
+        }
+
+
+def iter_claim_batches(repository, claim_filter: ClaimFilter, batch_size: int, after: str = None):
+    """Stored claims matching the filter as batches of (claim_id, resource), in ID order"""
+    while True:
+        ids = repository.find_ids(claim_filter, after=after, limit=batch_size)
+        if not ids:
+            return
+        yield [(claim_id, claim) for claim_id, claim in zip(ids, repository.get_many(ids)) if claim]
+        after = ids[-1]
+
+
+def iter_summary_ndjson(
+    repository,
+    claim_filter: ClaimFilter = None,
+    include_pii: bool = False,
+    after: str = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+):
+    """
+    NDJSON summaries of every matching claim after `after`, in claim ID
+    order, as one chunk of lines per batch. Nothing is read ahead of the
+    consumer, so a slow reader holds the walk back instead of buffering it.
+    """
+    from app.services import build_summaries, redact_pii
+
+    for batch in iter_claim_batches(repository, claim_filter or ClaimFilter(), batch_size, after):
+        if batch:
+            summaries = (summary for _, summary in build_summaries(batch))
+            if not include_pii:
+                summaries = map(redact_pii, summaries)
+            yield b"".join(dumps(summary) + b"\n" for summary in summaries)
+
+
+def gzipped(chunks, level: int = 6):
+    """
+    Gzip a chunk stream incrementally. Each chunk is sync-flushed, so
+    whatever the client received before a drop decompresses to whole lines.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def export_ndjson(
+    path: str,
+    claim_filter: ClaimFilter = None,
+    include_pii: bool = False,
+    after: str = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    repository=None,
+    progress=None,
+) -> ExportReport:
+    """
+    Write summaries to an NDJSON file (gzipped if it ends in .gz). Resuming
+    with `after` appends to the file; appended gzip members read back as one.
+    """
+    if repository is None:
+        from app.claim_repository import claim_repository as repository
+
+    report = ExportReport(format="ndjson", rows={"summaries": 0})
+    start = time.perf_counter()
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "ab" if after else "wb") as out:
+        for chunk in iter_summary_ndjson(repository, claim_filter, include_pii, after, batch_size):
+            out.write(chunk)
+            report.claims += chunk.count(b"\n")
+            report.rows["summaries"] = report.claims
+            report.elapsed_s = time.perf_counter() - start
+            if progress:
+                progress(report)
+    report.elapsed_s = time.perf_counter() - start
+    logger.info(f"Exported {report.claims} summaries as NDJSON: {report.rows_per_s} rows/s")
+    return report
+
+
+def export_tables(
+    paths: dict,
+    fmt: str = "parquet",
+    claim_filter: ClaimFilter = None,
+    columns: dict = None,
+    include_pii: bool = False,
+    row_group_size: int = EXPORT_ROW_GROUP_SIZE,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    repository=None,
+    progress=None,
+) -> ExportReport:
+    """
+    Write the tables named in `paths` ({table: file path}) for every claim
+    matching `claim_filter`. `columns` ({table: [column, ...]}) projects
+    tables down; `progress`, if given, is called with the running report
+    after every batch of claims.
+    """
+    from app.services import build_summaries
+
+    if repository is None:
+        from app.claim_repository import claim_repository as repository
+    claim_filter = claim_filter or ClaimFilter()
+    columns = columns or {}
+    schemas = {table: projected_schema(table, columns.get(table), include_pii) for table in paths}
+
+    report = ExportReport(format=fmt)
+    start = time.perf_counter()
+    writers = {}
+    try:
+        for table, path in paths.items():
+            writers[table] = _TableWriter(path, schemas[table], fmt, row_group_size)
+        for batch in iter_claim_batches(repository, claim_filter, batch_size):
+            rows = {table: [] for table in TABLES}
+            for _, summary in build_summaries(batch):
+                claim, lines, adjudications = flatten(summary)
+                rows["claims"].append(claim)
+                rows["line_items"].extend(lines)
+                rows["adjudications"].extend(adjudications)
+            for table, writer in writers.items():
+                writer.extend(rows[table])
+                report.rows[table] = report.rows.get(table, 0) + len(rows[table])
+            report.claims += len(batch)
+            report.elapsed_s = time.perf_counter() - start
+            if progress:
+                progress(report)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    for table, writer in writers.items():
+        report.rows[table] = writer.rows
+        report.row_groups[table] = writer.row_groups
+    report.elapsed_s = time.perf_counter() - start
+    logger.info(
+        f"Exported {report.claims} claims ({report.total_rows} rows) as {fmt}: "
+        f"{report.rows_per_s} rows/s"
+    )
+    return report
+
+
+def _columns_arg(value: str):
+    table, _, names = value.partition("=")
+    if table not in SCHEMAS or not names:
+        raise argparse.ArgumentTypeError(f"expected TABLE=col,col with TABLE one of {', '.join(TABLES)}")
+    return table, [n.strip() for n in names.split(",") if n.strip()]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Export claim summaries as Parquet/Arrow tables or NDJSON")
+    parser.add_argument("directory", help="output directory, one file per table (summaries.ndjson for NDJSON)")
+    parser.add_argument("--format", choices=tuple(FORMATS) + ("ndjson",), default="parquet")
+    parser.add_argument("--tables", default=",".join(TABLES), help="comma-separated tables to write")
+    parser.add_argument("--columns", type=_columns_arg, action="append", default=[],
+                        metavar="TABLE=COL,COL", help="project a table to these columns (repeatable)")
+    parser.add_argument("--service-from", type=date.fromisoformat, help="billable period ends on/after")
+    parser.add_argument("--service-to", type=date.fromisoformat, help="billable period starts on/before")
+    parser.add_argument("--payment-from", type=date.fromisoformat)
+    parser.add_argument("--payment-to", type=date.fromisoformat)
+    parser.add_argument("--include-pii", action="store_true")
+    parser.add_argument("--row-group-size", type=int, default=EXPORT_ROW_GROUP_SIZE)
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    parser.add_argument("--gzip", action="store_true", help="NDJSON: write summaries.ndjson.gz")
+    parser.add_argument("--after", help="NDJSON: resume after this claim ID (the last line written)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(name)s | %(levelname)s | %(message)s")
+
+    tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+    unknown = sorted(set(tables) - set(TABLES))
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(unknown)}")
+    os.makedirs(args.directory, exist_ok=True)
+    if args.format == "ndjson":
+        paths = {"summaries": os.path.join(args.directory, "summaries.ndjson" + (".gz" if args.gzip else ""))}
+    else:
+        paths = {table: os.path.join(args.directory, table + FORMATS[args.format]) for table in tables}
+    claim_filter = ClaimFilter(
+        service_from=args.service_from and args.service_from.isoformat(),
+        service_to=args.service_to and args.service_to.isoformat(),
+        payment_from=args.payment_from and args.payment_from.isoformat(),
+        payment_to=args.payment_to and args.payment_to.isoformat(),
+    )
+
+    from app.claim_repository import claim_repository
+    from app.reference_cache import reference_cache
+
+    claim_repository.setup()
+    reference_cache.refresh()
+    last = [0.0]
+
+    def progress(report: ExportReport):
+        if report.elapsed_s - last[0] >= 5:
+            last[0] = report.elapsed_s
+            logger.info(f"{report.claims} claims exported, {report.rows_per_s} rows/s")
+
+    if args.format == "ndjson":
+        report = export_ndjson(
+            paths["summaries"], claim_filter, args.include_pii, args.after,
+            args.batch_size, claim_repository, progress,
+        )
+        print(json.dumps({**report.as_dict(), "files": paths}, indent=2))
+        return
+    try:
+        report = export_tables(
+            paths, args.format, claim_filter, dict(args.columns), args.include_pii,
+            args.row_group_size, args.batch_size, claim_repository, progress,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps({**report.as_dict(), "files": paths}, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
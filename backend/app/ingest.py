@@ -0,0 +1,478 @@
+"""
+Bulk loader for ExplanationOfBenefit resources.
+
+Reads FHIR Bulk Data NDJSON (one resource per line) or a Bundle JSON document
+and writes the claims into the claim store in batches. Both formats are
+parsed incrementally, so memory stays flat regardless of file size. NDJSON
+parsing can fan out over worker processes while the main process writes.
+
+    cd backend
+    python -m app.ingest nightly/ExplanationOfBenefit.ndjson.gz --workers 4 --batch-size 5000
+"""
+
+import argparse
+import gzip
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from app.claim_index import index_values
+from app.mock_data import _extract_uc_id
+
+logger = logging.getLogger("claims-api.ingest")
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+# Upper bounds for POST /claims/ingest; the CLI takes whatever it is given
+INGEST_BATCH_SIZE_MAX = int(os.getenv("INGEST_BATCH_SIZE_MAX", "20000"))
+INGEST_WORKERS_MAX = min(int(os.getenv("INGEST_WORKERS_MAX", "4")), os.cpu_count() or 1)
+# "copy" streams batches through COPY (psycopg 3 or psycopg2); "executemany" uses batched INSERTs
+INGEST_METHOD = os.getenv("INGEST_METHOD", "copy").lower()
+
+_MAX_REJECT_SAMPLES = 20
+_READ_CHUNK = 1 << 20
+
+# Where a JSON value can end: outside strings at the top level, nested, and inside a string
+_TOP_SCAN = re.compile(r'[{}\[\],"]')
+_NESTED_SCAN = re.compile(r'[{}\[\]"]')
+_STRING_SCAN = re.compile(r'["\\]')
+
+
+@dataclass
+class IngestReport:
+    source: str
+    parsed: int = 0
+    written: int = 0
+    materialized: int = 0
+    rejected: int = 0
+    batches: int = 0
+    elapsed_s: float = 0.0
+    reject_samples: list = field(default_factory=list)  # (line/entry number or None, reason)
+
+    @property
+    def rows_per_s(self) -> float:
+        return round(self.written / self.elapsed_s, 1) if self.elapsed_s else 0.0
+
+    def reject(self, position, reason: str):
+        self.rejected += 1
+        if len(self.reject_samples) < _MAX_REJECT_SAMPLES:
+            self.reject_samples.append((position, reason))
+
+    def as_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "parsed": self.parsed,
+            "written": self.written,
+            "materialized": self.materialized,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "elapsed_s": round(self.elapsed_s, 2),
+            "rows_per_s": self.rows_per_s,
+            "reject_samples": [
+                {"position": pos, "reason": reason} for pos, reason in self.reject_samples
+            ],
+        }
+
+
+def _to_row(resource, text: str = None):
+    """(claim_id, fhir_id, JSON text, *listing index values) or a reject reason"""
+    if resource is None:
+        return "entry has no resource"
+    if not isinstance(resource, dict):
+        return "not a JSON object"
+    if resource.get("resourceType") != "ExplanationOfBenefit":
+        return f"resourceType {resource.get('resourceType')!r} is not ExplanationOfBenefit"
+    claim_id = _extract_uc_id(resource)
+    if not claim_id:
+        return "no uc identifier or id"
+    text = text if text is not None else json.dumps(resource)
+    return (claim_id, resource.get("id"), text, *index_values(resource))
+
+
+def parse_lines(first_line: int, lines: list):
+    """
+    Parse one chunk of NDJSON lines. Runs in worker processes, so it only
+    returns plain tuples: (rows, [(line number, reason), ...]).
+    """
+    rows, rejects = [], []
+    for offset, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            resource = json.loads(line)
+        except ValueError as e:
+            rejects.append((first_line + offset, f"invalid JSON: {e}"))
+            continue
+        row = _to_row(resource, line)
+        if isinstance(row, str):
+            rejects.append((first_line + offset, row))
+        else:
+            rows.append(row)
+    return rows, rejects
+
+
+def _line_chunks(stream, size: int):
+    """(number of the first line, [lines]) in chunks of `size`"""
+    chunk, first = [], 1
+    for number, line in enumerate(stream, start=1):
+        chunk.append(line)
+        if len(chunk) == size:
+            yield first, chunk
+            chunk, first = [], number + 1
+    if chunk:
+        yield first, chunk
+
+
+class _Buffer:
+    """A sliding window over a text stream, refilled on demand"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        more = self.stream.read(_READ_CHUNK)
+        if not more:
+            self.eof = True
+            return False
+        self.text = self.text[self.pos:] + more
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while self.pos >= len(self.text):
+            if not self.fill():
+                return None
+        return self.text[self.pos]
+
+    def next(self):
+        ch = self.peek()
+        if ch is not None:
+            self.pos += 1
+        return ch
+
+    def skip_ws(self):
+        while (ch := self.peek()) is not None and ch in " \t\r\n":
+            self.pos += 1
+
+    def read_string(self) -> str:
+        """The rest of a JSON string whose opening quote was just consumed"""
+        out = []
+        while (ch := self.next()) is not None:
+            if ch == "\\":
+                out.append(ch + (self.next() or ""))
+            elif ch == '"':
+                break
+            else:
+                out.append(ch)
+        return "".join(out)
+
+    def decode(self, decoder: json.JSONDecoder):
+        """The next JSON value if it lies whole inside the window; raises JSONDecodeError otherwise"""
+        value, self.pos = decoder.raw_decode(self.text, self.pos)
+        return value
+
+    def read_value(self):
+        """
+        Raw text of the next JSON value, delimited by bracket matching rather
+        than decoding, refilling the window as needed. Slower than decode, so
+        only used once that fails: it tells a value cut off by the window from
+        a malformed one without reading on to the end of the stream. None if
+        the stream ends first.
+        """
+        depth = 0
+        in_string = False
+        i = self.pos
+        while True:
+            if in_string:
+                pattern = _STRING_SCAN
+            else:
+                pattern = _NESTED_SCAN if depth else _TOP_SCAN
+            m = pattern.search(self.text, i)
+            if m is None:
+                offset = max(i, len(self.text)) - self.pos
+                if not self.fill():
+                    return None
+                i = offset
+                continue
+            ch, i = m.group(), m.end()
+            if in_string:
+                if ch == "\\":
+                    i += 1  # skip the escaped character
+                else:
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                depth += 1
+            elif ch == "," or depth == 0:
+                # A scalar's end, or the bracket closing the enclosing array
+                end = m.start()
+                break
+            else:
+                depth -= 1
+                if depth == 0:
+                    end = i
+                    break
+        raw = self.text[self.pos : end]
+        self.pos = end
+        return raw
+
+
+@dataclass
+class MalformedEntry:
+    reason: str
+
+
+def iter_bundle_entries(stream):
+    """
+    Yield each `entry[].resource` of a Bundle from a text stream, holding at
+    most one entry (plus a read chunk) in memory. Keys before "entry" are
+    skipped with a depth-tracking scan; each entry is then decoded on its
+    own. An entry that isn't valid JSON is yielded as a MalformedEntry and
+    skipped; a Bundle that ends inside an entry yields one and stops.
+    """
+    buf = _Buffer(stream)
+    decoder = json.JSONDecoder()
+    depth = 0
+    while True:
+        ch = buf.next()
+        if ch is None:
+            return
+        if ch == '"':
+            key = buf.read_string()
+            buf.skip_ws()
+            if depth == 1 and key == "entry" and buf.peek() == ":":
+                buf.next()
+                buf.skip_ws()
+                if buf.next() == "[":
+                    break
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+
+    while True:
+        buf.skip_ws()
+        ch = buf.peek()
+        if ch == ",":
+            buf.next()
+            continue
+        if ch is None or ch == "]":
+            return
+        try:
+            entry = buf.decode(decoder)
+        except json.JSONDecodeError:
+            # Cut off at the end of the window, or malformed: find where it ends to tell
+            raw = buf.read_value()
+            if raw is None:
+                yield MalformedEntry("Bundle ends inside an entry")
+                return
+            if not raw:
+                yield MalformedEntry(f"unexpected {ch!r} in the entry list")
+                return
+            try:
+                entry = json.loads(raw)
+            except ValueError as e:
+                yield MalformedEntry(f"invalid JSON: {e}")
+                continue
+        yield entry.get("resource") if isinstance(entry, dict) else entry
+
+
+def _bundle_chunks(stream, size: int):
+    """Same shape as parse_lines output, for Bundle entries (numbered from 1)"""
+    rows, rejects = [], []
+    for number, resource in enumerate(iter_bundle_entries(stream), start=1):
+        row = resource.reason if isinstance(resource, MalformedEntry) else _to_row(resource)
+        if isinstance(row, str):
+            rejects.append((number, row))
+        else:
+            rows.append(row)
+        if len(rows) + len(rejects) >= size:
+            yield rows, rejects
+            rows, rejects = [], []
+    if rows or rejects:
+        yield rows, rejects
+
+
+def detect_format(path: str, stream) -> str:
+    name = path.lower().removesuffix(".gz")
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if name.endswith(".json"):
+        return "bundle"
+    # No telling extension: NDJSON's first line is a complete resource
+    first = stream.peek(_READ_CHUNK)[:_READ_CHUNK].split(b"\n", 1)[0]
+    try:
+        return "ndjson" if isinstance(json.loads(first), dict) else "bundle"
+    except ValueError:
+        return "bundle"
+
+
+def _open(path: str):
+    # Buffers as large as a read chunk, so detect_format can peek a whole first line
+    if path.endswith(".gz"):
+        return io.BufferedReader(gzip.GzipFile(path), buffer_size=_READ_CHUNK)
+    return open(path, "rb", buffering=_READ_CHUNK)
+
+
+def _materialize(materializer, rows: list, report: IngestReport):
+    try:
+        report.materialized += materializer.materialize(
+            [(claim_id, json.loads(resource)) for claim_id, _, resource, *_ in rows]
+        )
+    except Exception as e:
+        # The claims are in; the background rebuild will pick these up
+        logger.warning(f"Could not materialize {len(rows)} summaries: {str(e).splitlines()[0]}")
+
+
+def _write(repository, rows: list, method: str, report: IngestReport, materializer=None):
+    try:
+        repository.put_rows(rows, method)
+        report.written += len(rows)
+        if materializer is not None:
+            _materialize(materializer, rows, report)
+    except Exception as e:
+        # Find the bad rows instead of losing the whole batch
+        logger.warning(
+            f"Batch of {len(rows)} failed ({str(e).splitlines()[0]}); retrying row by row"
+        )
+        for row in rows:
+            try:
+                repository.put_rows([row], method)
+                report.written += 1
+                if materializer is not None:
+                    _materialize(materializer, [row], report)
+            except Exception as row_error:
+                report.reject(None, f"claim {row[0]}: {str(row_error).splitlines()[0][:200]}")
+    report.batches += 1
+
+
+def ingest_file(
+    path: str,
+    fmt: str = "auto",
+    batch_size: int = INGEST_BATCH_SIZE,
+    workers: int = INGEST_WORKERS,
+    method: str = INGEST_METHOD,
+    repository=None,
+    progress=None,
+) -> IngestReport:
+    """
+    Load one NDJSON or Bundle file (optionally .gz) into the claim store.
+    `progress`, if given, is called with the running report after every batch.
+    Summaries are materialized as each batch lands when SUMMARY_MATERIALIZE is on.
+    """
+    from app.summary_materializer import summary_materializer
+
+    if repository is None:
+        from app.claim_repository import claim_repository as repository
+    materializer = (
+        summary_materializer
+        if summary_materializer.enabled and summary_materializer.repository is repository
+        else None
+    )
+
+    report = IngestReport(source=path)
+    start = time.perf_counter()
+    with _open(path) as binary:
+        if fmt == "auto":
+            fmt = detect_format(path, binary)
+        stream = io.TextIOWrapper(binary, encoding="utf-8")
+
+        if fmt == "bundle":
+            parsed = _bundle_chunks(stream, batch_size)
+            pool = None
+        elif workers > 1:
+            # spawn, not fork: the server process has threads and open sockets
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            parsed = _parallel(pool, _line_chunks(stream, batch_size), workers)
+        else:
+            parsed = (parse_lines(*chunk) for chunk in _line_chunks(stream, batch_size))
+            pool = None
+
+        try:
+            for rows, rejects in parsed:
+                report.parsed += len(rows) + len(rejects)
+                for position, reason in rejects:
+                    report.reject(position, reason)
+                if rows:
+                    _write(repository, rows, method, report, materializer)
+                report.elapsed_s = time.perf_counter() - start
+                if progress:
+                    progress(report)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+    report.elapsed_s = time.perf_counter() - start
+    logger.info(
+        f"Ingested {path}: {report.written} written, {report.rejected} rejected, "
+        f"{report.rows_per_s} rows/s"
+    )
+    return report
+
+
+def _parallel(pool, chunks, workers: int):
+    """Parse chunks on the pool, in order, with at most 2 x workers in flight"""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.submit(parse_lines, *chunk))
+        if len(pending) >= workers * 2:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Bulk-load ExplanationOfBenefit resources")
+    parser.add_argument("paths", nargs="+", help="NDJSON or Bundle JSON files, optionally .gz")
+    parser.add_argument("--format", choices=("auto", "ndjson", "bundle"), default="auto")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="NDJSON parsing processes")
+    parser.add_argument("--method", choices=("copy", "executemany"), default=INGEST_METHOD)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(name)s | %(levelname)s | %(message)s")
+
+    from app.claim_repository import claim_repository
+    from app.reference_cache import reference_cache
+    from app.summary_materializer import summary_materializer
+
+    if claim_repository.name == "memory":
+        # The in-memory store lives and dies with this process: a "successful" load would be lost
+        parser.error(
+            "CLAIM_STORE is 'memory', so the claims would be dropped when this command exits; "
+            "set CLAIM_STORE=postgres (and DATABASE_URL) to load into a persistent store"
+        )
+    claim_repository.setup()
+    if summary_materializer.enabled:
+        # Build summaries against the same reference version the API serves
+        reference_cache.refresh()
+    last = [0.0]
+
+    def progress(report: IngestReport):
+        if report.elapsed_s - last[0] >= 5:
+            last[0] = report.elapsed_s
+            logger.info(f"{report.written} written, {report.rejected} rejected, {report.rows_per_s} rows/s")
+
+    for path in args.paths:
+        report = ingest_file(
+            path, args.format, args.batch_size, args.workers, args.method, claim_repository, progress
+        )
+        print(json.dumps(report.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
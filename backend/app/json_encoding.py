@@ -0,0 +1,107 @@
+import os
+import threading
+from collections import OrderedDict
+
+import orjson
+from fastapi.responses import JSONResponse
+
+ENCODED_CACHE_MAX_ENTRIES = int(os.getenv("ENCODED_CACHE_MAX_ENTRIES", "2048"))
+ENCODED_CACHE_MAX_BYTES = int(os.getenv("ENCODED_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def dumps(content) -> bytes:
+    # Anything orjson can't serialize natively (Decimal, custom types) goes through str,
+    # matching the stdlib `default=str` used elsewhere
+    return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson. Bytes are taken as already-encoded
+    JSON and sent as-is, so cached bodies skip encoding entirely.
+    """
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+class EncodedBodyCache:
+    """
+    LRU of encoded JSON bodies, bounded by entry count and total bytes.
+
+    An entry remembers the object it was encoded from and is only served
+    while the caller still holds that very object (the in-memory claim
+    store and the summary cache hand back the same dict until it changes),
+    so there is nothing to invalidate by hand.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ENCODED_CACHE_MAX_ENTRIES,
+        max_bytes: int = ENCODED_CACHE_MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get_or_encode(self, key, source, encode=None) -> bytes:
+        """Encoded body for `source`; `encode` defaults to dumps(source)"""
+        if not self.enabled:
+            return encode() if encode else dumps(source)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is source:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        body = encode() if encode else dumps(source)
+        if len(body) > self.max_bytes:
+            return body
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[1])
+            self._entries[key] = (source, body)
+            self.bytes += len(body)
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.bytes -= len(dropped)
+                self.evictions += 1
+        return body
+
+    def clear(self) -> int:
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self.bytes = 0
+        return dropped
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+        }
+
+
+encoded_bodies = EncodedBodyCache()
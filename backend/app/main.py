@@ -1,19 +1,69 @@
+import asyncio
 import logging
-import json
-from contextlib import asynccontextmanager
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import date
+from typing import Literal
 
-from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse # <--- UPDATED
-from langchain_core.messages import HumanMessage
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse # <--- UPDATED
+from langchain_core.messages import AIMessage, HumanMessage
 from pydantic import BaseModel, Field
 from sqlalchemy import text
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.agent import graph
-from app.database import get_db
-from app.mock_data import get_mock_claim
-from app.services import get_claim_summary, sanitize_for_agent
+from app import agent
+from app.answer_cache import answer_cache
+from app.checkpointer import (
+    CHECKPOINT_DURABILITY,
+    CHECKPOINTER,
+    CheckpointPruner,
+    open_durable_checkpointer,
+)
+from app.claim_index import ClaimFilter
+from app.claim_prefetch import prefetch_stats
+from app.code_index import AdjustmentQuery, find_adjustments
+from app.claim_repository import claim_repository
+from app.conditional import cache_headers, is_not_modified, not_modified, strong_etag
+from app.context_window import SUMMARY_TAG, context_stats
+from app.database import (
+    DB_MODE,
+    USE_ASYNC_DB,
+    async_engine,
+    async_pool_metrics,
+    get_async_db,
+    get_db,
+    pool_metrics,
+    session_scope,
+)
+from app.ingest import (
+    INGEST_BATCH_SIZE,
+    INGEST_BATCH_SIZE_MAX,
+    INGEST_WORKERS,
+    INGEST_WORKERS_MAX,
+    ingest_file,
+)
+from app.export import FORMATS, MEDIA_TYPES, TABLES, export_tables, gzipped, iter_summary_ndjson
+from app.json_encoding import ORJSONResponse, dumps, encoded_bodies
+from app.portfolio import CLAIM_GROUPS, GROUP_BY, portfolio
+from app.reference_cache import reference_cache
+from app.services import (
+    aget_claim_summary,
+    encoded_summary,
+    get_claim_summary,
+    prefetch_reference_codes,
+    redact_pii,
+)
+from app.summary_cache import summary_cache
+from app.summary_materializer import summary_materializer
 
 # Logging
 logging.basicConfig(
@@ -22,10 +72,70 @@ logging.basicConfig(
 )
 logger = logging.getLogger("claims-api")
 
+BULK_SUMMARY_MAX_IDS = int(os.getenv("BULK_SUMMARY_MAX_IDS", "500"))
+CLAIM_PAGE_MAX = int(os.getenv("CLAIM_PAGE_MAX", "1000"))
+
+checkpoint_pruner = None  # set at startup when a durable checkpointer is used
+
+def _build_portfolio():
+    try:
+        portfolio.rebuild()
+    except Exception as e:
+        logger.warning(f"Portfolio columns not built: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Claims Intelligence API starting up...")
+
+    # Create/seed the claim store (a no-op for the in-memory mock store)
+    try:
+        await asyncio.to_thread(claim_repository.setup)
+    except Exception as e:
+        logger.error(f"Claim store '{claim_repository.name}' setup failed: {e}")
+
+    # Warm the reference-code snapshot so summaries never hit the code tables
+    try:
+        await asyncio.to_thread(reference_cache.refresh)
+    except Exception as e:
+        logger.warning(f"Reference codes not cached, falling back to DB lookups: {e}")
+    refresher = asyncio.create_task(reference_cache.refresh_periodically())
+
+    # Keep stored summaries in step with the claims and the reference codes
+    rebuilder = None
+    if summary_materializer.enabled:
+        rebuilder = asyncio.create_task(summary_materializer.rebuild_periodically())
+
+    # Load the portfolio columns in the background (and reload them every
+    # PORTFOLIO_REBUILD_SECONDS, if set); this process's writes feed them directly
+    portfolio_build = None
+    if portfolio.enabled:
+        portfolio_build = asyncio.create_task(portfolio.rebuild_periodically())
+
+    # Durable conversation state lets /chat run on several workers/replicas
+    global checkpoint_pruner
+    checkpoints = AsyncExitStack()
+    pruning = None
+    if CHECKPOINTER != "memory":
+        saver = await checkpoints.enter_async_context(open_durable_checkpointer())
+        agent.graph = agent.build_graph(checkpointer=saver)
+        checkpoint_pruner = CheckpointPruner(saver)
+        pruning = asyncio.create_task(checkpoint_pruner.prune_periodically())
+        logger.info(f"Conversation state persisted to {CHECKPOINTER}")
+
     yield
+
+    refresher.cancel()
+    if rebuilder:
+        rebuilder.cancel()
+    if portfolio_build:
+        # Cancelling only drops the wrapper; stop() ends the thread's read
+        portfolio.stop()
+        portfolio_build.cancel()
+    if pruning:
+        pruning.cancel()
+    await checkpoints.aclose()
+    if USE_ASYNC_DB:
+        await async_engine.dispose()
     logger.info("Claims Intelligence API shutting down...")
 
 app = FastAPI(
@@ -42,6 +152,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Thread-Id", "X-Answer-Cache", "ETag", "X-Export-Claims", "X-Export-Rows", "X-Export-Rows-Per-Second"],
 )
 
 @app.exception_handler(Exception)
@@ -52,67 +163,578 @@ async def global_exception_handler(request: Request, exc: Exception):
 # --- SYSTEM ROUTES ---
 @app.get("/", tags=["System"])
 def read_root():
-    return {"status": "System Operational", "streaming_enabled": True}
+    return {"status": "System Operational", "streaming_enabled": True, "db_mode": DB_MODE, "claim_store": claim_repository.name}
 
-@app.get("/health", tags=["System"])
-def check_db(db: Session = Depends(get_db)):
-    try:
-        db.execute(text("SELECT 1")).scalar()
-        return {"status": "healthy", "db_status": "connected"}
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return {"status": "unhealthy", "db_status": "disconnected"}
+# DB_MODE picks which flavour of the DB-backed routes gets registered
+if USE_ASYNC_DB:
+    @app.get("/health", tags=["System"])
+    async def check_db(db: AsyncSession = Depends(get_async_db)):
+        try:
+            (await db.execute(text("SELECT 1"))).scalar()
+            return {"status": "healthy", "db_status": "connected"}
+        except Exception as e:
+            logger.error(f"Health check failed: {e}")
+            return {"status": "unhealthy", "db_status": "disconnected"}
+else:
+    @app.get("/health", tags=["System"])
+    def check_db(db: Session = Depends(get_db)):
+        try:
+            db.execute(text("SELECT 1")).scalar()
+            return {"status": "healthy", "db_status": "connected"}
+        except Exception as e:
+            logger.error(f"Health check failed: {e}")
+            return {"status": "unhealthy", "db_status": "disconnected"}
+
+@app.get("/system/reference-cache", tags=["System"])
+def reference_cache_stats():
+    return reference_cache.stats()
+
+@app.post("/system/reference-cache/reload", tags=["System"])
+def reload_reference_cache(db: Session = Depends(get_db)):
+    changed = reference_cache.refresh(db)
+    if changed and summary_materializer.enabled and not summary_materializer.running:
+        _start_summary_rebuild(everything=False)
+    return {"reloaded": changed, **reference_cache.stats()}
+
+@app.get("/system/pool", tags=["System"])
+def pool_stats():
+    stats = {"sync": pool_metrics.stats()}
+    if async_pool_metrics:
+        stats["async"] = async_pool_metrics.stats()
+    return stats
+
+@app.get("/system/memory", tags=["System"])
+def conversation_memory_stats():
+    if checkpoint_pruner is None:
+        return {"backend": "memory", **agent.memory.stats()}
+    return {"backend": CHECKPOINTER, **checkpoint_pruner.stats()}
+
+@app.get("/system/answer-cache", tags=["System"])
+def answer_cache_stats():
+    return answer_cache.stats()
+
+@app.get("/system/prefetch", tags=["System"])
+def prefetch_metrics():
+    return prefetch_stats.stats()
+
+@app.get("/system/context", tags=["System"])
+def context_window_stats():
+    return context_stats.stats()
+
+@app.get("/system/summary-cache", tags=["System"])
+def summary_cache_stats():
+    return summary_cache.stats()
+
+@app.get("/system/encoded-bodies", tags=["System"])
+def encoded_body_stats():
+    return encoded_bodies.stats()
+
+@app.get("/system/portfolio", tags=["System"])
+def portfolio_stats():
+    return portfolio.stats()
+
+@app.get("/system/materialized-summaries", tags=["System"])
+def materialized_summary_stats():
+    return summary_materializer.stats()
+
+# --- ADMIN ROUTES ---
+@app.delete("/admin/summary-cache", tags=["Admin"])
+def invalidate_all_summaries():
+    return {"invalidated": summary_cache.clear()}
+
+@app.delete("/admin/answer-cache", tags=["Admin"])
+def invalidate_answers():
+    return {"invalidated": answer_cache.clear()}
+
+@app.delete("/admin/summary-cache/{claim_id}", tags=["Admin"])
+def invalidate_claim_summary(claim_id: str):
+    return {"claim_id": claim_id, "invalidated": summary_cache.invalidate(claim_id)}
+
+def _start_summary_rebuild(everything: bool):
+    # Runs from sync routes too, which execute in the threadpool
+    threading.Thread(
+        target=summary_materializer.rebuild, args=(everything,), daemon=True
+    ).start()
+
+@app.post("/admin/materialized-summaries/rebuild", tags=["Admin"], status_code=202)
+def rebuild_materialized_summaries(everything: bool = False):
+    """Rebuild out-of-date summaries (or all of them) in the background; poll /system/materialized-summaries"""
+    if not summary_materializer.enabled:
+        raise HTTPException(400, "Summary materialization is disabled (SUMMARY_MATERIALIZE)")
+    if summary_materializer.running:
+        raise HTTPException(409, "A rebuild is already running")
+    _start_summary_rebuild(everything)
+    return {"started": True, "everything": everything}
+
+@app.post("/admin/portfolio/rebuild", tags=["Admin"], status_code=202)
+def rebuild_portfolio():
+    """Reload the portfolio columns from the claim store in the background; poll /system/portfolio"""
+    if not portfolio.enabled:
+        raise HTTPException(400, "Portfolio columns are disabled (PORTFOLIO_COLUMNS)")
+    if portfolio.running:
+        raise HTTPException(409, "A portfolio rebuild is already running")
+    threading.Thread(target=_build_portfolio, daemon=True).start()
+    return {"state": "started"}
+
+@app.get("/admin/materialized-summaries/verify", tags=["Admin"])
+def verify_materialized_summaries(
+    claim_ids: list[str] = Query(default=[]), sample: int = Query(100, ge=1, le=10_000)
+):
+    """Recompute summaries live and diff them against the stored ones"""
+    return summary_materializer.verify(claim_ids or claim_repository.list_ids(limit=sample))
 
 # --- CLAIM ROUTES ---
-@app.get("/claims", tags=["Claims"])
-def list_available_claims():
-    from app.mock_data import _MOCK_DB
-    return {"available_claims": sorted(_MOCK_DB.keys()), "total": len(_MOCK_DB)}
-
-@app.get("/claims/{claim_id}/raw", tags=["Claims"])
-def read_claim_raw(claim_id: str):
-    claim = get_mock_claim(claim_id)
-    if not claim: raise HTTPException(404, "Claim not found")
-    return claim
-
-@app.get("/claims/{claim_id}/summary", tags=["Claims"])
-def read_claim_summary(claim_id: str, db: Session = Depends(get_db), include_pii: bool = False):
-    summary = get_claim_summary(db, claim_id)
-    if not summary: raise HTTPException(404, "Claim not found")
-    return summary if include_pii else sanitize_for_agent(summary)
+# Claim routes return ORJSONResponse directly: no response-model validation,
+# no jsonable_encoder pass, and cached bodies go out as pre-encoded bytes
+def _claim_filter(
+    disposition: str | None = None,
+    outcome: str | None = None,
+    service_from: date | None = Query(None, description="billable period ends on/after"),
+    service_to: date | None = Query(None, description="billable period starts on/before"),
+    payment_from: date | None = None,
+    payment_to: date | None = None,
+    min_billed: float | None = None,
+    max_billed: float | None = None,
+    min_paid: float | None = None,
+    max_paid: float | None = None,
+    drg: str | None = None,
+) -> ClaimFilter:
+    return ClaimFilter(
+        disposition=disposition,
+        outcome=outcome,
+        service_from=service_from and service_from.isoformat(),
+        service_to=service_to and service_to.isoformat(),
+        payment_from=payment_from and payment_from.isoformat(),
+        payment_to=payment_to and payment_to.isoformat(),
+        min_billed=min_billed,
+        max_billed=max_billed,
+        min_paid=min_paid,
+        max_paid=max_paid,
+        drg_code=drg,
+    )
+
+@app.get("/claims", tags=["Claims"], response_class=ORJSONResponse)
+def list_available_claims(
+    claim_filter: ClaimFilter = Depends(_claim_filter),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1),
+    include_total: bool = Query(False, description="also count every stored claim"),
+):
+    """
+    One page of claim IDs in ascending order. Filters are answered from the
+    store's secondary indexes; pass next_cursor back to get the next page.
+    """
+    limit = min(limit, CLAIM_PAGE_MAX)
+    # One extra ID tells us whether another page exists
+    ids = claim_repository.find_ids(claim_filter, after=cursor, limit=limit + 1)
+    page = {
+        "available_claims": ids[:limit],
+        "next_cursor": ids[limit - 1] if len(ids) > limit else None,
+        "limit": limit,
+        "filters": claim_filter.as_dict(),
+    }
+    if include_total:
+        page["total"] = claim_repository.count()
+    return ORJSONResponse(page)
+
+# Export routes are declared before /claims/{claim_id}... so they aren't taken for claim IDs
+@app.get("/claims/export.ndjson", tags=["Claims"], response_class=StreamingResponse)
+def export_claim_summaries(
+    claim_filter: ClaimFilter = Depends(_claim_filter),
+    include_pii: bool = False,
+    after: str | None = Query(None, description="resume after this claim ID (the last line received)"),
+    gzip: bool = Query(False, description="gzip the stream (Content-Encoding: gzip)"),
+):
+    """
+    Every matching claim's summary, one per line in claim ID order, built
+    lazily as the client reads - memory stays flat however many claims
+    there are. After a dropped connection, pass the last claim_id received
+    as `after` to carry on.
+    """
+    chunks = iter_summary_ndjson(claim_repository, claim_filter, include_pii, after)
+    headers = {"Cache-Control": "no-store"}
+    if gzip:
+        chunks = gzipped(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
+
+@app.get("/claims/export/{table}", tags=["Claims"], response_class=FileResponse)
+def export_claim_table(
+    table: Literal[TABLES],
+    format: Literal[tuple(FORMATS)] = "parquet",
+    columns: str | None = Query(None, description="Comma-separated columns to keep (default: all)"),
+    claim_filter: ClaimFilter = Depends(_claim_filter),
+    include_pii: bool = False,
+):
+    """
+    One flattened table (claims, line_items or adjudications) of every claim
+    matching the filters, as a Parquet or Arrow IPC file. The file is built
+    on disk in row groups, then sent; X-Export-* headers carry the counts.
+    """
+    with tempfile.NamedTemporaryFile(suffix=FORMATS[format], delete=False) as spool:
+        path = spool.name
+    try:
+        report = export_tables(
+            {table: path}, format, claim_filter, {table: _split_param(columns)}, include_pii
+        )
+    except ValueError as e:
+        os.unlink(path)
+        raise HTTPException(400, str(e))
+    except Exception:
+        os.unlink(path)
+        raise
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[format],
+        filename=f"{table}{FORMATS[format]}",
+        headers={
+            "X-Export-Claims": str(report.claims),
+            "X-Export-Rows": str(report.total_rows),
+            "X-Export-Rows-Per-Second": str(report.rows_per_s),
+        },
+        background=BackgroundTask(os.unlink, path),
+    )
+
+@app.get("/claims/{claim_id}/raw", tags=["Claims"], response_class=ORJSONResponse)
+def read_claim_raw(claim_id: str, request: Request):
+    fingerprint = claim_repository.fingerprint(claim_id)
+    if fingerprint is None: raise HTTPException(404, "Claim not found")
+    etag = strong_etag("raw", fingerprint)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    body = claim_repository.get_json(claim_id)
+    if body is None: raise HTTPException(404, "Claim not found")
+    return ORJSONResponse(body, headers=cache_headers(etag))
+
+def _summary_etag(fingerprint: str, include_pii: bool) -> str:
+    # The API version stands in for the summary format
+    return strong_etag(
+        "summary", fingerprint, reference_cache.version, include_pii, app.version
+    )
+
+if USE_ASYNC_DB:
+    @app.get("/claims/{claim_id}/summary", tags=["Claims"], response_class=ORJSONResponse)
+    async def read_claim_summary(claim_id: str, request: Request, db: AsyncSession = Depends(get_async_db), include_pii: bool = False):
+        fingerprint = await claim_repository.afingerprint(claim_id)
+        if fingerprint is None: raise HTTPException(404, "Claim not found")
+        etag = _summary_etag(fingerprint, include_pii)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        summary = await aget_claim_summary(db, claim_id)
+        if not summary: raise HTTPException(404, "Claim not found")
+        return ORJSONResponse(encoded_summary(claim_id, summary, include_pii), headers=cache_headers(etag))
+else:
+    @app.get("/claims/{claim_id}/summary", tags=["Claims"], response_class=ORJSONResponse)
+    def read_claim_summary(claim_id: str, request: Request, db: Session = Depends(get_db), include_pii: bool = False):
+        fingerprint = claim_repository.fingerprint(claim_id)
+        if fingerprint is None: raise HTTPException(404, "Claim not found")
+        etag = _summary_etag(fingerprint, include_pii)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        summary = get_claim_summary(db, claim_id)
+        if not summary: raise HTTPException(404, "Claim not found")
+        return ORJSONResponse(encoded_summary(claim_id, summary, include_pii), headers=cache_headers(etag))
+
+# Sections GET /claims/{claim_id} can return
+_CLAIM_SECTIONS = ("summary", "raw")
+
+def _split_param(value: str | None) -> list:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+def _claim_view_etag(claim_id: str, claim: dict, include: list, fields: list, include_pii: bool) -> str:
+    return strong_etag(
+        "claim", summary_cache.fingerprint(claim_id, claim), reference_cache.version,
+        include_pii, ",".join(include), ",".join(fields), app.version,
+    )
+
+def _claim_view_body(claim_id: str, claim: dict, summary, include: list, fields: list, include_pii: bool) -> bytes:
+    """The composite body, splicing in cached encodings of the unfiltered parts"""
+    parts = [b'{"claim_id":' + dumps(claim_id)]
+    if "summary" in include:
+        if fields:
+            unknown = sorted(set(fields) - summary.keys())
+            if unknown:
+                raise HTTPException(400, f"Unknown summary fields: {', '.join(unknown)}")
+            selected = {f: summary[f] for f in fields}
+            # Redact after projecting, so no field the caller didn't ask for comes back
+            body = dumps(selected if include_pii else redact_pii(selected))
+        else:
+            body = encoded_summary(claim_id, summary, include_pii)
+        parts.append(b'"summary":' + body)
+    if "raw" in include:
+        parts.append(b'"raw":' + claim_repository.encode(claim_id, claim))
+    return b",".join(parts) + b"}"
+
+def _claim_view_params(include: str, fields: str | None):
+    sections = _split_param(include)
+    unknown = sorted(set(sections) - set(_CLAIM_SECTIONS))
+    if unknown:
+        raise HTTPException(400, f"Unknown include sections: {', '.join(unknown)}")
+    return sections, _split_param(fields)
+
+_INCLUDE_QUERY = Query("summary,raw", description="Comma-separated sections: summary, raw")
+_FIELDS_QUERY = Query(None, description="Comma-separated summary fields to return (default: all)")
+
+if USE_ASYNC_DB:
+    @app.get("/claims/{claim_id}", tags=["Claims"], response_class=ORJSONResponse)
+    async def read_claim(claim_id: str, request: Request, db: AsyncSession = Depends(get_async_db), include: str = _INCLUDE_QUERY, fields: str | None = _FIELDS_QUERY, include_pii: bool = False):
+        """Summary and raw resource from a single claim lookup, trimmed to what the client renders"""
+        sections, selected = _claim_view_params(include, fields)
+        claim = await claim_repository.aget(claim_id)
+        if not claim: raise HTTPException(404, "Claim not found")
+        etag = _claim_view_etag(claim_id, claim, sections, selected, include_pii)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        summary = await aget_claim_summary(db, claim_id, claim) if "summary" in sections else None
+        body = _claim_view_body(claim_id, claim, summary, sections, selected, include_pii)
+        return ORJSONResponse(body, headers=cache_headers(etag))
+else:
+    @app.get("/claims/{claim_id}", tags=["Claims"], response_class=ORJSONResponse)
+    def read_claim(claim_id: str, request: Request, db: Session = Depends(get_db), include: str = _INCLUDE_QUERY, fields: str | None = _FIELDS_QUERY, include_pii: bool = False):
+        """Summary and raw resource from a single claim lookup, trimmed to what the client renders"""
+        sections, selected = _claim_view_params(include, fields)
+        claim = claim_repository.get(claim_id)
+        if not claim: raise HTTPException(404, "Claim not found")
+        etag = _claim_view_etag(claim_id, claim, sections, selected, include_pii)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        summary = get_claim_summary(db, claim_id, claim=claim) if "summary" in sections else None
+        body = _claim_view_body(claim_id, claim, summary, sections, selected, include_pii)
+        return ORJSONResponse(body, headers=cache_headers(etag))
+
+class BulkSummaryRequest(BaseModel):
+    claim_ids: list[str] = Field(min_length=1)
+    include_pii: bool = False
+    stream: bool = False  # NDJSON, one result per line as each summary is built
+
+def _bulk_summary_results(db: Session, claim_ids: list, include_pii: bool):
+    """Yields (found, encoded result) per claim, splicing in cached summary bodies"""
+    # One store round trip for the batch, shared by the code prefetch and the builds
+    claims = claim_repository.get_many(claim_ids)
+    snapshot = prefetch_reference_codes(db, claims)
+    for claim_id, claim in zip(claim_ids, claims):
+        try:
+            summary = get_claim_summary(db, claim_id, snapshot, claim) if claim else None
+        except Exception as e:
+            logger.error(f"Bulk summary failed for {claim_id}: {e}", exc_info=True)
+            yield False, dumps({"claim_id": claim_id, "error": "Unable to build summary"})
+            continue
+        if not summary:
+            yield False, dumps({"claim_id": claim_id, "error": "Claim not found"})
+        else:
+            body = encoded_summary(claim_id, summary, include_pii)
+            yield True, b'{"claim_id":' + dumps(claim_id) + b',"summary":' + body + b"}"
+
+@app.post("/claims/summaries", tags=["Claims"], response_class=ORJSONResponse)
+def read_claim_summaries(request: BulkSummaryRequest):
+    claim_ids = [c.strip() for c in request.claim_ids]
+    if len(claim_ids) > BULK_SUMMARY_MAX_IDS:
+        raise HTTPException(413, f"At most {BULK_SUMMARY_MAX_IDS} claim IDs per request")
+
+    def ndjson_stream():
+        with session_scope() as db:
+            for _, line in _bulk_summary_results(db, claim_ids, request.include_pii):
+                yield line + b"\n"
+
+    if request.stream:
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+    with session_scope() as db:
+        results = list(_bulk_summary_results(db, claim_ids, request.include_pii))
+    found = sum(1 for ok, _ in results if ok)
+    return ORJSONResponse(
+        b'{"results":[' + b",".join(line for _, line in results) + b"],"
+        + f'"found":{found},"missing":{len(results) - found}}}'.encode()
+    )
+
+# Content types that pin the format when ?format=auto
+_INGEST_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/fhir+ndjson": "ndjson",
+    "application/fhir+json": "bundle",
+}
+
+@app.post("/claims/ingest", tags=["Claims"])
+async def ingest_claims(
+    request: Request,
+    format: Literal["auto", "ndjson", "bundle"] = "auto",
+    batch_size: int = Query(INGEST_BATCH_SIZE, ge=1),
+    workers: int = Query(INGEST_WORKERS, ge=1),
+):
+    """
+    Bulk-load EOBs from an NDJSON or Bundle request body (gzip allowed via
+    Content-Encoding). The body is spooled to disk, then streamed into the
+    claim store; the response is the ingest report. batch_size and
+    workers are capped at INGEST_BATCH_SIZE_MAX and INGEST_WORKERS_MAX.
+    """
+    batch_size = min(batch_size, INGEST_BATCH_SIZE_MAX)
+    workers = min(workers, INGEST_WORKERS_MAX)
+    if format == "auto":
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        format = _INGEST_FORMATS.get(content_type, "auto")
+    suffix = ".gz" if request.headers.get("content-encoding") == "gzip" else ""
+    with tempfile.NamedTemporaryFile(suffix=f".upload{suffix}") as spool:
+        async for chunk in request.stream():
+            await asyncio.to_thread(spool.write, chunk)
+        await asyncio.to_thread(spool.flush)
+        report = await asyncio.to_thread(
+            ingest_file, spool.name, format, batch_size, workers
+        )
+    report.source = "request body"
+    return report.as_dict()
+
+# --- ANALYTICS ROUTES ---
+@app.get("/analytics/adjustment-codes", tags=["Analytics"], response_class=ORJSONResponse)
+def search_adjustment_codes(
+    carc: str | None = None,
+    rarc: str | None = None,
+    group: str | None = Query(None, description="adjudication category: CO, PR, OA, ... or a value code"),
+    claim_filter: ClaimFilter = Depends(_claim_filter),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1),
+):
+    """
+    Claims whose adjudications carry these codes, with the matching lines
+    and amounts, e.g. ?carc=96&group=CO&payment_from=2025-01-01. The group
+    must be on the same adjudication as the reason code; carc and rarc
+    together match claims carrying both.
+    """
+    query = AdjustmentQuery(carc=carc, rarc=rarc, group=group)
+    if not query.keys():
+        raise HTTPException(400, "Give at least one of carc, rarc or group")
+    limit = min(limit, CLAIM_PAGE_MAX)
+    matches, next_cursor = find_adjustments(claim_repository, query, claim_filter, cursor, limit)
+    return ORJSONResponse(
+        {
+            "matches": matches,
+            "next_cursor": next_cursor,
+            "limit": limit,
+            "query": query.as_dict(),
+            "filters": claim_filter.as_dict(),
+        }
+    )
+
+def _percentiles(percentiles: str = Query("50,90", description="comma-separated, e.g. 50,90,99")) -> list:
+    try:
+        values = [float(p) for p in percentiles.split(",") if p.strip()]
+    except ValueError:
+        raise HTTPException(400, "percentiles must be numbers between 0 and 100")
+    if any(not 0 <= p <= 100 for p in values):
+        raise HTTPException(400, "percentiles must be numbers between 0 and 100")
+    return values
+
+@app.get("/analytics/portfolio", tags=["Analytics"], response_class=ORJSONResponse)
+def portfolio_aggregates(
+    group_by: Literal[GROUP_BY] = "disposition",
+    percentiles: list = Depends(_percentiles),
+):
+    """
+    Billed, paid, patient responsibility (PR) and contractual write-off (CO)
+    across all claims, summed and with percentiles per group. group_by=carc
+    groups adjudication amounts by reason code instead, split by category.
+    """
+    if not portfolio.enabled:
+        raise HTTPException(400, "Portfolio columns are disabled (PORTFOLIO_COLUMNS)")
+    result = portfolio.aggregate(group_by, percentiles)
+    return ORJSONResponse(
+        {
+            "group_by": group_by,
+            "level": "claim" if group_by in CLAIM_GROUPS else "adjudication",
+            "percentiles": percentiles,
+            **result,
+            "claims_loaded": len(portfolio.columns),
+            "rebuilding": portfolio.running,
+        }
+    )
 
 # --- CHAT ROUTE (STREAMING) ---
 class ChatRequest(BaseModel):
     query: str
-    thread_id: str = "default_session"
+    # Omitted -> a fresh thread per request, echoed back in X-Thread-Id.
+    # (A shared default would funnel every anonymous user into one thread.)
+    thread_id: str | None = None
 
 @app.post("/chat", tags=["AI Agent"])
 async def chat_with_agent(request: ChatRequest): # Note: async def
     """
     Streams the AI response token-by-token.
     """
-    config = {"configurable": {"thread_id": request.thread_id}}
-    input_state = {"messages": [HumanMessage(content=request.query.strip())]}
+    thread_id = request.thread_id or f"anon-{uuid.uuid4().hex}"
+    config = {"configurable": {"thread_id": thread_id}}
+    query = request.query.strip()
+    input_state = {"messages": [HumanMessage(content=query)]}
+    headers = {"X-Thread-Id": thread_id}
+
+    started = time.perf_counter()
+
+    cache_key = await answer_cache.key_for(query) if answer_cache.enabled else None
+    cached = answer_cache.get(*cache_key) if cache_key else None
+    if cached is not None:
+        # Record the exchange so follow-ups in this thread still have context
+        await agent.graph.aupdate_state(
+            config,
+            {"messages": [HumanMessage(content=query), AIMessage(content=cached)]},
+            as_node="chatbot",
+        )
+        return StreamingResponse(
+            _replay(cached), media_type="text/plain", headers={**headers, "X-Answer-Cache": "hit"}
+        )
 
     async def event_stream():
+        answer = []
+        failed = False
+        first_token_ms = None
+        prefetched = tool_round_trip = False
         try:
             # astream_events allows us to see tokens AS they are generated
             # version="v1" is required for LangChain 0.1+
-            async for event in graph.astream_events(input_state, config=config, version="v1"):
+            async for event in agent.graph.astream_events(
+                input_state, config=config, version="v1", durability=CHECKPOINT_DURABILITY
+            ):
                 
                 # We only care about the Chat Model streaming content
                 # We ignore tool calls, retrieval steps, etc.
                 kind = event["event"]
+                node = event.get("metadata", {}).get("langgraph_node")
+
+                # Note how claim data reached the model, for the TTFT metrics
+                if kind == "on_tool_start":
+                    if node == "prefetch":
+                        prefetched = True
+                    elif node == "tools":
+                        tool_round_trip = True
                 
-                if kind == "on_chat_model_stream":
+                if kind == "on_chat_model_stream" and SUMMARY_TAG not in event.get("tags", []):
                     content = event["data"]["chunk"].content
                     if content:
+                        if first_token_ms is None:
+                            first_token_ms = (time.perf_counter() - started) * 1000
+                        answer.append(content)
                         # Yield the raw text chunk
                         yield content
                         
         except Exception as e:
+            failed = True
             logger.error(f"Streaming error: {e}")
             yield f"\n[System Error: {str(e)}]"
 
+        if cache_key and answer and not failed:
+            answer_cache.put(*cache_key, "".join(answer))
+
+        if first_token_ms is not None:
+            bucket = (
+                "tool_round_trip" if tool_round_trip
+                else "prefetched" if prefetched
+                else "no_claim_lookup"
+            )
+            prefetch_stats.record_ttft(bucket, first_token_ms)
+
     # Return a StreamingResponse with text/plain media type
-    return StreamingResponse(event_stream(), media_type="text/plain")
\ No newline at end of file
+    if cache_key:
+        headers["X-Answer-Cache"] = "miss"
+    return StreamingResponse(event_stream(), media_type="text/plain", headers=headers)
+
+async def _replay(answer: str):
+    # Same chunked text/plain stream the model path produces, word by word
+    for chunk in re.findall(r"\s*\S+\s*", answer):
+        yield chunk
\ No newline at end of file
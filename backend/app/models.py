@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Date, String, Text
+from sqlalchemy import JSON, Column, Date, DateTime, Float, Index, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
 
 from app.database import Base
 
@@ -31,3 +32,41 @@ class ClaimAdjustmentGroupCode(Base):
     description = Column(String)
     responsibility = Column(Text)  # "Patient" or "Provider"
     start_date = Column(Date, nullable=True)
+
+
+class ClaimResource(Base):
+    """One ExplanationOfBenefit resource, keyed by its CARIN "uc" claim ID"""
+
+    __tablename__ = "claim_resources"
+    claim_id = Column(String, primary_key=True)  # the btree behind every lookup
+    fhir_id = Column(String)
+    resource = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False)
+    # Materialized summary and the reference-code version it was built against
+    summary = Column(JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"))
+    summary_ref_version = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Listing filters, derived from the resource on write (app.claim_index).
+    # Dates are ISO day strings so partial FHIR dates still compare as text.
+    disposition = Column(String)
+    outcome = Column(String)
+    service_start = Column(String(10), index=True)
+    service_end = Column(String(10), index=True)
+    payment_date = Column(String(10), index=True)
+    billed_amount = Column(Float, index=True)
+    paid_amount = Column(Float, index=True)
+    drg_code = Column(String)
+    index_version = Column(Integer)
+
+    __table_args__ = (
+        # Equality filters lead, claim_id follows, so a filtered page is an ordered index range
+        Index("ix_claim_resources_disposition_claim", "disposition", "claim_id"),
+        Index("ix_claim_resources_outcome_claim", "outcome", "claim_id"),
+        Index("ix_claim_resources_drg_claim", "drg_code", "claim_id"),
+        # Adjustment-code search (app.code_index) is a jsonb containment query
+        Index(
+            "ix_claim_resources_resource_path",
+            "resource",
+            postgresql_using="gin",
+            postgresql_ops={"resource": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
@@ -0,0 +1,137 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+logger = logging.getLogger("claims-api.pool")
+
+# Checkouts that wait longer than this get a warning with the pool status
+SLOW_CHECKOUT_MS = float(os.getenv("DB_POOL_SLOW_CHECKOUT_MS", "100"))
+
+_WAIT_SAMPLES = 1000  # recent checkout waits kept for percentiles
+
+
+class PoolMetrics:
+    """Counters fed by pool events plus a rolling window of checkout waits"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.max_wait_ms = 0.0
+        self._total_wait_ms = 0.0
+        self._waits = deque(maxlen=_WAIT_SAMPLES)
+        self._lock = threading.Lock()
+
+    def increment(self, counter: str):
+        # Pool events fire on many threads at once; += on an attribute isn't atomic
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, wait_ms: float):
+        with self._lock:
+            self._waits.append(wait_ms)
+            self._total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            slow = wait_ms > SLOW_CHECKOUT_MS
+            if slow:
+                self.slow_checkouts += 1
+        if slow:
+            logger.warning(
+                f"Slow {self.name} pool checkout: waited {wait_ms:.1f} ms "
+                f"({self.pool.status() if self.pool else 'pool unknown'})"
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            total_wait = self._total_wait_ms
+            timed = self.checkouts + self.timeouts
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 2) if waits else None
+
+        pool = self.pool
+        return {
+            "pool_size": pool.size() if pool else None,
+            "checked_out": pool.checkedout() if pool else None,
+            "checked_in": pool.checkedin() if pool else None,
+            "overflow": pool.overflow() if pool else None,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "soft_invalidations": self.soft_invalidations,
+            "timeouts": self.timeouts,
+            "checkout_wait_ms": {
+                "avg": round(total_wait / timed, 2) if timed else None,
+                "p50": pct(0.50),
+                "p95": pct(0.95),
+                "p99": pct(0.99),
+                "max": round(self.max_wait_ms, 2),
+                "slow_threshold": SLOW_CHECKOUT_MS,
+                "slow_count": self.slow_checkouts,
+            },
+        }
+
+
+def instrumented_pool_class(base, metrics: PoolMetrics):
+    """
+    Subclass of a SQLAlchemy pool class that times how long callers block
+    waiting for a connection. SQLAlchemy has no "checkout requested" event,
+    so the wait is measured around the pool's own _do_get().
+    """
+
+    class InstrumentedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                metrics.increment("timeouts")
+                raise
+            finally:
+                metrics.record_wait((time.perf_counter() - start) * 1000)
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+def instrument_engine(engine, metrics: PoolMetrics):
+    """Attach pool event listeners; `engine` may be sync or the sync side of an async engine"""
+    metrics.pool = engine.pool
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        metrics.increment("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        metrics.increment("checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        metrics.increment("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exc):
+        metrics.increment("invalidations")
+
+    @event.listens_for(engine, "soft_invalidate")
+    def _on_soft_invalidate(dbapi_conn, record, exc):
+        metrics.increment("soft_invalidations")
+
+    # dispose() swaps in a fresh pool; keep pointing at the live one
+    @event.listens_for(engine, "engine_disposed")
+    def _on_dispose(eng):
+        metrics.pool = eng.pool
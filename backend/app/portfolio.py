@@ -0,0 +1,418 @@
+"""
+Portfolio analytics over claim financials, kept in columnar NumPy arrays.
+
+Each claim is parsed once, when it is written, into one row of claim-level
+columns (billed, paid, patient responsibility, contractual write-off and the
+grouping keys) and one row per adjudication (amount, CARC, category code).
+Grouped sums, counts and percentiles are then whole-array operations
+(bincount, argsort) instead of a Python loop over per-claim summaries.
+
+Patient responsibility and contractual write-off follow build_claim_summary:
+the header-level adjudications in the PR and CO categories.
+
+The columns follow the claim store through ClaimRepository.on_write, so
+claims loaded through this process (POST /claims/ingest, the mock store)
+show up immediately. Claims loaded by another process (the ingest CLI
+against Postgres) appear after POST /admin/portfolio/rebuild. The same
+goes for other uvicorn workers and replicas: each keeps its own columns,
+fed only by the writes it served, so /analytics/portfolio can differ
+between them until they rebuild. Set PORTFOLIO_REBUILD_SECONDS to have
+every process reload from the shared store on that interval.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.claim_repository import claim_repository
+from app.code_index import _reason_type
+from app.eob import parse_eob
+
+logger = logging.getLogger("claims-api.portfolio")
+
+# Keeping the columns costs a parse per written claim and ~100 bytes per row
+PORTFOLIO_COLUMNS = os.getenv("PORTFOLIO_COLUMNS", "true").lower() == "true"
+PORTFOLIO_BATCH_SIZE = int(os.getenv("PORTFOLIO_BATCH_SIZE", "1000"))
+# Reload from the store this often (0: only at startup and on request); for multi-worker deployments
+PORTFOLIO_REBUILD_SECONDS = float(os.getenv("PORTFOLIO_REBUILD_SECONDS", "0"))
+
+CLAIM_METRICS = ("billed", "paid", "patient_responsibility", "contractual_writeoff")
+CLAIM_GROUPS = ("disposition", "drg", "service_month", "payment_month")
+GROUP_BY = CLAIM_GROUPS + ("carc",)
+
+_CLAIM_COLUMNS = {
+    "billed": np.float64,
+    "paid": np.float64,
+    "patient_responsibility": np.float64,
+    "contractual_writeoff": np.float64,
+    "disposition": np.int32,
+    "drg": np.int32,
+    "service_month": np.int32,  # yyyymm, 0 if unknown
+    "payment_month": np.int32,
+    "alive": np.bool_,
+}
+_ADJUDICATION_COLUMNS = {
+    "claim_row": np.int64,
+    "carc": np.int32,  # -1 when the reason is not a CARC
+    "category": np.int32,
+    "amount": np.float64,
+}
+
+
+def _month(value) -> int:
+    # FHIR date/dateTime -> yyyymm; "Pending" and missing dates -> 0
+    if isinstance(value, str) and len(value) >= 7 and value[4] == "-":
+        try:
+            return int(value[:4]) * 100 + int(value[5:7])
+        except ValueError:
+            pass
+    return 0
+
+
+def _month_label(month: int):
+    return f"{month // 100:04d}-{month % 100:02d}" if month else None
+
+
+class _Codes:
+    """Dictionary encoding of a string column: value <-> small int"""
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def id(self, value) -> int:
+        found = self._ids.get(value)
+        if found is None:
+            found = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return found
+
+    def get(self, value) -> int:
+        return self._ids.get(value, -1)
+
+
+class _Table:
+    """Named NumPy columns of equal length, grown by doubling"""
+
+    def __init__(self, dtypes: dict, capacity: int = 1024):
+        self.size = 0
+        self._data = {name: np.zeros(capacity, dtype) for name, dtype in dtypes.items()}
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self._data[name][: self.size]
+
+    def append(self, columns: dict):
+        count = len(next(iter(columns.values())))
+        end = self.size + count
+        capacity = len(next(iter(self._data.values())))
+        if end > capacity:
+            capacity = max(end, capacity * 2)
+            for name, data in self._data.items():
+                grown = np.zeros(capacity, data.dtype)
+                grown[: self.size] = data[: self.size]
+                self._data[name] = grown
+        for name, values in columns.items():
+            self._data[name][self.size : end] = values
+        self.size = end
+
+    def keep(self, rows: np.ndarray):
+        """Keep only `rows` (indexes or a mask), in order"""
+        for name in self._data:
+            kept = self[name][rows]
+            self._data[name] = np.concatenate([kept, np.zeros(max(len(kept), 1024), kept.dtype)])
+        self.size = len(kept)
+
+    def nbytes(self) -> int:
+        return sum(data.nbytes for data in self._data.values())
+
+
+def _grouped(keys: np.ndarray, metrics: dict, percentiles: list):
+    """
+    Per-group counts, sums and percentiles (linear interpolation, as
+    np.percentile) of each metric, for groups given as a non-negative int
+    key per row.
+    Returns (group keys, counts, {metric: {"sum": array, "p50": array, ...}}).
+    """
+    # Keys are small non-negative ints (dictionary codes, yyyymm), so a
+    # bincount finds the groups without sorting
+    present = np.bincount(keys)
+    groups = np.flatnonzero(present)
+    counts = present[groups]
+    dense = np.zeros(len(present), dtype=np.int64)
+    dense[groups] = np.arange(len(groups))
+    dense = dense[keys]
+    starts = np.cumsum(counts) - counts
+    results = {}
+    for name, values in metrics.items():
+        stats = {"sum": np.bincount(dense, weights=values, minlength=len(groups))}
+        if percentiles and len(values):
+            # Values sorted within each group: sort by value, then stable-sort by
+            # group (an int sort, much cheaper than a two-key lexsort)
+            order = np.argsort(values)
+            ordered = values[order[np.argsort(dense[order], kind="stable")]]
+            for p in percentiles:
+                position = starts + (counts - 1) * (p / 100)
+                lo = np.floor(position).astype(np.int64)
+                hi = np.ceil(position).astype(np.int64)
+                stats[f"p{p:g}"] = ordered[lo] + (ordered[hi] - ordered[lo]) * (position - lo)
+        results[name] = stats
+    return groups, counts, results
+
+
+def _by_key(groups: list) -> list:
+    # Dictionary codes number values in arrival order; report them sorted, nulls last
+    return sorted(groups, key=lambda g: (g["key"] is None, str(g["key"])))
+
+
+def _rounded(value: float) -> float:
+    return round(float(value), 2)
+
+
+class PortfolioColumns:
+    """Claim- and adjudication-level columns for every claim in the store"""
+
+    def __init__(self):
+        self.claims = _Table(_CLAIM_COLUMNS)
+        self.adjudications = _Table(_ADJUDICATION_COLUMNS)
+        self.row_ids = []  # claim ID per claim row
+        self.rows = {}  # claim ID -> its live row
+        self.dispositions = _Codes()
+        self.drgs = _Codes()
+        self.carcs = _Codes()
+        self.categories = _Codes()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add_many(self, claims: list):
+        """Add (claim_id, resource) pairs; a claim written again replaces its old row"""
+        claims = dict(claims)  # the last copy of a repeated ID wins
+        replaced = [self.rows[claim_id] for claim_id in claims if claim_id in self.rows]
+        if replaced:
+            self.claims["alive"][replaced] = False
+
+        columns = {name: [] for name in _CLAIM_COLUMNS}
+        adjudications = {name: [] for name in _ADJUDICATION_COLUMNS}
+        row = self.claims.size
+        for claim_id, claim in claims.items():
+            eob = parse_eob(claim)
+            columns["billed"].append(eob.billed_amount)
+            columns["paid"].append(eob.paid_amount)
+            columns["patient_responsibility"].append(eob.category_total("PR"))
+            columns["contractual_writeoff"].append(eob.category_total("CO"))
+            columns["disposition"].append(self.dispositions.id(eob.disposition))
+            columns["drg"].append(self.drgs.id(eob.drg_code))
+            columns["service_month"].append(_month(eob.service_start))
+            columns["payment_month"].append(_month(eob.payment_date))
+            columns["alive"].append(True)
+            for adj in eob.adjudications():
+                is_carc = adj.reason_code and _reason_type(adj.reason_system) == "CARC"
+                adjudications["claim_row"].append(row)
+                adjudications["carc"].append(self.carcs.id(adj.reason_code) if is_carc else -1)
+                adjudications["category"].append(self.categories.id(adj.category_code))
+                adjudications["amount"].append(adj.amount)
+            self.rows[claim_id] = row
+            self.row_ids.append(claim_id)
+            row += 1
+        if claims:
+            self.claims.append(columns)
+        if adjudications["claim_row"]:
+            self.adjudications.append(adjudications)
+        if self.claims.size > 2 * len(self.rows) + 1024:
+            self._compact()
+
+    def _compact(self):
+        # Drop dead rows and renumber the adjudications that point at them
+        alive = self.claims["alive"]
+        keep = np.flatnonzero(alive)
+        renumber = np.full(self.claims.size, -1, dtype=np.int64)
+        renumber[keep] = np.arange(len(keep))
+        self.adjudications.keep(alive[self.adjudications["claim_row"]])
+        self.adjudications["claim_row"][:] = renumber[self.adjudications["claim_row"]]
+        self.claims.keep(keep)
+        self.row_ids = [self.row_ids[i] for i in keep]
+        self.rows = {claim_id: i for i, claim_id in enumerate(self.row_ids)}
+
+    def nbytes(self) -> int:
+        return self.claims.nbytes() + self.adjudications.nbytes()
+
+    # --- aggregation ---
+    def _claim_keys(self, group_by: str) -> tuple:
+        """(key per live claim row, key -> label)"""
+        keys = self.claims[group_by][self.claims["alive"]]
+        if group_by == "disposition":
+            return keys, lambda k: self.dispositions.values[k]
+        if group_by == "drg":
+            return keys, lambda k: self.drgs.values[k]
+        return keys, _month_label
+
+    def aggregate(self, group_by: str, percentiles: list = ()) -> dict:
+        if group_by == "carc":
+            return self._aggregate_carc(percentiles)
+        keys, label = self._claim_keys(group_by)
+        alive = self.claims["alive"]
+        metrics = {name: self.claims[name][alive] for name in CLAIM_METRICS}
+        groups, counts, stats = _grouped(keys, metrics, percentiles)
+        return {
+            "groups": _by_key([
+                {
+                    "key": label(int(key)),
+                    "claims": int(counts[i]),
+                    **{
+                        name: {stat: _rounded(values[i]) for stat, values in stats[name].items()}
+                        for name in CLAIM_METRICS
+                    },
+                }
+                for i, key in enumerate(groups)
+            ]),
+            "totals": {
+                "claims": len(keys),
+                **{name: _rounded(values.sum()) for name, values in metrics.items()},
+            },
+        }
+
+    def _aggregate_carc(self, percentiles: list) -> dict:
+        claim_rows = self.adjudications["claim_row"]
+        carcs = self.adjudications["carc"]
+        mask = (carcs >= 0) & self.claims["alive"][claim_rows]
+        carcs, claim_rows = carcs[mask], claim_rows[mask]
+        amounts = self.adjudications["amount"][mask]
+        categories = self.adjudications["category"][mask]
+        groups, counts, stats = _grouped(carcs, {"amount": amounts}, percentiles)
+        dense = np.searchsorted(groups, carcs)
+
+        def category_sums(code):
+            wanted = categories == self.categories.get(code)
+            return np.bincount(dense[wanted], weights=amounts[wanted], minlength=len(groups))
+
+        patient, writeoff = category_sums("PR"), category_sums("CO")
+        # Distinct (CARC, claim) pairs, counted per CARC
+        width = max(self.claims.size, 1)
+        pairs = np.sort(dense.astype(np.int64) * width + claim_rows)
+        first = np.ones(len(pairs), dtype=np.bool_)
+        first[1:] = pairs[1:] != pairs[:-1]
+        claims = np.bincount(pairs[first] // width, minlength=len(groups))
+        return {
+            "groups": _by_key([
+                {
+                    "key": self.carcs.values[int(key)],
+                    "adjudications": int(counts[i]),
+                    "claims": int(claims[i]),
+                    "amount": {stat: _rounded(values[i]) for stat, values in stats["amount"].items()},
+                    "patient_responsibility": _rounded(patient[i]),
+                    "contractual_writeoff": _rounded(writeoff[i]),
+                }
+                for i, key in enumerate(groups)
+            ]),
+            "totals": {
+                "adjudications": int(mask.sum()),
+                "amount": _rounded(amounts.sum()),
+            },
+        }
+
+
+class Portfolio:
+    """
+    The live PortfolioColumns, fed by claim store writes. A rebuild reads
+    the whole store into fresh columns, replays the writes that arrived
+    meanwhile and then swaps them in, so readers never see a partial build.
+    """
+
+    def __init__(self, repository=claim_repository, enabled: bool = PORTFOLIO_COLUMNS):
+        self.columns = PortfolioColumns()
+        self.repository = repository
+        self.enabled = enabled
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._pending = None  # writes seen during a rebuild
+        self._stopping = threading.Event()
+        self.built_at = None
+        self.rebuild_seconds = None
+        if enabled:
+            repository.on_write(self.on_write)
+
+    def on_write(self, claims: list):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(claims)
+            self.columns.add_many(claims)
+
+    def stop(self):
+        """Abandon a running rebuild at its next batch (and any later one), for shutdown"""
+        self._stopping.set()
+
+    def rebuild(self, batch_size: int = PORTFOLIO_BATCH_SIZE) -> int | None:
+        """Reload the columns from the store; None if stop() cut it short"""
+        if not self._rebuild_lock.acquire(blocking=False):
+            raise RuntimeError("a portfolio rebuild is already running")
+        try:
+            started = time.perf_counter()
+            with self._lock:
+                self._pending = []
+            columns = PortfolioColumns()
+            for batch in self.repository.iter_claims(batch_size):
+                if self._stopping.is_set():
+                    with self._lock:
+                        self._pending = None
+                    logger.info("Portfolio rebuild stopped")
+                    return None
+                columns.add_many([(claim_id, claim) for claim_id, claim in batch if claim is not None])
+            with self._lock:
+                columns.add_many(self._pending)
+                self._pending = None
+                self.columns = columns
+            self.built_at = time.time()
+            self.rebuild_seconds = round(time.perf_counter() - started, 3)
+            logger.info(f"Portfolio columns built: {len(columns)} claims in {self.rebuild_seconds}s")
+            return len(columns)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        finally:
+            self._rebuild_lock.release()
+
+    async def rebuild_periodically(self, interval: float = PORTFOLIO_REBUILD_SECONDS):
+        """Background task: rebuild now, then every `interval` seconds if it is set"""
+        while True:
+            try:
+                await asyncio.to_thread(self.rebuild)
+            except Exception as e:
+                logger.warning(f"Portfolio columns not built: {e}")
+            if not interval:
+                return
+            await asyncio.sleep(interval)
+
+    @property
+    def running(self) -> bool:
+        return self._rebuild_lock.locked()
+
+    def aggregate(self, group_by: str, percentiles: list = ()) -> dict:
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        with self._lock:
+            return self.columns.aggregate(group_by, percentiles)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "store": self.repository.name,
+                "claims": len(self.columns),
+                "claim_rows": self.columns.claims.size,
+                "adjudication_rows": self.columns.adjudications.size,
+                "bytes": self.columns.nbytes(),
+                "built_at": self.built_at,
+                "rebuild_seconds": self.rebuild_seconds,
+                "rebuilding": self.running,
+                # Writes served by other workers/replicas only arrive with a rebuild
+                "process_id": os.getpid(),
+                "rebuild_interval_seconds": PORTFOLIO_REBUILD_SECONDS or None,
+            }
+
+
+portfolio = Portfolio()
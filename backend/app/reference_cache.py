@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import session_scope
+from app.models import (
+    AdjudicationValueCode,
+    CarcCode,
+    ClaimAdjustmentGroupCode,
+    RarcCode,
+)
+
+logger = logging.getLogger("claims-api.reference-cache")
+
+# How often the background task re-reads the code tables looking for changes
+REFRESH_INTERVAL_SECONDS = float(os.getenv("REFERENCE_CACHE_REFRESH_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class ReferenceSnapshot:
+    """Immutable, point-in-time copy of the four adjudication code tables"""
+
+    value_codes: MappingProxyType  # code -> (display, definition)
+    group_codes: MappingProxyType  # code -> (description, responsibility)
+    carc_codes: MappingProxyType  # code -> (description, action_hint)
+    rarc_codes: MappingProxyType  # code -> description
+    version: str
+    loaded_at: float
+
+    def category(self, code: str):
+        """Same contract as services._lookup_category, minus the DB"""
+        val = self.value_codes.get(code)
+        if val is not None:
+            return val[0], val[1], None
+        group = self.group_codes.get(code)
+        if group is not None:
+            return group[0], group[0], group[1]
+        return None
+
+    def reason(self, code: str, system: str):
+        """Same contract as services._lookup_reason, minus the DB"""
+        if "remittance-advice-remark-codes" in system:
+            desc = self.rarc_codes.get(code)
+            return None if desc is None else ("RARC", desc, None)
+        carc = self.carc_codes.get(code)
+        return None if carc is None else ("CARC", carc[0], carc[1])
+
+
+def _build_snapshot(value_rows, group_rows, carc_rows, rarc_rows) -> ReferenceSnapshot:
+    value_codes = {r.code: (r.display, r.definition) for r in value_rows}
+    group_codes = {r.code: (r.description, r.responsibility) for r in group_rows}
+    carc_codes = {r.code: (r.description, r.action_hint) for r in carc_rows}
+    rarc_codes = {r.code: r.description for r in rarc_rows}
+
+    digest = hashlib.sha256()
+    for table in (value_codes, group_codes, carc_codes, rarc_codes):
+        for code in sorted(table):
+            digest.update(repr((code, table[code])).encode())
+        digest.update(b"\x00")  # table separator
+
+    return ReferenceSnapshot(
+        value_codes=MappingProxyType(value_codes),
+        group_codes=MappingProxyType(group_codes),
+        carc_codes=MappingProxyType(carc_codes),
+        rarc_codes=MappingProxyType(rarc_codes),
+        version=digest.hexdigest()[:16],
+        loaded_at=time.time(),
+    )
+
+
+def _select(model, codes):
+    stmt = select(model)
+    if codes is not None:
+        stmt = stmt.where(model.code.in_(codes))
+    return stmt
+
+
+_TABLES = (AdjudicationValueCode, ClaimAdjustmentGroupCode, CarcCode, RarcCode)
+
+
+def load_snapshot(db: Session, codes=None) -> ReferenceSnapshot:
+    """
+    Read all four code tables in one pass and fingerprint their contents.
+    Passing `codes` restricts every table to that set (used for batch prefetch).
+    """
+    return _build_snapshot(
+        *(db.execute(_select(model, codes)).scalars().all() for model in _TABLES)
+    )
+
+
+async def aload_snapshot(db: AsyncSession, codes=None) -> ReferenceSnapshot:
+    """Async twin of load_snapshot"""
+    tables = []
+    for model in _TABLES:
+        result = await db.execute(_select(model, codes))
+        tables.append(result.scalars().all())
+    return _build_snapshot(*tables)
+
+
+class ReferenceCodeCache:
+    """
+    Holds the current ReferenceSnapshot.
+
+    Readers grab `self.snapshot` once and work against that object, so a
+    reload (a single attribute swap) never exposes a half-built table.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def refresh(self, db: Session = None) -> bool:
+        """Reload from the DB; swap the snapshot only if the checksum moved"""
+        if db is None:
+            with session_scope() as db:
+                fresh = load_snapshot(db)
+        else:
+            fresh = load_snapshot(db)
+
+        current = self.snapshot
+        if current is not None and current.version == fresh.version:
+            return False
+
+        self.snapshot = fresh
+        self.reloads += 1
+        logger.info(
+            f"Reference codes loaded (version={fresh.version}, "
+            f"carc={len(fresh.carc_codes)}, rarc={len(fresh.rarc_codes)})"
+        )
+        return True
+
+    async def refresh_periodically(self, interval: float = REFRESH_INTERVAL_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning(f"Reference code refresh failed: {e}")
+
+    def lookup_category(self, code: str, snapshot: ReferenceSnapshot = None):
+        snapshot = snapshot or self.snapshot
+        found = snapshot.category(code) if snapshot else None
+        self._count(found)
+        return found
+
+    def lookup_reason(
+        self, code: str, system: str, snapshot: ReferenceSnapshot = None
+    ):
+        snapshot = snapshot or self.snapshot
+        found = snapshot.reason(code, system) if snapshot else None
+        self._count(found)
+        return found
+
+    def _count(self, found):
+        if found is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    @property
+    def version(self):
+        snapshot = self.snapshot
+        return snapshot.version if snapshot else None
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        lookups = self.hits + self.misses
+        return {
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "snapshot_age_seconds": (
+                round(time.time() - snapshot.loaded_at, 1) if snapshot else None
+            ),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "reload_count": self.reloads,
+            "table_sizes": (
+                {
+                    "adjudication_value_codes": len(snapshot.value_codes),
+                    "claim_adjustment_group_codes": len(snapshot.group_codes),
+                    "carc_codes": len(snapshot.carc_codes),
+                    "rarc_codes": len(snapshot.rarc_codes),
+                }
+                if snapshot
+                else None
+            ),
+        }
+
+
+reference_cache = ReferenceCodeCache()
@@ -1,17 +1,35 @@
 import copy
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.mock_data import get_mock_claim
+from app.claim_repository import claim_repository
+from app.database import session_scope
+from app.eob import ExplanationOfBenefit, parse_eob, parsed_claims
+from app.json_encoding import dumps, encoded_bodies
 from app.models import (
     AdjudicationValueCode,
     CarcCode,
     ClaimAdjustmentGroupCode,
     RarcCode,
 )
+from app.reference_cache import (
+    ReferenceSnapshot,
+    aload_snapshot,
+    load_snapshot,
+    reference_cache,
+)
+from app.summary_cache import summary_cache
+from app.summary_materializer import summary_materializer
+
 
+def _lookup_category(db: Session, code: str, snapshot: ReferenceSnapshot = None):
+    # Served from the in-memory snapshot once it is loaded; the queries below
+    # only run if startup could not reach the code tables.
+    if snapshot is not None or reference_cache.snapshot is not None:
+        found = reference_cache.lookup_category(code, snapshot)
+        return found or ("Unknown", "Unknown", None)
 
-def _lookup_category(db: Session, code: str):
     val = (
         db.query(AdjudicationValueCode)
         .filter(AdjudicationValueCode.code == code)
@@ -29,7 +47,17 @@ def _lookup_category(db: Session, code: str):
     return "Unknown", "Unknown", None
 
 
-def _lookup_reason(db: Session, code: str, system: str):
+def _lookup_reason(
+    db: Session, code: str, system: str, snapshot: ReferenceSnapshot = None
+):
+    if snapshot is not None or reference_cache.snapshot is not None:
+        found = reference_cache.lookup_reason(code, system, snapshot)
+        if found:
+            return found
+        if "remittance-advice-remark-codes" in system:
+            return "RARC", "Unknown RARC", None
+        return "CARC", "Unknown CARC", None
+
     if "remittance-advice-remark-codes" in system:
         rarc = db.query(RarcCode).filter(RarcCode.code == code).first()
         return "RARC", rarc.description if rarc else "Unknown RARC", None
@@ -42,147 +70,197 @@ def _lookup_reason(db: Session, code: str, system: str):
         )
 
 
-def _extract_diagnoses(claim_resource: dict) -> list:
-    diagnoses = []
-    for diag in claim_resource.get("diagnosis", []):
-        coding = diag.get("diagnosisCodeableConcept", {}).get("coding", [{}])[0]
-        diag_type = "Unknown"
-        if diag.get("type"):
-            diag_type = diag["type"][0].get("coding", [{}])[0].get("display", "Unknown")
-        diagnoses.append(
-            {
-                "code": coding.get("code"),
-                "description": coding.get("display", "Unknown"),
-                "type": diag_type,
-            }
-        )
-    return diagnoses
+def _extract_diagnoses(eob: ExplanationOfBenefit) -> list:
+    return [
+        {"code": d.code, "description": d.description, "type": d.type}
+        for d in eob.diagnoses
+    ]
 
 
-def _process_adjudication_list(db: Session, raw_adjudications: list) -> list:
+def _process_adjudication_list(
+    db: Session, adjudications, snapshot: ReferenceSnapshot = None
+) -> list:
     result = []
-    for adj in raw_adjudications:
-        amount = adj.get("amount", {}).get("value", 0.0)
-        cat_code = adj.get("category", {}).get("coding", [{}])[0].get("code")
-        reason_code = adj.get("reason", {}).get("coding", [{}])[0].get("code")
-        reason_system = adj.get("reason", {}).get("coding", [{}])[0].get("system", "")
-
-        entry = {"amount": amount, "currency": "USD"}
-        if cat_code:
-            label, definition, resp = _lookup_category(db, cat_code)
-            entry.update(
-                {
-                    "category_code": cat_code,
-                    "category_label": label,
-                    "financial_responsibility": resp,
-                }
-            )
-        if reason_code:
-            r_type, desc, action = _lookup_reason(db, reason_code, reason_system)
-            entry.update(
-                {"reason_type": r_type, "reason_code": reason_code, "description": desc}
+    for adj in adjudications:
+        entry = {"amount": adj.amount, "currency": "USD"}
+        if adj.category_code:
+            label, definition, resp = _lookup_category(db, adj.category_code, snapshot)
+            entry["category_code"] = adj.category_code
+            entry["category_label"] = label
+            entry["financial_responsibility"] = resp
+        if adj.reason_code:
+            r_type, desc, action = _lookup_reason(
+                db, adj.reason_code, adj.reason_system, snapshot
             )
+            entry["reason_type"] = r_type
+            entry["reason_code"] = adj.reason_code
+            entry["description"] = desc
             if action is not None:
                 entry["action_needed"] = action
         result.append(entry)
     return result
 
 
-def get_claim_summary(db: Session, claim_id: str):
-    claim = get_mock_claim(claim_id)
+def get_claim_summary(
+    db: Session, claim_id: str, snapshot: ReferenceSnapshot = None, claim: dict = None
+):
+    """
+    Cached summary for a claim, shared by the HTTP routes and the agent tool.
+    Pass `claim` if the resource is already loaded to skip the store lookup.
+    The returned dict is shared between callers - copy it before mutating.
+    """
+    if summary_materializer.enabled and snapshot is None:
+        stored = summary_materializer.lookup(claim_id)
+        if stored is not None:
+            return stored
+    if claim is None:
+        claim = claim_repository.get(claim_id)
     if not claim:
         return None
+    return _cached_summary(db, claim_id, claim, snapshot)
 
-    summary = {
-        "claim_id": claim_id,
-        "fhir_id": claim.get("id"),
-        "patient_name": claim.get("patient", {}).get("display", "Unknown"),
-        "claim_status": claim.get(
-            "disposition", "Not specified"
-        ),  # e.g. Clean, Denied, Rejected
-        "processing_status": claim.get("outcome", "unknown"),  # FHIR outcome
-        "payment_date": claim.get("payment", {}).get("date", "Pending"),
-        "service_period": {
-            "start": claim.get("billablePeriod", {}).get("start"),
-            "end": claim.get("billablePeriod", {}).get("end"),
-        },
-        "diagnoses": _extract_diagnoses(claim),
-        "adjustments": _process_adjudication_list(db, claim.get("adjudication", [])),
-        "line_items": [],
-    }
 
-    summary.update(
-        {
-            "billed_amount": next(
-                (
-                    t["amount"]["value"]
-                    for t in claim.get("total", [])
-                    if t.get("category", {}).get("coding", [{}])[0].get("code")
-                    == "submitted"
-                ),
-                0.0,
-            ),
-            "paid_amount": next(
-                (
-                    t["amount"]["value"]
-                    for t in claim.get("total", [])
-                    if t.get("category", {}).get("coding", [{}])[0].get("code")
-                    == "benefit"
-                ),
-                0.0,
-            ),
-            "patient_responsibility": sum(
-                a["amount"]
-                for a in summary["adjustments"]
-                if a.get("category_code") == "PR"
-            ),
-            "contractual_writeoff": sum(
-                a["amount"]
-                for a in summary["adjustments"]
-                if a.get("category_code") == "CO"
-            ),
-            "primary_diagnosis": next(
-                (
-                    f"{d['code']} – {d['description']}"
-                    for d in summary["diagnoses"]
-                    if d["type"] in ("principal", "Admitting Diagnosis")
-                ),
-                "Unknown",
-            ),
-            "drg_code": next(
-                (
-                    diag.get("packageCode", {}).get("coding", [{}])[0].get("code")
-                    for diag in claim.get("diagnosis", [])
-                    if diag.get("packageCode")
-                ),
-                None,
-            ),
-        }
+async def aget_claim_summary(db: AsyncSession, claim_id: str, claim: dict = None):
+    """
+    Async twin of get_claim_summary. Codes come from the shared snapshot when
+    it is loaded; otherwise the claim's codes are fetched in one awaited query
+    per table, and the build itself never touches a session.
+    """
+    if summary_materializer.enabled:
+        stored = await summary_materializer.alookup(claim_id)
+        if stored is not None:
+            return stored
+    if claim is None:
+        claim = await claim_repository.aget(claim_id)
+    if not claim:
+        return None
+    snapshot = None
+    if reference_cache.snapshot is None:
+        snapshot = await aload_snapshot(db, _collect_codes(claim))
+    return _cached_summary(None, claim_id, claim, snapshot)
+
+
+def _cached_summary(db: Session, claim_id: str, claim: dict, snapshot: ReferenceSnapshot):
+    # One fingerprint serves both the summary cache and the parsed-claim cache
+    fingerprint = summary_cache.fingerprint(claim_id, claim)
+    return summary_cache.get_or_build(
+        claim_id,
+        claim,
+        reference_cache.version,
+        lambda: build_claim_summary(
+            db, claim_id, claim, snapshot, parsed_claims.get(claim_id, fingerprint, claim)
+        ),
+        fingerprint,
     )
 
-    for item in claim.get("item", []):
-        service = "Unknown Service"
-        if item.get("productOrService", {}).get("coding"):
-            service = item["productOrService"]["coding"][0].get("display", service)
-        elif item.get("revenue", {}).get("coding"):
-            rev = item["revenue"]["coding"][0].get("code", "???")
-            service = f"Revenue Code {rev}"
 
-        summary["line_items"].append(
+def build_claim_summary(
+    db: Session,
+    claim_id: str,
+    claim: dict,
+    snapshot: ReferenceSnapshot = None,
+    eob: ExplanationOfBenefit = None,
+):
+    """Build a summary; pass `eob` if the claim is already parsed"""
+    if eob is None:
+        eob = parse_eob(claim)
+    adjustments = _process_adjudication_list(db, eob.adjustments, snapshot)
+    return {
+        "claim_id": claim_id,
+        "fhir_id": eob.fhir_id,
+        "patient_name": eob.patient_name,
+        "claim_status": eob.disposition,  # e.g. Clean, Denied, Rejected
+        "processing_status": eob.outcome,  # FHIR outcome
+        "payment_date": eob.payment_date,
+        "service_period": {"start": eob.service_start, "end": eob.service_end},
+        "diagnoses": _extract_diagnoses(eob),
+        "adjustments": adjustments,
+        "line_items": [
             {
-                "service": service,
+                "service": item.service,
                 "adjudications": _process_adjudication_list(
-                    db, item.get("adjudication", [])
+                    db, item.adjudications, snapshot
                 ),
             }
-        )
+            for item in eob.items
+        ],
+        "billed_amount": eob.billed_amount,
+        "paid_amount": eob.paid_amount,
+        "patient_responsibility": eob.category_total("PR"),
+        "contractual_writeoff": eob.category_total("CO"),
+        "primary_diagnosis": next(
+            (f"{d.code} – {d.description}" for d in eob.diagnoses if d.is_primary),
+            "Unknown",
+        ),
+        "drg_code": eob.drg_code,
+    }
+
+
+def _collect_codes(claim: dict) -> set:
+    return parse_eob(claim).codes()
+
+
+def prefetch_reference_codes(db: Session, claims: list):
+    """
+    Resolve every code a batch of loaded claims (None for missing ones) needs
+    in one query per table. Returns None when the shared snapshot is loaded,
+    since it already covers them.
+    """
+    if reference_cache.snapshot is not None:
+        return None
+    codes = set()
+    for claim in claims:
+        if claim:
+            codes |= _collect_codes(claim)
+    return load_snapshot(db, codes)
 
-    return summary
+
+def build_summaries(claims: list) -> list:
+    """
+    Fresh (claim_id, summary) for a batch of (claim_id, resource) pairs, for
+    bulk exports. The batch's codes are resolved in one query per table when
+    the shared snapshot isn't loaded, and the summary and parsed-claim caches
+    are bypassed so a full pass over the store doesn't evict the entries the
+    API is serving.
+    """
+    parsed = [(claim_id, claim, parse_eob(claim)) for claim_id, claim in claims]
+    snapshot = reference_cache.snapshot
+    if snapshot is None:
+        codes = set()
+        for _, _, eob in parsed:
+            codes |= eob.codes()
+        with session_scope() as db:
+            snapshot = load_snapshot(db, codes)
+    return [
+        (claim_id, build_claim_summary(None, claim_id, claim, snapshot, eob))
+        for claim_id, claim, eob in parsed
+    ]
+
+
+def redact_pii(summary: dict) -> dict:
+    """
+    Shallow copy of a summary (or a projection of one) with the patient name
+    masked and internal IDs dropped. Keys the input lacks are not added.
+    Nested values are shared, so only use it for output that is encoded.
+    """
+    safe = {key: value for key, value in summary.items() if key != "fhir_id"}
+    if "patient_name" in safe:
+        safe["patient_name"] = "REDACTED"
+    return safe
 
 
 def sanitize_for_agent(summary: dict) -> dict:
     """Remove PII and internal IDs before sending to AI"""
-    safe = copy.deepcopy(summary)
-    safe["patient_name"] = "REDACTED"
-    safe.pop("fhir_id", None)
-    return safe
+    return copy.deepcopy(redact_pii(summary))
+
+
+def encoded_summary(claim_id: str, summary: dict, include_pii: bool = False) -> bytes:
+    """
+    JSON body for a summary, sanitized unless `include_pii`. Cached for as
+    long as the summary cache keeps handing out the same summary object.
+    """
+    if include_pii:
+        return encoded_bodies.get_or_encode(("summary", claim_id), summary)
+    return encoded_bodies.get_or_encode(
+        ("sanitized", claim_id), summary, lambda: dumps(redact_pii(summary))
+    )
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.outputs.chat_generation import merge_chat_generation_chunks
+
+_CLAIM_ID = re.compile(r"\b\d{6,20}\b")
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Offline stand-in for the chat model, for load tests and benchmarks.
+
+    It behaves like the real agent loop: if the current turn names a claim
+    and has no tool result yet, it streams a `fetch_claim_health_record`
+    call; otherwise it streams an answer built from the latest tool result.
+    Timing is configurable: a first-token delay drawn from a distribution,
+    then a steady token rate.
+    """
+
+    first_token_ms: float = 300.0
+    first_token_jitter_ms: float = 0.0
+    latency_distribution: str = "fixed"  # fixed | uniform | lognormal
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 60
+    call_tools: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    # --- timing ---
+    def _first_token_delay(self) -> float:
+        mean, jitter = self.first_token_ms, self.first_token_jitter_ms
+        if self.latency_distribution == "uniform":
+            ms = random.uniform(mean - jitter, mean + jitter)
+        elif self.latency_distribution == "lognormal" and mean > 0 and jitter > 0:
+            sigma = math.sqrt(math.log(1 + (jitter / mean) ** 2))
+            ms = random.lognormvariate(math.log(mean) - sigma**2 / 2, sigma)
+        else:
+            ms = mean
+        return max(0.0, ms) / 1000
+
+    def _token_interval(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    # --- content ---
+    def _plan(self, messages) -> list:
+        """The chunks this call will stream"""
+        turn = []
+        for m in reversed(messages):
+            turn.append(m)
+            if isinstance(m, HumanMessage):
+                break
+        human = turn[-1] if turn and isinstance(turn[-1], HumanMessage) else None
+        tool_results = [m for m in turn if isinstance(m, ToolMessage)]
+
+        claim_ids = _CLAIM_ID.findall(human.content) if human else []
+        if self.call_tools and claim_ids and not tool_results:
+            return [
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": "fetch_claim_health_record",
+                            "args": json.dumps({"claim_id": claim_id}),
+                            "id": f"call_{uuid.uuid4().hex[:12]}",
+                            "index": i,
+                        }
+                        for i, claim_id in enumerate(dict.fromkeys(claim_ids))
+                    ],
+                )
+            ]
+
+        words = self._answer(tool_results[0] if tool_results else None).split()
+        words += [f"stub{i}" for i in range(max(0, self.answer_tokens - len(words)))]
+        return [AIMessageChunk(content=w + " ") for w in words[: self.answer_tokens]]
+
+    @staticmethod
+    def _answer(tool_result) -> str:
+        try:
+            data = json.loads(tool_result.content)
+        except (AttributeError, TypeError, ValueError):
+            return "I can help with claims questions. Please share a claim ID."
+        if "error" in data:
+            return "I couldn't find that claim. Please double-check the ID."
+        return (
+            f"Claim {data.get('claim_id')} is {data.get('claim_status')}. "
+            f"Billed ${data.get('billed_amount', 0):,.2f}, paid ${data.get('paid_amount', 0):,.2f}, "
+            f"patient responsibility ${data.get('patient_responsibility', 0):,.2f}."
+        )
+
+    # --- LangChain hooks ---
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self._first_token_delay())
+        interval = self._token_interval()
+        for i, message in enumerate(self._plan(messages)):
+            if i and interval:
+                time.sleep(interval)
+            chunk = ChatGenerationChunk(message=message)
+            if run_manager:
+                run_manager.on_llm_new_token(message.content, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self._first_token_delay())
+        interval = self._token_interval()
+        for i, message in enumerate(self._plan(messages)):
+            if i and interval:
+                await asyncio.sleep(interval)
+            chunk = ChatGenerationChunk(message=message)
+            if run_manager:
+                await run_manager.on_llm_new_token(message.content, chunk=chunk)
+            yield chunk
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = list(self._stream(messages, stop, run_manager, **kwargs))
+        return ChatResult(generations=[merge_chat_generation_chunks(chunks)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = [c async for c in self._astream(messages, stop, run_manager, **kwargs)]
+        return ChatResult(generations=[merge_chat_generation_chunks(chunks)])
+
+
+def stub_model_from_env() -> StubChatModel:
+    return StubChatModel(
+        first_token_ms=float(os.getenv("STUB_FIRST_TOKEN_MS", "300")),
+        first_token_jitter_ms=float(os.getenv("STUB_FIRST_TOKEN_JITTER_MS", "0")),
+        latency_distribution=os.getenv("STUB_LATENCY_DISTRIBUTION", "fixed"),
+        tokens_per_second=float(os.getenv("STUB_TOKENS_PER_SECOND", "50")),
+        answer_tokens=int(os.getenv("STUB_ANSWER_TOKENS", "60")),
+        call_tools=os.getenv("STUB_CALL_TOOLS", "true").lower() == "true",
+    )
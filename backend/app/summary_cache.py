@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "1024"))
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "600"))
+
+
+def claim_fingerprint(claim: dict) -> str:
+    """Stable content hash of a raw FHIR resource"""
+    encoded = json.dumps(claim, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+class _Entry:
+    __slots__ = ("claim", "fingerprint", "ref_version", "summary", "expires_at")
+
+    def __init__(self, claim, fingerprint, ref_version, summary, expires_at):
+        self.claim = claim
+        self.fingerprint = fingerprint
+        self.ref_version = ref_version
+        self.summary = summary
+        self.expires_at = expires_at
+
+
+class SummaryCache:
+    """
+    LRU + TTL cache of built claim summaries.
+
+    An entry is only served if the claim content hash and the reference-data
+    version both still match, so edits to either side miss naturally. The
+    entry also remembers which claim object it hashed; as long as the store
+    hands back that same object we skip re-hashing it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SUMMARY_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = SUMMARY_CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def fingerprint(self, claim_id: str, claim: dict) -> str:
+        with self._lock:
+            entry = self._entries.get(claim_id)
+        if entry is not None and entry.claim is claim:
+            return entry.fingerprint
+        return claim_fingerprint(claim)
+
+    def get_or_build(self, claim_id: str, claim: dict, ref_version, build, fingerprint: str = None):
+        if not self.enabled:
+            return build()
+
+        fingerprint = fingerprint or self.fingerprint(claim_id, claim)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(claim_id)
+            if (
+                entry is not None
+                and entry.expires_at > now
+                and entry.fingerprint == fingerprint
+                and entry.ref_version == ref_version
+            ):
+                self._entries.move_to_end(claim_id)
+                self.hits += 1
+                return entry.summary
+            self.misses += 1
+
+        summary = build()
+        if summary is None:
+            return None
+
+        with self._lock:
+            self._entries[claim_id] = _Entry(
+                claim, fingerprint, ref_version, summary, now + self.ttl_seconds
+            )
+            self._entries.move_to_end(claim_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return summary
+
+    def invalidate(self, claim_id: str) -> bool:
+        with self._lock:
+            return self._entries.pop(claim_id, None) is not None
+
+    def clear(self) -> int:
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+        return dropped
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+        }
+
+
+summary_cache = SummaryCache()
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from app.claim_repository import claim_repository
+from app.database import session_scope
+from app.reference_cache import reference_cache
+
+logger = logging.getLogger("claims-api.materialized-summaries")
+
+# Opt-in: store each claim's summary next to its resource at load time, so a
+# summary read is one keyed lookup instead of a rebuild
+SUMMARY_MATERIALIZE = os.getenv("SUMMARY_MATERIALIZE", "false").lower() == "true"
+SUMMARY_REBUILD_BATCH_SIZE = int(os.getenv("SUMMARY_REBUILD_BATCH_SIZE", "500"))
+# How often to look for summaries built against an older reference-code version
+SUMMARY_REBUILD_CHECK_SECONDS = float(os.getenv("SUMMARY_REBUILD_CHECK_SECONDS", "60"))
+
+
+def _normalized(value):
+    # Stored summaries come back through JSON; compare like with like
+    return json.loads(json.dumps(value, default=str))
+
+
+class SummaryMaterializer:
+    """
+    Keeps materialized summaries in the claim store current.
+
+    Summaries are written when claims are ingested and rebuilt by a
+    background job whenever the reference codes change. A stored summary is
+    only served if it was built against the current reference version, so a
+    rebuild in progress never serves stale text - it falls back to the live
+    computation until the row is rebuilt.
+    """
+
+    def __init__(self, repository=claim_repository, enabled: bool = SUMMARY_MATERIALIZE):
+        self.repository = repository
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.built_version = None
+        self.has_built = False
+        self.job = None  # progress of the current or last rebuild
+
+    # --- reads ---
+    def _check(self, found):
+        if found is None:
+            self.misses += 1
+            return None
+        summary, ref_version = found
+        if ref_version != reference_cache.version:
+            self.stale += 1
+            return None
+        self.hits += 1
+        return summary
+
+    def lookup(self, claim_id: str):
+        """The stored summary if it is current, else None"""
+        return self._check(self.repository.get_summary(claim_id))
+
+    async def alookup(self, claim_id: str):
+        return self._check(await self.repository.aget_summary(claim_id))
+
+    # --- writes ---
+    @staticmethod
+    def _build(claims: list) -> list:
+        from app.services import build_claim_summary
+
+        snapshot = reference_cache.snapshot
+        ref_version = snapshot.version if snapshot else None
+        if snapshot is not None:
+            return [
+                (claim_id, build_claim_summary(None, claim_id, claim, snapshot), ref_version)
+                for claim_id, claim in claims
+            ]
+        with session_scope() as db:
+            return [
+                (claim_id, build_claim_summary(db, claim_id, claim), ref_version)
+                for claim_id, claim in claims
+            ]
+
+    def materialize(self, claims: list) -> int:
+        """Build and store summaries for (claim_id, resource) pairs"""
+        return self.repository.put_summaries(self._build(claims))
+
+    def rebuild(self, everything: bool = False) -> dict:
+        """
+        Rebuild every summary that is missing or out of date (all of them if
+        `everything`). Runs in a worker thread; progress is in `self.job`.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("a rebuild is already running")
+        try:
+            ref_version = reference_cache.version
+            job = {
+                "state": "running",
+                "everything": everything,
+                "ref_version": ref_version,
+                "total": self.repository.count_unmaterialized(ref_version, everything),
+                "done": 0,
+                "failed": 0,
+                "started_at": time.time(),
+                "finished_at": None,
+                "error": None,
+            }
+            self.job = job
+            for batch in self.repository.iter_unmaterialized(
+                ref_version, SUMMARY_REBUILD_BATCH_SIZE, everything
+            ):
+                try:
+                    job["done"] += self.materialize(batch)
+                except Exception as e:
+                    job["failed"] += len(batch)
+                    job["error"] = str(e).splitlines()[0]
+                    logger.warning(f"Summary rebuild batch failed: {job['error']}")
+            job["state"] = "failed" if job["failed"] else "finished"
+            job["finished_at"] = time.time()
+            if not job["failed"]:
+                self.built_version = ref_version
+                self.has_built = True
+            logger.info(
+                f"Summary rebuild {job['state']}: {job['done']} built, "
+                f"{job['failed']} failed (reference version {ref_version})"
+            )
+            return job
+        finally:
+            self._lock.release()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def rebuild_periodically(self, interval: float = SUMMARY_REBUILD_CHECK_SECONDS):
+        """Background task: rebuild whenever the reference version moves"""
+        while True:
+            if not self.has_built or self.built_version != reference_cache.version:
+                try:
+                    await asyncio.to_thread(self.rebuild)
+                except Exception as e:
+                    logger.warning(f"Summary rebuild failed: {e}")
+            await asyncio.sleep(interval)
+
+    # --- checks ---
+    def verify(self, claim_ids: list) -> dict:
+        """Compare stored summaries against a fresh computation"""
+        from app.services import build_claim_summary
+
+        report = {"checked": 0, "matching": 0, "missing": 0, "stale": 0, "mismatched": []}
+        snapshot = reference_cache.snapshot
+        with session_scope() as db:
+            for claim_id in claim_ids:
+                claim = self.repository.get(claim_id)
+                if claim is None:
+                    continue
+                report["checked"] += 1
+                found = self.repository.get_summary(claim_id)
+                if found is None:
+                    report["missing"] += 1
+                    continue
+                stored, ref_version = found
+                if ref_version != reference_cache.version:
+                    report["stale"] += 1
+                    continue
+                live = _normalized(build_claim_summary(db, claim_id, claim, snapshot))
+                stored = _normalized(stored)
+                if stored == live:
+                    report["matching"] += 1
+                else:
+                    report["mismatched"].append(
+                        {
+                            "claim_id": claim_id,
+                            "fields": sorted(
+                                k for k in live.keys() | stored.keys() if live.get(k) != stored.get(k)
+                            ),
+                        }
+                    )
+        report["consistent"] = not report["mismatched"]
+        return report
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.stale
+        job = dict(self.job) if self.job else None
+        if job and job["total"]:
+            job["percent"] = round(100 * (job["done"] + job["failed"]) / job["total"], 1)
+        return {
+            "enabled": self.enabled,
+            "store": self.repository.name,
+            "reference_version": reference_cache.version,
+            "built_version": self.built_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "rebuild": job,
+        }
+
+
+summary_materializer = SummaryMaterializer()
@@ -0,0 +1,105 @@
+"""
+Concurrency benchmark for /chat.
+
+Starts the API in-process on a local port with the LLM swapped for a stub
+that streams fixed-rate tokens, then fires N simultaneous /chat streams and
+reports time-to-first-token and throughput. It runs once with the legacy
+synchronous chatbot node and once with the async node, so the two can be
+compared side by side. Nothing leaves the machine.
+
+    cd backend
+    python -m benchmarks.chat_concurrency --streams 64 --tokens 40
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")  # agent.py builds ChatOpenAI at import
+
+import httpx
+from langchain_core.messages import SystemMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from app import agent
+from app.stub_model import StubChatModel
+from benchmarks.harness import Server, free_port, pct
+
+
+def sync_chatbot(state):
+    """The pre-async node, kept here only as the benchmark baseline"""
+    messages = state["messages"]
+    if not any(isinstance(m, SystemMessage) for m in messages):
+        messages = [SystemMessage(content=agent.SYSTEM_PROMPT)] + messages
+    return {"messages": [agent.model_w_tools.invoke(messages)]}
+
+
+async def _one_chat(client: httpx.AsyncClient, n: int):
+    start = time.perf_counter()
+    ttft = None
+    tokens = 0
+    async with client.stream(
+        "POST", "/chat", json={"query": "hello", "thread_id": f"bench-{n}"}
+    ) as resp:
+        async for chunk in resp.aiter_text():
+            if ttft is None and chunk:
+                ttft = time.perf_counter() - start
+            tokens += len(chunk.split())
+    return ttft, time.perf_counter() - start, tokens
+
+
+async def _run(port: int, streams: int):
+    limits = httpx.Limits(max_connections=streams)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=300
+    ) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(_one_chat(client, i) for i in range(streams)))
+        wall = time.perf_counter() - start
+    ttfts = [r[0] for r in results if r[0] is not None]
+    return {
+        "ttft_p50_ms": pct(ttfts, 0.50) * 1000,
+        "ttft_p95_ms": pct(ttfts, 0.95) * 1000,
+        "ttft_max_ms": max(ttfts) * 1000,
+        "chat_p50_ms": statistics.median(r[1] for r in results) * 1000,
+        "wall_s": wall,
+        "chats_per_s": streams / wall,
+        "tokens_per_s": sum(r[2] for r in results) / wall,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=64)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--first-token-ms", type=float, default=200)
+    parser.add_argument("--token-interval-ms", type=float, default=10)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    agent.model_w_tools = StubChatModel(
+        answer_tokens=args.tokens,
+        first_token_ms=args.first_token_ms,
+        tokens_per_second=1000 / args.token_interval_ms if args.token_interval_ms else 0,
+        call_tools=False,
+    )
+
+    port = free_port()
+    rows = {}
+    for label, node in (("sync node", sync_chatbot), ("async node", agent.chatbot)):
+        agent.graph = agent.build_graph(node, checkpointer=MemorySaver())
+        with Server(port):
+            rows[label] = asyncio.run(_run(port, args.streams))
+
+    print(f"{args.streams} concurrent /chat streams, {args.tokens} tokens each\n")
+    metrics = list(next(iter(rows.values())))
+    print(f"{'':<14}" + "".join(f"{label:>14}" for label in rows))
+    for metric in metrics:
+        print(f"{metric:<14}" + "".join(f"{rows[label][metric]:>14.1f}" for label in rows))
+
+
+if __name__ == "__main__":
+    main_cli()
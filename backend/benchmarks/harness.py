@@ -0,0 +1,75 @@
+"""Shared plumbing for the benchmark scripts: an in-process server and an offline reference DB."""
+
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import uvicorn
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+INIT_SQL = Path(__file__).resolve().parents[2] / "database" / "init.sql"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def _init_script(init_sql: Path) -> str:
+    # SQLite's Date type only parses ISO dates
+    return init_sql.read_text().replace("'05/20/2018'", "'2018-05-20'")
+
+
+def seed_reference_db(path: str, init_sql: Path = INIT_SQL) -> str:
+    """
+    Load database/init.sql into a SQLite file and return its DATABASE_URL,
+    so the reference-code lookups work without Postgres.
+    """
+    with sqlite3.connect(path) as conn:
+        conn.executescript(_init_script(init_sql))
+    return f"sqlite:///{Path(path).resolve()}"
+
+
+def memory_reference_engine(init_sql: Path = INIT_SQL):
+    """An in-memory SQLite engine holding the reference tables"""
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    raw = engine.raw_connection()
+    try:
+        raw.driver_connection.executescript(_init_script(init_sql))
+    finally:
+        raw.close()
+    return engine
+
+
+class Server:
+    """Runs main.app under uvicorn on a background thread"""
+
+    def __init__(self, port: int, lifespan: str = "off"):
+        from app import main
+
+        config = uvicorn.Config(
+            main.app, host="127.0.0.1", port=port, log_level="warning", lifespan=lifespan
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
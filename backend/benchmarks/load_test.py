@@ -0,0 +1,240 @@
+"""
+Open-loop load test for the claims API.
+
+Sends a mix of /chat, /claims/{id}/summary and /claims/{id}/raw requests at a
+fixed target rate, and reports latency percentiles, chat time-to-first-token,
+streamed tokens/sec and error rates per endpoint. Arrivals follow a schedule,
+not the previous response. A slow server builds a backlog instead of quietly
+lowering the offered load.
+
+With no --url it is fully offline. The API starts in-process with the stub
+model (CHAT_MODEL_PROVIDER=stub) and a SQLite copy of database/init.sql, so
+no LLM endpoint or Postgres is needed:
+
+    cd backend
+    python -m benchmarks.load_test --rps 50 --duration 30 --mix chat=1,summary=4,raw=4
+    python -m benchmarks.load_test --url http://localhost:8000 --rps 5 --mix chat=1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from benchmarks.harness import Server, free_port, pct, seed_reference_db
+
+CHAT_QUERIES = (
+    "Why was claim {id} denied?",
+    "How much do I owe on claim {id}?",
+    "Explain the adjustments on {id}",
+)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.ttfts = []
+        self.tokens = 0
+        self.stream_seconds = 0.0
+        self.errors = {}
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def report(self, duration: float) -> dict:
+        done = len(self.latencies)
+        failed = sum(self.errors.values())
+        row = {
+            "requests": done + failed,
+            "ok": done,
+            "error_rate": round(failed / (done + failed), 4) if done + failed else 0.0,
+            "errors": self.errors,
+            "rps": round(done / duration, 2),
+        }
+        if self.latencies:
+            row.update(
+                {f"latency_p{p}_ms": round(pct(self.latencies, p / 100) * 1000, 1) for p in (50, 95, 99)}
+            )
+        if self.ttfts:
+            row.update(
+                {f"ttft_p{p}_ms": round(pct(self.ttfts, p / 100) * 1000, 1) for p in (50, 95, 99)}
+            )
+            row["tokens_per_s"] = round(self.tokens / duration, 1)
+            row["tokens_per_s_per_stream"] = (
+                round(self.tokens / self.stream_seconds, 1) if self.stream_seconds else None
+            )
+        return row
+
+
+async def _chat(client, claim_id, stats: EndpointStats):
+    query = random.choice(CHAT_QUERIES).format(id=claim_id)
+    start = time.perf_counter()
+    first = None
+    tokens = 0
+    async with client.stream(
+        "POST", "/chat", json={"query": query, "thread_id": f"load-{uuid.uuid4().hex[:12]}"}
+    ) as resp:
+        if resp.status_code != 200:
+            await resp.aread()
+            stats.error(str(resp.status_code))
+            return
+        async for chunk in resp.aiter_text():
+            if first is None and chunk.strip():
+                first = time.perf_counter()
+            tokens += len(chunk.split())
+    end = time.perf_counter()
+    stats.latencies.append(end - start)
+    if first is None:
+        stats.error("empty_stream")
+        return
+    stats.ttfts.append(first - start)
+    stats.tokens += tokens
+    stats.stream_seconds += end - first
+
+
+async def _get(client, path, stats: EndpointStats):
+    start = time.perf_counter()
+    resp = await client.get(path)
+    if resp.status_code != 200:
+        stats.error(str(resp.status_code))
+        return
+    stats.latencies.append(time.perf_counter() - start)
+
+
+async def _one(client, endpoint, claim_id, stats: EndpointStats):
+    try:
+        if endpoint == "chat":
+            await _chat(client, claim_id, stats)
+        elif endpoint == "summary":
+            await _get(client, f"/claims/{claim_id}/summary", stats)
+        else:
+            await _get(client, f"/claims/{claim_id}/raw", stats)
+    except httpx.TimeoutException:
+        stats.error("timeout")
+    except httpx.HTTPError as e:
+        stats.error(type(e).__name__)
+
+
+def _parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("chat", "summary", "raw"):
+            raise SystemExit(f"unknown endpoint in --mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def _run(base_url: str, args) -> dict:
+    mix = _parse_mix(args.mix)
+    endpoints, weights = list(mix), list(mix.values())
+    stats = {name: EndpointStats() for name in endpoints}
+    limits = httpx.Limits(max_connections=args.max_connections)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        claim_ids = args.claims or (await client.get("/claims")).json()["available_claims"]
+        tasks = []
+        lag = []
+        start = time.perf_counter()
+        due = start
+        while due - start < args.duration:
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                lag.append(-delay)
+            endpoint = random.choices(endpoints, weights)[0]
+            tasks.append(
+                asyncio.create_task(
+                    _one(client, endpoint, random.choice(claim_ids), stats[endpoint])
+                )
+            )
+            gap = 1 / args.rps
+            due += random.expovariate(args.rps) if args.arrivals == "poisson" else gap
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "target_rps": args.rps,
+        "sent": len(tasks),
+        "elapsed_s": round(elapsed, 2),
+        "max_dispatch_lag_ms": round(max(lag, default=0) * 1000, 1),
+        "endpoints": {name: s.report(elapsed) for name, s in stats.items()},
+    }
+
+
+def _print(result: dict):
+    print(
+        f"{result['sent']} requests at {result['target_rps']} rps target over "
+        f"{result['elapsed_s']}s (max dispatch lag {result['max_dispatch_lag_ms']} ms)\n"
+    )
+    rows = result["endpoints"]
+    metrics = []
+    for row in rows.values():
+        metrics += [m for m in row if m not in metrics and m != "errors"]
+    print(f"{'':<24}" + "".join(f"{name:>12}" for name in rows))
+    for metric in metrics:
+        cells = "".join(f"{str(rows[name].get(metric, '-')):>12}" for name in rows)
+        print(f"{metric:<24}{cells}")
+    for name, row in rows.items():
+        if row["errors"]:
+            print(f"\n{name} errors: {row['errors']}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="target a running API instead of an in-process stub")
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of arrivals")
+    parser.add_argument("--arrivals", choices=("constant", "poisson"), default="poisson")
+    parser.add_argument("--mix", default="chat=1,summary=4,raw=4")
+    parser.add_argument("--claims", nargs="*", help="claim IDs to use (default: GET /claims)")
+    parser.add_argument("--max-connections", type=int, default=512)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", dest="json_path", help="also write the results here")
+    stub = parser.add_argument_group("stub model (in-process only)")
+    stub.add_argument("--first-token-ms", type=float, default=300)
+    stub.add_argument("--first-token-jitter-ms", type=float, default=100)
+    stub.add_argument("--latency-distribution", choices=("fixed", "uniform", "lognormal"), default="lognormal")
+    stub.add_argument("--tokens-per-second", type=float, default=50)
+    stub.add_argument("--answer-tokens", type=int, default=60)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.url:
+        result = asyncio.run(_run(args.url.rstrip("/"), args))
+    else:
+        workdir = tempfile.mkdtemp(prefix="claims-load-")
+        # Must be set before app.* is imported: these are read at import time
+        os.environ.update(
+            {
+                "DATABASE_URL": seed_reference_db(os.path.join(workdir, "reference.db")),
+                "CHAT_MODEL_PROVIDER": "stub",
+                "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "stub"),
+                "STUB_FIRST_TOKEN_MS": str(args.first_token_ms),
+                "STUB_FIRST_TOKEN_JITTER_MS": str(args.first_token_jitter_ms),
+                "STUB_LATENCY_DISTRIBUTION": args.latency_distribution,
+                "STUB_TOKENS_PER_SECOND": str(args.tokens_per_second),
+                "STUB_ANSWER_TOKENS": str(args.answer_tokens),
+            }
+        )
+        os.environ.setdefault("DB_MODE", "sync")  # no asyncpg without Postgres
+        port = free_port()
+        with Server(port, lifespan="on"):
+            result = asyncio.run(_run(f"http://127.0.0.1:{port}", args))
+
+    _print(result)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
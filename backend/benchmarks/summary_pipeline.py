@@ -0,0 +1,251 @@
+"""
+Micro-benchmarks for the claim summary pipeline.
+
+Times the hot-path functions (get_claim_summary, build_claim_summary,
+eob.parse_eob, _extract_diagnoses, _process_adjudication_list,
+sanitize_for_agent and mock_data._extract_uc_id). They run against every mock claim and against
+synthetic claims with hundreds of line items, held in the in-memory claim
+store. The reference tables live in an in-memory SQLite copy of
+database/init.sql.
+
+Each function runs twice: once with the reference-code snapshot loaded,
+as in production, and once with the code lookups going to the tables.
+For each case the suite records ops/sec, peak allocation per call
+(tracemalloc) and SQL queries per call.
+
+    cd backend
+    python -m benchmarks.summary_pipeline --save baseline.json
+    python -m benchmarks.summary_pipeline --compare baseline.json   # exit 1 on regression
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["CLAIM_STORE"] = "memory"  # synthetic claims must never reach a real store
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import mock_data, services
+from app.claim_repository import claim_repository
+from app.eob import parse_eob
+from app.reference_cache import load_snapshot, reference_cache
+from app.summary_cache import summary_cache
+from benchmarks.harness import memory_reference_engine
+
+_CARC_SYSTEM = "http://www.x12.org/codes/claim-adjustment-reason-codes"
+_RARC_SYSTEM = "http://www.x12.org/codes/remittance-advice-remark-codes"
+_GROUP_SYSTEM = "http://www.x12.org/codes/claim-adjustment-group-codes/"
+
+
+def _coding(code, system=None):
+    coding = {"code": code}
+    if system:
+        coding["system"] = system
+    return {"coding": [coding]}
+
+
+def synthetic_claim(n_items: int, snapshot) -> dict:
+    """
+    The first mock EOB grown to `n_items` line items. Each item gets a
+    group/CARC adjustment, a value-code amount and, on every third line,
+    a RARC remark. Codes cycle through the real reference tables.
+    """
+    claim = copy.deepcopy(mock_data.EXAMPLE["entry"][0]["resource"])
+    claim["identifier"][0]["value"] = f"9{n_items:09d}"
+    claim["id"] = f"synthetic-{n_items}"
+    template = claim["item"][0]
+
+    groups = itertools.cycle(sorted(snapshot.group_codes))
+    carcs = itertools.cycle(sorted(snapshot.carc_codes))
+    rarcs = itertools.cycle(sorted(snapshot.rarc_codes))
+    values = itertools.cycle(sorted(snapshot.value_codes))
+
+    items = []
+    for seq in range(1, n_items + 1):
+        item = copy.deepcopy(template)
+        item["sequence"] = seq
+        adjudication = [
+            {
+                "category": _coding(next(groups), _GROUP_SYSTEM),
+                "reason": _coding(next(carcs), _CARC_SYSTEM),
+                "amount": {"value": 10.0 + seq, "currency": "USD"},
+            },
+            {"category": _coding(next(values)), "amount": {"value": 100.0, "currency": "USD"}},
+        ]
+        if seq % 3 == 0:
+            adjudication.append(
+                {"reason": _coding(next(rarcs), _RARC_SYSTEM), "amount": {"value": 0.0}}
+            )
+        item["adjudication"] = adjudication
+        items.append(item)
+    claim["item"] = items
+    return claim
+
+
+def _functions(db, claim_id: str, claim: dict):
+    eob = parse_eob(claim)
+    adjudications = list(eob.adjudications())
+    summary = services.build_claim_summary(db, claim_id, claim)
+
+    def get_summary_cold():
+        summary_cache.invalidate(claim_id)
+        return services.get_claim_summary(db, claim_id)
+
+    services.get_claim_summary(db, claim_id)
+
+    return {
+        "get_claim_summary[miss]": get_summary_cold,
+        "get_claim_summary[hit]": lambda: services.get_claim_summary(db, claim_id),
+        "build_claim_summary": lambda: services.build_claim_summary(db, claim_id, claim),
+        "parse_eob": lambda: parse_eob(claim),
+        "_extract_diagnoses": lambda: services._extract_diagnoses(eob),
+        "_process_adjudication_list": lambda: services._process_adjudication_list(db, adjudications),
+        "sanitize_for_agent": lambda: services.sanitize_for_agent(summary),
+        "_extract_uc_id": lambda: mock_data._extract_uc_id(claim),
+    }
+
+
+def _ops_per_sec(fn, min_time: float, repeat: int) -> float:
+    # Grow the loop until one timing takes min_time, then keep the best of `repeat`
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed < min_time / 10 else max(2, int(min_time / elapsed) + 1)
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return loops / best
+
+
+def _peak_alloc_kib(fn) -> float:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        return (tracemalloc.get_traced_memory()[1] - before) / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run(args) -> dict:
+    engine = memory_reference_engine()
+    queries = [0]
+    event.listen(engine, "before_cursor_execute", lambda *a: queries.__setitem__(0, queries[0] + 1))
+    db = sessionmaker(bind=engine)()
+    snapshot = load_snapshot(db)
+
+    claims = {claim_id: claim_repository.get(claim_id) for claim_id in claim_repository.list_ids()}
+    for n in args.line_items:
+        claim = synthetic_claim(n, snapshot)
+        claims[mock_data._extract_uc_id(claim)] = claim
+    # get_claim_summary resolves IDs through the claim store
+    claim_repository.put_many(list(claims.values()))
+
+    results = {}
+    for mode in args.reference:
+        reference_cache.snapshot = snapshot if mode == "snapshot" else None
+        summary_cache.clear()
+        for claim_id, claim in claims.items():
+            label = f"{claim_id} ({len(claim.get('item', []))} items)"
+            for name, fn in _functions(db, claim_id, claim).items():
+                if args.only and not any(o in name for o in args.only):
+                    continue
+                fn()  # warm up
+                queries[0] = 0
+                fn()
+                per_call_queries = queries[0]
+                results[f"{mode}/{label}/{name}"] = {
+                    "ops_per_s": round(_ops_per_sec(fn, args.min_time, args.repeat), 1),
+                    "alloc_peak_kib": round(_peak_alloc_kib(fn), 1),
+                    "queries": per_call_queries,
+                }
+    reference_cache.snapshot = None
+    return results
+
+
+def _print(results: dict):
+    width = max(map(len, results)) + 2
+    print(f"{'case':<{width}}{'ops/s':>14}{'peak KiB':>12}{'queries':>10}")
+    for key, row in results.items():
+        print(
+            f"{key:<{width}}{row['ops_per_s']:>14,.1f}"
+            f"{row['alloc_peak_kib']:>12.1f}{row['queries']:>10}"
+        )
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print current vs. baseline; return the cases that regressed"""
+    regressions = []
+    width = max(map(len, results)) + 2
+    print(f"{'case':<{width}}{'ops/s Δ':>10}{'peak Δ':>10}{'queries':>12}")
+    for key, row in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<{width}}{'(new)':>10}")
+            continue
+        speed = row["ops_per_s"] / base["ops_per_s"] - 1 if base["ops_per_s"] else 0.0
+        memory = (
+            row["alloc_peak_kib"] / base["alloc_peak_kib"] - 1 if base["alloc_peak_kib"] else 0.0
+        )
+        slower = speed < -threshold
+        bigger = memory > threshold
+        more_queries = row["queries"] > base["queries"]
+        flag = "  REGRESSION" if slower or bigger or more_queries else ""
+        print(
+            f"{key:<{width}}{speed:>+10.1%}{memory:>+10.1%}"
+            f"{base['queries']:>6} →{row['queries']:>4}{flag}"
+        )
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--line-items", type=int, nargs="*", default=[100, 500],
+                        help="sizes of the synthetic claims")
+    parser.add_argument("--reference", nargs="+", choices=("snapshot", "db"),
+                        default=["snapshot", "db"], help="where code lookups are served from")
+    parser.add_argument("--only", nargs="*", help="run only functions whose name contains one of these")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown/growth that counts as a regression")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+    else:
+        _print(results)
+        regressions = []
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
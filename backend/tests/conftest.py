@@ -0,0 +1,39 @@
+"""
+The app reads its configuration at import time, so the environment is set
+here first: the in-memory claim store (mock claims) and a SQLite copy of
+database/init.sql for the reference codes.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+from benchmarks.harness import seed_reference_db  # noqa: E402
+
+_reference_db = Path(tempfile.mkdtemp(prefix="claims-tests-")) / "reference.db"
+os.environ["DATABASE_URL"] = seed_reference_db(str(_reference_db))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["CLAIM_STORE"] = "memory"
+os.environ["CHAT_CHECKPOINTER"] = "memory"
+os.environ["DB_MODE"] = "sync"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def claim_id(client):
+    return client.get("/claims", params={"limit": 1}).json()["available_claims"][0]
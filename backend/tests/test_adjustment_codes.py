@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app.claim_index import ClaimFilter
+from app.claim_repository import InMemoryClaimRepository, PostgresClaimRepository
+from app.code_index import AdjustmentQuery, find_adjustments
+
+_CARC = "https://x12.org/codes/claim-adjustment-reason-codes"
+_RARC = "https://x12.org/codes/remittance-advice-remark-codes"
+
+
+def _adjudication(group, system, code, amount):
+    return {
+        "category": {"coding": [{"code": group}]},
+        "reason": {"coding": [{"system": system, "code": code}]},
+        "amount": {"value": amount, "currency": "USD"},
+    }
+
+
+def _claim(claim_id, *adjudications):
+    return {
+        "resourceType": "ExplanationOfBenefit",
+        "identifier": [{"type": {"coding": [{"code": "uc"}]}, "value": claim_id}],
+        "item": [{"sequence": 1, "adjudication": list(adjudications)}],
+    }
+
+
+CLAIMS = [
+    _claim("T-both", _adjudication("CO", _CARC, "45", 30.0), _adjudication("CO", _RARC, "N130", 0.0)),
+    _claim("T-carc", _adjudication("CO", _CARC, "45", 20.0)),
+    _claim("T-rarc", _adjudication("PR", _RARC, "N130", 0.0)),
+    _claim("T-group", _adjudication("PR", _CARC, "45", 10.0), _adjudication("CO", _RARC, "N130", 0.0)),
+]
+
+
+@pytest.fixture(params=["memory", "sql"])
+def repository(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        repository = InMemoryClaimRepository({})
+    else:
+        # Only the claims above, so the single-code results stay exact
+        monkeypatch.setattr("app.claim_repository.CLAIM_STORE_SEED_MOCK", False)
+        repository = PostgresClaimRepository(create_engine(f"sqlite:///{tmp_path / 'claims.db'}"))
+        repository.setup()
+    repository.put_many(CLAIMS)
+    return repository
+
+
+def _search(repository, **codes):
+    matches, _ = find_adjustments(repository, AdjustmentQuery(**codes), ClaimFilter())
+    return {m["claim_id"]: sorted(a["reason_code"] for a in m["adjustments"]) for m in matches}
+
+
+def test_carc_and_rarc_match_claims_carrying_both(repository):
+    assert _search(repository, carc="45", rarc="N130") == {
+        "T-both": ["45", "N130"],
+        "T-group": ["45", "N130"],
+    }
+
+
+def test_group_applies_to_each_reason_code(repository):
+    assert _search(repository, carc="45", rarc="N130", group="CO") == {"T-both": ["45", "N130"]}
+
+
+def test_single_code_queries(repository):
+    assert set(_search(repository, carc="45")) == {"T-both", "T-carc", "T-group"}
+    assert set(_search(repository, rarc="N130", group="PR")) == {"T-rarc"}
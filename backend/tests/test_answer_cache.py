@@ -0,0 +1,21 @@
+import asyncio
+
+from app.answer_cache import AnswerCache
+from app.claim_repository import claim_repository
+
+
+def test_key_for_checks_claims_without_loading_them(client, claim_id, monkeypatch):
+    async def no_load(claim_id):
+        raise AssertionError(f"claim {claim_id} loaded")
+
+    monkeypatch.setattr(claim_repository, "aget", no_load)
+    cache = AnswerCache(enabled=True)
+
+    key, digest = asyncio.run(cache.key_for(f"Why was claim {claim_id} denied? Not 999999999."))
+
+    assert key == (f"why was claim {claim_id} denied? not 999999999", (claim_id,))
+    assert asyncio.run(cache.key_for(f"Why was claim {claim_id} denied? Not 999999999."))[1] == digest
+
+
+def test_key_for_ignores_queries_without_claims(client):
+    assert asyncio.run(AnswerCache(enabled=True).key_for("How do denials work?")) is None
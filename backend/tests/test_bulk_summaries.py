@@ -0,0 +1,24 @@
+from collections import Counter
+
+from app.claim_repository import claim_repository
+from app.reference_cache import reference_cache
+
+
+def test_bulk_summaries_read_each_claim_once(client, claim_id, monkeypatch):
+    lookups = Counter()
+    get = claim_repository.get
+
+    def counting_get(claim_id):
+        lookups[claim_id] += 1
+        return get(claim_id)
+
+    monkeypatch.setattr(claim_repository, "get", counting_get)
+    # Without the shared snapshot the batch's codes are prefetched from the claims
+    monkeypatch.setattr(reference_cache, "snapshot", None)
+    response = client.post("/claims/summaries", json={"claim_ids": [claim_id, "no-such-claim"]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["found"], body["missing"]) == (1, 1)
+    assert body["results"][1] == {"claim_id": "no-such-claim", "error": "Claim not found"}
+    assert lookups == {claim_id: 1, "no-such-claim": 1}
@@ -0,0 +1,44 @@
+import json
+
+from sqlalchemy import create_engine
+
+from app.claim_repository import PostgresClaimRepository, claim_repository
+from app.json_encoding import encoded_bodies
+
+
+def test_fields_projection_returns_only_requested_keys(client, claim_id):
+    response = client.get(f"/claims/{claim_id}", params={"include": "summary", "fields": "billed_amount,paid_amount"})
+
+    assert response.status_code == 200
+    assert set(response.json()["summary"]) == {"billed_amount", "paid_amount"}
+
+
+def test_fields_projection_redacts_requested_pii(client, claim_id):
+    summary = client.get(
+        f"/claims/{claim_id}", params={"include": "summary", "fields": "patient_name,fhir_id,billed_amount"}
+    ).json()["summary"]
+
+    assert summary == {"patient_name": "REDACTED", "billed_amount": summary["billed_amount"]}
+
+
+def test_fields_projection_with_pii(client, claim_id):
+    summary = client.get(
+        f"/claims/{claim_id}",
+        params={"include": "summary", "fields": "patient_name,fhir_id", "include_pii": True},
+    ).json()["summary"]
+
+    assert set(summary) == {"patient_name", "fhir_id"}
+    assert summary["patient_name"] != "REDACTED"
+
+
+def test_raw_section_from_a_sql_store_bypasses_the_body_cache(tmp_path, monkeypatch, claim_id):
+    monkeypatch.setattr("app.claim_repository.CLAIM_STORE_SEED_MOCK", False)
+    repository = PostgresClaimRepository(create_engine(f"sqlite:///{tmp_path / 'claims.db'}"))
+    repository.setup()
+    repository.put(claim_repository.get(claim_id))
+    misses = encoded_bodies.misses
+
+    raw = repository.encode(claim_id, repository.get(claim_id))
+
+    assert json.loads(raw) == claim_repository.get(claim_id)
+    assert encoded_bodies.misses == misses
@@ -0,0 +1,20 @@
+import json
+
+
+def _summaries(client, **params):
+    response = client.get("/claims/export.ndjson", params=params)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_summary_export_redacts_pii(client):
+    summaries = _summaries(client)
+
+    assert summaries
+    assert all("fhir_id" not in s and s["patient_name"] == "REDACTED" for s in summaries)
+
+
+def test_summary_export_with_pii(client):
+    summaries = _summaries(client, include_pii=True)
+
+    assert all("fhir_id" in s and s["patient_name"] != "REDACTED" for s in summaries)
@@ -0,0 +1,23 @@
+import json
+
+from app import main
+from app.ingest import INGEST_BATCH_SIZE_MAX, INGEST_WORKERS_MAX
+
+
+def test_ingest_caps_batch_size_and_workers(client, monkeypatch):
+    calls = []
+    ingest_file = main.ingest_file
+
+    def recording(path, format, batch_size, workers):
+        calls.append((batch_size, workers))
+        return ingest_file(path, format, batch_size, workers)
+
+    monkeypatch.setattr(main, "ingest_file", recording)
+    response = client.post(
+        "/claims/ingest",
+        params={"format": "ndjson", "batch_size": 10**9, "workers": 5000},
+        content=json.dumps({"resourceType": "ExplanationOfBenefit"}) + "\n",
+    )
+
+    assert response.status_code == 200
+    assert calls == [(INGEST_BATCH_SIZE_MAX, INGEST_WORKERS_MAX)]
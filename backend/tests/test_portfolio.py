@@ -0,0 +1,42 @@
+import asyncio
+
+from app.claim_repository import InMemoryClaimRepository
+from app.portfolio import Portfolio
+
+
+class _StoppingRepository(InMemoryClaimRepository):
+    """Stops the portfolio once the rebuild has read its first batch"""
+
+    portfolio = None
+
+    def iter_claims(self, batch_size: int = 1000):
+        for batch in super().iter_claims(batch_size):
+            yield batch
+            self.portfolio.stop()
+
+
+def test_rebuild_builds_every_claim():
+    repository = InMemoryClaimRepository()
+    portfolio = Portfolio(repository, enabled=False)
+
+    assert portfolio.rebuild(batch_size=2) == repository.count()
+    assert len(portfolio.columns) == repository.count()
+
+
+def test_stop_abandons_a_running_rebuild():
+    repository = _StoppingRepository()
+    portfolio = repository.portfolio = Portfolio(repository, enabled=False)
+
+    assert portfolio.rebuild(batch_size=2) is None
+    assert len(portfolio.columns) == 0
+    assert not portfolio.running
+
+
+def test_rebuild_periodically_without_interval_builds_once():
+    repository = InMemoryClaimRepository()
+    portfolio = Portfolio(repository, enabled=False)
+
+    asyncio.run(portfolio.rebuild_periodically(interval=0))
+
+    assert len(portfolio.columns) == repository.count()
+    assert portfolio.stats()["rebuild_interval_seconds"] is None
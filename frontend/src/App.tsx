@@ -294,13 +294,13 @@ function App() {
     setShowSuggestions(false);
 
     try {
-      const [summaryRes, rawRes] = await Promise.all([
-        axios.get(`${API_URL}/claims/${id}/summary?include_pii=true`),
-        axios.get(`${API_URL}/claims/${id}/raw`)
-      ]);
+      // One round trip: summary and raw resource from a single claim lookup
+      const res = await axios.get(`${API_URL}/claims/${id}`, {
+        params: { include: "summary,raw", include_pii: true }
+      });
 
-      setClaim(summaryRes.data);
-      setRawJson(rawRes.data);
+      setClaim(res.data.summary);
+      setRawJson(res.data.raw);
       setCurrentId(id);
       setSearchInput(id);
     } catch (err) {